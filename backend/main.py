@@ -22,6 +22,12 @@ from services.file_service import FileService
 from services.context_aggregator import ContextAggregator
 from services.signal_poller import SignalPoller
 from services.agentic_supervisor import AgenticSupervisor
+from services.workspace_watcher import WorkspaceWatcher
+from services.health_daemon import HealthDaemon
+from services.health_history import HealthHistory
+from services.parallel_search import shutdown_search_pool
+from services.bulk_replace import recover_journals
+from services.complexity_metrics import shutdown_metrics_pool
 
 STATE_FILE = Path(__file__).parent / "state.json"
 
@@ -61,6 +67,7 @@ def save_state():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     load_state()
+    recover_journals()
     chronicle_service.start_session()
     file_service = FileService()
     game.agent = agent
@@ -103,8 +110,25 @@ async def lifespan(app: FastAPI):
     signal_poller.supervisor = agentic_supervisor
     refinery_route.agentic_supervisor = agentic_supervisor
 
+    # Workspace index watcher (inotify, polling fallback)
+    workspace_watcher = WorkspaceWatcher()
+    workspace_watcher.start()
+
+    # Background health reports, pushed to /api/health/stream
+    health_history = HealthHistory()
+    health_daemon = HealthDaemon(history=health_history)
+    health_route.health_daemon = health_daemon
+    health_route.health_history = health_history
+    game.health_daemon = health_daemon
+    health_daemon.start()
+
     yield
 
+    health_daemon.stop()
+    health_history.close()
+    workspace_watcher.stop()
+    shutdown_search_pool()
+    shutdown_metrics_pool()
     signal_poller.stop()
     chronicle_service.end_session()
     save_state()
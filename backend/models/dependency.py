@@ -8,6 +8,10 @@ class DepNode(BaseModel):
     type: str  # "python" | "typescript" | "javascript"
     lines: int
     extension: str
+    layer: int = 0  # 0 = imports nothing in the workspace
+    fan_in: int = 0
+    fan_out: int = 0
+    cycle: int | None = None  # index into DepGraphResponse.cycles
 
 
 class DepEdge(BaseModel):
@@ -22,3 +26,90 @@ class DepGraphRequest(BaseModel):
 class DepGraphResponse(BaseModel):
     nodes: list[DepNode] = []
     edges: list[DepEdge] = []
+    cycles: list[list[str]] = []  # import cycles in scope, largest first
+    depth: int = 0  # number of topological layers
+    total_nodes: int = 0  # before truncation to MAX_NODES
+
+
+class DepCluster(BaseModel):
+    id: str  # "dir:<path>" | "community:<level>.<n>" | "file:<path>"
+    label: str
+    kind: str  # "directory" | "community" | "file"
+    path: str | None = None  # directory or file path; None for communities
+    files: int
+    lines: int
+    internal_edges: int = 0
+    fan_in: int = 0  # imports of its files from outside the cluster
+    fan_out: int = 0  # imports by its files of files outside the cluster
+    cycle_files: int = 0  # files in an import cycle
+    expandable: bool = False
+
+
+class DepClusterEdge(BaseModel):
+    source: str
+    target: str
+    weight: int  # file-level imports collapsed into this edge
+
+
+class DepClusterRequest(BaseModel):
+    scope: str | None = None
+    mode: str = "directory"  # "directory" | "community"
+    expanded: list[str] = []  # cluster ids to show one level deeper
+
+
+class DepClusterResponse(BaseModel):
+    mode: str
+    clusters: list[DepCluster] = []
+    edges: list[DepClusterEdge] = []
+    total_files: int = 0  # files in scope
+    total_edges: int = 0  # imports within scope: internal edges plus edge weights
+
+
+class ImpactedFile(BaseModel):
+    path: str
+    hops: int
+    paths: int
+    fan_in: int
+
+
+class BlastRadiusRequest(BaseModel):
+    file: str
+    depth: int | None = None  # None follows every transitive dependent
+
+
+class BlastRadiusResponse(BaseModel):
+    file: str
+    depth: int | None = None
+    direct: list[str] = []
+    dependents: list[str] = []
+    impact: list[ImpactedFile] = []
+    count: int = 0
+    high: bool = False
+
+
+class SymbolQueryRequest(BaseModel):
+    symbol: str  # name or qualified name, e.g. "Parser.parse"
+    file: str | None = None  # narrow to definitions in this file
+
+
+class SymbolDefinition(BaseModel):
+    file: str
+    name: str
+    qualname: str
+    kind: str  # "function" | "class" | "variable"
+    line: int
+    end_line: int
+
+
+class SymbolReference(BaseModel):
+    file: str
+    line: int
+    caller: str | None = None  # enclosing definition, None at module level
+    name: str | None = None  # callee name (callees only)
+
+
+class SymbolQueryResponse(BaseModel):
+    symbol: str
+    definitions: list[SymbolDefinition] = []
+    callers: list[SymbolReference] = []
+    callees: list[SymbolReference] = []
@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+# Upper bounds for one search request (/search and /search/stream)
+MAX_SEARCH_RESULTS = 10_000
+MAX_CONTEXT_LINES = 20
 
 
 class FileReadRequest(BaseModel):
@@ -32,6 +36,22 @@ class FileTreeNode(BaseModel):
     children: list["FileTreeNode"] = []
 
 
+class FileTreeLevelRequest(BaseModel):
+    path: str
+    cursor: str | None = None  # next_cursor of the previous page
+    limit: int = 500
+    etag: str | None = None  # etag from an earlier listing of this directory
+
+
+class FileTreeLevelResponse(BaseModel):
+    path: str
+    etag: str
+    entries: list[FileTreeNode] = []  # children are never filled in; expand dirs lazily
+    next_cursor: str | None = None
+    total: int = 0
+    not_modified: bool = False  # request etag still current, entries omitted
+
+
 class SyntaxCheckRequest(BaseModel):
     path: str
     content: str
@@ -51,13 +71,20 @@ class SyntaxCheckResponse(BaseModel):
 class FileSearchRequest(BaseModel):
     query: str
     root: str
-    max_results: int = 100
+    max_results: int = Field(100, ge=1, le=MAX_SEARCH_RESULTS)
+    mode: str = "literal"  # "literal" | "regex"
+    case_sensitive: bool = False
+    context_lines: int = Field(0, ge=0, le=MAX_CONTEXT_LINES)
 
 
 class FileSearchMatch(BaseModel):
     path: str
     line: int
     text: str
+    column: int = 0  # 1-based start of the match within text, 0 if unknown
+    match_length: int = 0
+    context_before: list[str] = []
+    context_after: list[str] = []
 
 
 class FileSearchResponse(BaseModel):
@@ -69,8 +96,18 @@ class FileReplaceRequest(BaseModel):
     root: str
     search: str
     replace: str
+    dry_run: bool = False  # preview the diffs without writing anything
+    paths: list[str] | None = None  # limit to these files, e.g. the ones kept after a preview
+
+
+class FileReplaceChange(BaseModel):
+    path: str
+    replacements: int
+    diff: str = ""  # unified diff, only filled in for dry runs
 
 
 class FileReplaceResult(BaseModel):
     files_modified: int
     replacements_made: int
+    dry_run: bool = False
+    changes: list[FileReplaceChange] = []
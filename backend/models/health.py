@@ -6,6 +6,9 @@ class ComplexFunction(BaseModel):
     name: str
     lines: int
     start_line: int
+    cyclomatic: int = 0
+    cognitive: int = 0
+    nesting: int = 0
 
 
 class CodeAnomaly(BaseModel):
@@ -33,6 +36,7 @@ class HealthScanResponse(BaseModel):
     untested_files: list[str] = []
     anomalies: list[CodeAnomaly] = []
     large_files: list[LargeFile] = []
+    import_cycles: list[list[str]] = []
 
 
 class CriticalAnomaly(BaseModel):
@@ -47,3 +51,59 @@ class HealthWatchResponse(BaseModel):
     has_critical: bool = False
     anomalies: list[CriticalAnomaly] = []
     scores: HealthScores = HealthScores()
+
+
+class HealthSample(BaseModel):
+    ts: float  # unix seconds
+    commit: str | None = None
+    source: str = "scan"  # "scan" | "commit" | "backfill" | "bucket" (downsampled)
+    complexity: float
+    coverage: float
+    cleanliness: float
+    file_size: float
+    files: float = 0
+    functions: float = 0
+    anomalies: float = 0
+    complex_functions: float = 0
+
+
+class HealthHistoryResponse(BaseModel):
+    root: str
+    start: float
+    end: float
+    bucket_seconds: float = 0  # 0 when samples are not downsampled
+    samples: list[HealthSample] = []
+
+
+class FileHealthPoint(BaseModel):
+    ts: float
+    commit: str | None = None
+    lines: int = 0
+    functions: int = 0
+    max_cognitive: int = 0
+    total_cognitive: int = 0
+    anomalies: int = 0
+    removed: bool = False
+
+
+class FileHealthHistoryResponse(BaseModel):
+    root: str
+    path: str
+    points: list[FileHealthPoint] = []
+
+
+class HealthBackfillRequest(BaseModel):
+    rev_range: str = "HEAD"  # anything `git log` accepts, e.g. "v1.0..main"
+    max_commits: int | None = None  # most recent N first-parent commits of the range
+
+
+class HealthBackfillStatus(BaseModel):
+    root: str = ""
+    status: str = "idle"  # "idle" | "running" | "done" | "failed" | "cancelled"
+    rev_range: str = ""
+    total: int = 0
+    done: int = 0
+    recorded: int = 0
+    blobs_analyzed: int = 0
+    blobs_cached: int = 0
+    error: str | None = None
@@ -61,3 +61,5 @@ class ScanResult(BaseModel):
     signals: list[Signal]
     operations_created: int
     total_signals: int
+    added: list[str] = []  # signal ids new since the previous scan
+    removed: list[str] = []  # signal ids no longer found
@@ -96,6 +96,7 @@ def _build_system_prompt(project_context: str = "", has_tools: bool = False) ->
 - read_file: Read file contents
 - write_file: Create or modify files
 - search_text: Search for patterns in code
+- find_references: Find a symbol's definition, callers and callees (prefer over search_text for usages)
 - run_command: Run shell commands (npm test, pytest, cargo build, linters, etc.)
 
 IMPORTANT: Always use tools to get accurate information. Do NOT guess file contents or project structure — use list_files and read_file to verify.
@@ -322,8 +323,8 @@ async def chat_stream(req: ChatRequest):
                                 dep_svc = DependencyService(workspace_root)
                                 file_rel = str(Path(result.file_path).relative_to(workspace_root))
                                 br = dep_svc.blast_radius(file_rel)
-                                if br["count"] > 0:
-                                    yield f"data: {json.dumps({'type': 'blast_radius', 'file': br['file'], 'dependents': br['dependents'], 'count': br['count'], 'high': br['high']})}\n\n"
+                                if br.count > 0:
+                                    yield f"data: {json.dumps({'type': 'blast_radius', 'file': br.file, 'dependents': br.dependents, 'direct': br.direct, 'count': br.count, 'high': br.high})}\n\n"
                             except Exception:
                                 pass
 
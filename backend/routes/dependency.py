@@ -2,7 +2,11 @@ from pathlib import Path
 
 from fastapi import APIRouter, HTTPException
 
-from models.dependency import DepGraphRequest, DepGraphResponse
+from models.dependency import (
+    BlastRadiusRequest, BlastRadiusResponse, DepClusterRequest, DepClusterResponse,
+    DepGraphRequest, DepGraphResponse,
+    SymbolQueryRequest, SymbolQueryResponse,
+)
 from services.dependency_service import DependencyService
 from routes.settings import load_settings
 
@@ -20,3 +24,49 @@ async def get_dependency_graph(req: DepGraphRequest):
         raise HTTPException(status_code=400, detail="Invalid scope")
     svc = DependencyService(cwd)
     return svc.build_graph(scope=scope)
+
+
+@router.post("/clusters", response_model=DepClusterResponse)
+async def get_dependency_clusters(req: DepClusterRequest):
+    settings = load_settings()
+    cwd = settings.get("workspace_root", "")
+    if not cwd or not Path(cwd).is_dir():
+        raise HTTPException(status_code=400, detail="No workspace configured")
+    scope = req.scope
+    if scope and (".." in scope or scope.startswith("/")):
+        raise HTTPException(status_code=400, detail="Invalid scope")
+    svc = DependencyService(cwd)
+    try:
+        return svc.build_clusters(scope=scope, mode=req.mode, expanded=req.expanded)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/blast-radius", response_model=BlastRadiusResponse)
+async def get_blast_radius(req: BlastRadiusRequest):
+    settings = load_settings()
+    cwd = settings.get("workspace_root", "")
+    if not cwd or not Path(cwd).is_dir():
+        raise HTTPException(status_code=400, detail="No workspace configured")
+    if ".." in req.file or req.file.startswith("/"):
+        raise HTTPException(status_code=400, detail="Invalid file")
+    svc = DependencyService(cwd)
+    try:
+        return svc.blast_radius(req.file, depth=req.depth)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/symbols", response_model=SymbolQueryResponse)
+async def get_symbol_usages(req: SymbolQueryRequest):
+    settings = load_settings()
+    cwd = settings.get("workspace_root", "")
+    if not cwd or not Path(cwd).is_dir():
+        raise HTTPException(status_code=400, detail="No workspace configured")
+    if req.file and (".." in req.file or req.file.startswith("/")):
+        raise HTTPException(status_code=400, detail="Invalid file")
+    svc = DependencyService(cwd)
+    try:
+        return svc.symbol_usages(req.symbol, req.file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
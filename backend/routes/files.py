@@ -1,4 +1,10 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+import threading
+import time
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from models.file import (
     FileReadRequest,
     FileReadResponse,
@@ -6,13 +12,17 @@ from models.file import (
     FileWriteResponse,
     FileTreeRequest,
     FileTreeNode,
+    FileTreeLevelRequest,
+    FileTreeLevelResponse,
     SyntaxCheckRequest,
     SyntaxCheckResponse,
     FileSearchRequest,
     FileSearchResponse,
+    FileReplaceChange,
     FileReplaceRequest,
     FileReplaceResult,
 )
+from services.bulk_replace import ReplaceError
 from services.file_service import FileService
 
 router = APIRouter(prefix="/api/files", tags=["files"])
@@ -55,10 +65,25 @@ async def get_file_tree(req: FileTreeRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/tree/children", response_model=FileTreeLevelResponse)
+async def list_directory(req: FileTreeLevelRequest):
+    try:
+        return file_service.list_directory(req.path, cursor=req.cursor, limit=req.limit, etag=req.etag)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/search", response_model=FileSearchResponse)
 async def search_files(req: FileSearchRequest):
     try:
-        matches, truncated = file_service.search_files(req.root, req.query, req.max_results)
+        matches, truncated = file_service.search_files(
+            req.root, req.query, req.max_results,
+            mode=req.mode,
+            case_sensitive=req.case_sensitive,
+            context_lines=req.context_lines,
+        )
         return FileSearchResponse(matches=matches, truncated=truncated)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -66,6 +91,67 @@ async def search_files(req: FileSearchRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Streamed matches are flushed at least this often / at this batch size
+STREAM_FLUSH_SECONDS = 0.05
+STREAM_BATCH_SIZE = 50
+
+
+@router.post("/search/stream")
+async def search_files_stream(req: FileSearchRequest, request: Request):
+    """Stream search matches as Server-Sent Events while the scan runs.
+
+    Events: ``matches`` (a batch of FileSearchMatch), then ``complete`` or
+    ``error``. Closing the connection cancels the scan.
+    """
+    cancel = threading.Event()
+    try:
+        # Preparing can walk the tree and sync the trigram index: keep it off the event loop
+        gen = await asyncio.to_thread(
+            file_service.iter_search,
+            req.root, req.query, req.max_results,
+            mode=req.mode,
+            case_sensitive=req.case_sensitive,
+            context_lines=req.context_lines,
+            cancel=cancel,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    _sentinel = object()
+
+    async def generate():
+        total = 0
+        batch: list[dict] = []
+        last_flush = 0.0  # first hits go out immediately
+        try:
+            while True:
+                found = await asyncio.to_thread(next, gen, _sentinel)
+                if found is _sentinel:
+                    break
+                batch.extend(m.model_dump() for m in found)
+                total += len(found)
+                now = time.monotonic()
+                if batch and (len(batch) >= STREAM_BATCH_SIZE or now - last_flush >= STREAM_FLUSH_SECONDS):
+                    yield f"data: {json.dumps({'type': 'matches', 'matches': batch})}\n\n"
+                    batch = []
+                    last_flush = now
+                if await request.is_disconnected():
+                    return
+            if batch:
+                yield f"data: {json.dumps({'type': 'matches', 'matches': batch})}\n\n"
+            yield f"data: {json.dumps({'type': 'complete', 'total': total, 'truncated': total >= req.max_results})}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'type': 'error', 'error': str(e)[:200]})}\n\n"
+        finally:
+            cancel.set()
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/check_syntax", response_model=SyntaxCheckResponse)
 async def check_syntax(req: SyntaxCheckRequest):
     try:
@@ -80,13 +166,21 @@ async def check_syntax(req: SyntaxCheckRequest):
 @router.post("/replace", response_model=FileReplaceResult)
 async def replace_in_files(req: FileReplaceRequest):
     try:
-        files_modified, replacements_made = file_service.replace_in_files(
-            req.root, req.search, req.replace
+        changes = file_service.replace_in_files(
+            req.root, req.search, req.replace, dry_run=req.dry_run, paths=req.paths
         )
         return FileReplaceResult(
-            files_modified=files_modified, replacements_made=replacements_made
+            files_modified=0 if req.dry_run else len(changes),
+            replacements_made=sum(c.replacements for c in changes),
+            dry_run=req.dry_run,
+            changes=[
+                FileReplaceChange(path=str(c.path), replacements=c.replacements, diff=c.diff)
+                for c in changes
+            ],
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except ReplaceError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,9 +1,9 @@
-import os
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, HTTPException
 from models.player import AgentStatusResponse
 from services.chronicle_service import ChronicleService
+from services.workspace_index import get_workspace_index
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/api/game", tags=["game"])
@@ -13,10 +13,10 @@ agent = None
 quest_service = None
 save_state_fn = lambda: None
 chronicle_service: ChronicleService | None = None
+health_daemon = None
 
-# Cached total_files count
-_cached_total_files: int = 0
-_cached_workspace: str = ""
+# Directories excluded from the total_files metric (on top of SKIP_DIRS)
+_COUNT_SKIP_DIRS = {"build"}
 
 
 class FocusStartRequest(BaseModel):
@@ -36,22 +36,11 @@ class TrackFileRequest(BaseModel):
 
 def _count_project_files(workspace_root: str) -> int:
     """Count files in workspace for total_files metric."""
-    global _cached_total_files, _cached_workspace
-    if workspace_root == _cached_workspace and _cached_total_files > 0:
-        return _cached_total_files
-    count = 0
-    skip_dirs = {".git", "node_modules", "__pycache__", ".venv", "venv", "target", "dist", "build", ".next"}
     try:
-        for dirpath, dirnames, filenames in os.walk(workspace_root):
-            dirnames[:] = [d for d in dirnames if d not in skip_dirs]
-            count += len(filenames)
-            if count > 50000:
-                break
+        index = get_workspace_index(workspace_root)
     except OSError:
-        pass
-    _cached_total_files = count
-    _cached_workspace = workspace_root
-    return count
+        return 0
+    return len(index.files(under=workspace_root, exclude_dirs=_COUNT_SKIP_DIRS))
 
 
 def get_agent_response(a, workspace_root: str = "") -> AgentStatusResponse:
@@ -113,15 +102,14 @@ async def update_integrity():
         if not workspace_root:
             return {"integrity_score": agent.integrity_score}
 
-        from services.health_service import HealthService
-        hs = HealthService(workspace_root)
-        result = hs.watch()
-        scores = result.get("scores", {})
+        # Served from the background health snapshot, not recomputed here
+        snap = await health_daemon.wait_snapshot(workspace_root)
+        scores = snap.watch.scores
         integrity = (
-            scores.get("complexity", 100) * 0.3 +
-            scores.get("coverage", 100) * 0.2 +
-            scores.get("cleanliness", 100) * 0.3 +
-            scores.get("file_size", 100) * 0.2
+            scores.complexity * 0.3 +
+            scores.coverage * 0.2 +
+            scores.cleanliness * 0.3 +
+            scores.file_size * 0.2
         )
         agent.integrity_score = round(integrity, 1)
         save_state_fn()
@@ -1,13 +1,31 @@
+import asyncio
+import json
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
-from models.health import HealthScanResponse, HealthWatchResponse
-from services.health_service import HealthService
+from models.health import (
+    FileHealthHistoryResponse,
+    HealthBackfillRequest,
+    HealthBackfillStatus,
+    HealthHistoryResponse,
+    HealthScanResponse,
+    HealthWatchResponse,
+)
+from services.health_backfill import get_backfill, start_backfill
+from services.health_daemon import HealthDaemon
+from services.health_history import HealthHistory
 from routes.settings import load_settings
 
 router = APIRouter(prefix="/api/health", tags=["health"])
 
+health_daemon: HealthDaemon | None = None  # injected from main.py
+health_history: HealthHistory | None = None  # injected from main.py
+
+# Comment lines keep idle proxies from closing the stream
+STREAM_KEEPALIVE_SECONDS = 15.0
+
 
 @router.get("/scan", response_model=HealthScanResponse)
 async def health_scan():
@@ -15,8 +33,8 @@ async def health_scan():
     cwd = settings.get("workspace_root", "")
     if not cwd or not Path(cwd).is_dir():
         raise HTTPException(status_code=400, detail="No workspace configured")
-    svc = HealthService(cwd)
-    return svc.scan()
+    snap = await health_daemon.wait_snapshot(cwd)
+    return snap.scan
 
 
 @router.get("/watch", response_model=HealthWatchResponse)
@@ -25,5 +43,109 @@ async def health_watch():
     cwd = settings.get("workspace_root", "")
     if not cwd or not Path(cwd).is_dir():
         return HealthWatchResponse()
-    svc = HealthService(cwd)
-    return svc.watch()
+    snap = await health_daemon.wait_snapshot(cwd)
+    return snap.watch
+
+
+@router.get("/stream")
+async def health_stream(request: Request):
+    """Push health updates as Server-Sent Events.
+
+    Events: ``snapshot`` (scores and every finding) on connect and whenever
+    the workspace changes, then ``delta`` (new scores, ``added`` and
+    ``removed`` findings) after each background recompute.
+    """
+    queue = health_daemon.subscribe()
+
+    async def generate():
+        try:
+            snap = health_daemon.snapshot()
+            if snap is not None:
+                yield f"data: {json.dumps(health_daemon.snapshot_event(snap))}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            health_daemon.unsubscribe(queue)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _history_root() -> str:
+    cwd = load_settings().get("workspace_root", "")
+    if not cwd or not Path(cwd).is_dir():
+        raise HTTPException(status_code=400, detail="No workspace configured")
+    return str(Path(cwd).resolve())
+
+
+@router.get("/history", response_model=HealthHistoryResponse)
+async def health_history_range(
+    start: float | None = None,
+    end: float | None = None,
+    buckets: int = Query(200, ge=1),
+):
+    """Project-wide scores over [start, end] (unix seconds), downsampled to ``buckets`` points."""
+    root = _history_root()
+    try:
+        samples, width = await asyncio.to_thread(health_history.samples, root, start, end, buckets)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return HealthHistoryResponse(
+        root=root,
+        start=start if start is not None else (samples[0].ts if samples else 0.0),
+        end=end if end is not None else (samples[-1].ts if samples else 0.0),
+        bucket_seconds=width,
+        samples=samples,
+    )
+
+
+@router.get("/history/file", response_model=FileHealthHistoryResponse)
+async def health_history_file(
+    path: str,
+    start: float | None = None,
+    end: float | None = None,
+    buckets: int = Query(200, ge=1),
+):
+    """Metric change points of one file (path relative to the workspace root)."""
+    root = _history_root()
+    try:
+        points = await asyncio.to_thread(health_history.file_points, root, path, start, end, buckets)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FileHealthHistoryResponse(root=root, path=path, points=points)
+
+
+@router.post("/backfill", response_model=HealthBackfillStatus)
+async def health_backfill(req: HealthBackfillRequest):
+    """Score past commits of the workspace repository into the history, in the background."""
+    root = _history_root()
+    try:
+        job = start_backfill(root, health_history, req.rev_range, req.max_commits)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.to_model()
+
+
+@router.get("/backfill", response_model=HealthBackfillStatus)
+async def health_backfill_status():
+    job = get_backfill(_history_root())
+    return job.to_model() if job is not None else HealthBackfillStatus()
+
+
+@router.post("/backfill/cancel", response_model=HealthBackfillStatus)
+async def health_backfill_cancel():
+    job = get_backfill(_history_root())
+    if job is None:
+        return HealthBackfillStatus()
+    job.cancel()
+    return job.to_model()
@@ -4,16 +4,17 @@ Manages operations lifecycle: scan → synthesize → track → complete.
 """
 import uuid
 from datetime import datetime, timezone
+from pathlib import Path
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from models.mission import (
     Operation, OperationCreate, OperationUpdate,
-    OperationStatus, Signal, ScanResult,
+    OperationStatus, Signal, SignalSource, ScanResult,
 )
 from services.mission_scanner import (
-    scan_code_todos, scan_lsp_errors, signals_from_telegram,
+    scan_code_todo_changes, scan_lsp_errors, signals_from_telegram,
 )
 from services.mission_synthesizer import synthesize_operations
 
@@ -31,6 +32,7 @@ _last_scan: str | None = None
 
 class ScanRequest(BaseModel):
     directory: str
+    client: str = "default"  # each client gets its own added/removed markers
     telegram_messages: list[dict] = []
     lsp_errors: list[dict] = []
 
@@ -142,26 +144,34 @@ async def scan_signals(req: ScanRequest):
 
     all_signals: list[Signal] = []
 
-    # 1. CODE_TODO signals
-    todo_signals = scan_code_todos(req.directory)
+    # 1. CODE_TODO signals; IDs are stable, so this directory's stored
+    # markers are replaced rather than appended to
+    todo_signals, added_todos, removed_todos = scan_code_todo_changes(req.directory, req.client)
     all_signals.extend(todo_signals)
+    other_signals: list[Signal] = []
 
     # 2. TELEGRAM signals
     if req.telegram_messages:
         tg_signals = signals_from_telegram(req.telegram_messages)
-        all_signals.extend(tg_signals)
+        other_signals.extend(tg_signals)
 
     # 3. LSP_ERRORS signals
     if req.lsp_errors:
         lsp_signals = scan_lsp_errors(req.lsp_errors)
-        all_signals.extend(lsp_signals)
+        other_signals.extend(lsp_signals)
+    all_signals.extend(other_signals)
 
     # Store signals
+    root = str(Path(req.directory).resolve())
+    _signals[:] = [
+        s for s in _signals
+        if s.source != SignalSource.CODE_TODO or s.metadata.get("root") != root
+    ]
     _signals.extend(all_signals)
 
-    # Synthesize into operations
+    # Synthesize into operations: only markers new to this client
     existing = list(_operations.values())
-    new_ops = synthesize_operations(all_signals, existing)
+    new_ops = synthesize_operations(added_todos + other_signals, existing)
 
     for op in new_ops:
         _operations[op.id] = op
@@ -179,6 +189,8 @@ async def scan_signals(req: ScanRequest):
         signals=all_signals,
         operations_created=len(new_ops),
         total_signals=len(all_signals),
+        added=[s.id for s in added_todos + other_signals],
+        removed=removed_todos,
     )
 
 
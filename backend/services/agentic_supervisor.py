@@ -15,7 +15,7 @@ from models.supervisor import (
 )
 from services.providers import get_provider
 from services.tools import ToolExecutor, ToolResult
-from services.context_aggregator import _is_skip_path
+from services.context_aggregator import project_file_paths
 
 logger = logging.getLogger("agentic_supervisor")
 
@@ -191,16 +191,7 @@ class AgenticSupervisor:
         if workspace_root:
             root = Path(workspace_root)
             if root.is_dir():
-                files = []
-                for p in root.rglob("*"):
-                    if _is_skip_path(p) or not p.is_file():
-                        continue
-                    try:
-                        files.append(str(p.relative_to(root)))
-                    except ValueError:
-                        pass
-                    if len(files) >= 100:
-                        break
+                files = [str(p) for p in project_file_paths(root, limit=100)]
                 file_listing = "\n".join(files)
 
         sig_id = getattr(signal, "id", str(uuid.uuid4()))
@@ -0,0 +1,247 @@
+"""Bulk replace — preview first, then apply all-or-nothing.
+
+Planning scans the candidate files and returns one ``ReplaceChange`` per
+affected file: its replacement count, an optional unified diff, and the
+(mtime, size) it was planned against.
+
+Applying a plan is transactional:
+  1. new contents are written to temp files beside their targets, in parallel,
+     and each original is copied into an on-disk journal;
+  2. temp files are moved over their targets with ``os.replace``.
+A failure in step 1 leaves the tree untouched; a failure in step 2 restores
+every file already replaced. A journal left behind by a crash is rolled back
+by ``recover_journals`` on the next start. The manifest is removed before
+the backups, so a replace that finished is never rolled back, and recovery
+only restores targets still holding exactly the content the replace wrote,
+leaving files edited since untouched.
+"""
+import difflib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from services.byte_reader import open_buffer
+from services.workspace_index import CACHE_DIR
+
+logger = logging.getLogger("bulk_replace")
+
+JOURNAL_DIR = CACHE_DIR / "replace-journal"
+MAX_WORKERS = 8
+MAX_DIFF_CHARS = 20_000
+DIFF_CONTEXT = 2
+
+
+class ReplaceError(Exception):
+    """A bulk replace could not be applied; nothing was left half-written."""
+
+
+@dataclass
+class ReplaceChange:
+    path: Path
+    replacements: int
+    mtime: float
+    size: int
+    diff: str = ""
+
+
+def _map(fn, items: list) -> list:
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(items))) as pool:
+        return list(pool.map(fn, items))
+
+
+# --- Planning ---
+
+def plan_replace(
+    candidates: list[Path],
+    search: bytes,
+    replace: bytes,
+    root: Path,
+    with_diff: bool = False,
+) -> list[ReplaceChange]:
+    """Changes replacing ``search`` with ``replace`` would make, in candidate order."""
+
+    def plan_one(path: Path) -> ReplaceChange | None:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        with open_buffer(path) as data:
+            if data is None or data.find(search) < 0:
+                return None
+            content = data[:]
+        change = ReplaceChange(path, content.count(search), st.st_mtime, st.st_size)
+        if with_diff:
+            change.diff = _diff(path.relative_to(root).as_posix(), content, content.replace(search, replace))
+        return change
+
+    return [c for c in _map(plan_one, candidates) if c is not None]
+
+
+def _diff(rel: str, before: bytes, after: bytes) -> str:
+    text = "".join(difflib.unified_diff(
+        before.decode("utf-8", errors="replace").splitlines(keepends=True),
+        after.decode("utf-8", errors="replace").splitlines(keepends=True),
+        fromfile=f"a/{rel}",
+        tofile=f"b/{rel}",
+        n=DIFF_CONTEXT,
+    ))
+    if len(text) > MAX_DIFF_CHARS:
+        text = text[:MAX_DIFF_CHARS] + "\n... (diff truncated)\n"
+    return text
+
+
+# --- Applying ---
+
+def apply_replace(changes: list[ReplaceChange], search: bytes, replace: bytes) -> int:
+    """Apply planned ``changes`` atomically; returns the replacements made.
+
+    Raises ReplaceError if a file changed since it was planned or any write
+    fails — the tree is then exactly as it was before the call.
+    """
+    if not changes:
+        return 0
+    txid = uuid.uuid4().hex[:12]
+    journal = JOURNAL_DIR / txid
+    entries = [
+        {
+            "path": str(c.path),
+            "tmp": str(c.path.with_name(f".{c.path.name}.{txid}.tmp")),
+            "backup": str(journal / f"{i}.orig"),
+        }
+        for i, c in enumerate(changes)
+    ]
+    manifest = journal / "manifest.json"
+    try:
+        journal.mkdir(parents=True, exist_ok=True)
+        _write_manifest(manifest, "staging", entries)
+    except OSError as e:
+        raise ReplaceError(f"Could not write replace journal: {e}")
+
+    def stage(pair: tuple[ReplaceChange, dict]) -> int:
+        change, entry = pair
+        st = change.path.stat()
+        if (st.st_mtime, st.st_size) != (change.mtime, change.size):
+            raise ReplaceError(f"{change.path} changed since the replace was planned")
+        content = change.path.read_bytes()
+        Path(entry["backup"]).write_bytes(content)
+        tmp = Path(entry["tmp"])
+        new_content = content.replace(search, replace)
+        tmp.write_bytes(new_content)
+        entry["digest"] = _digest(new_content)
+        os.chmod(tmp, st.st_mode & 0o7777)
+        return content.count(search)
+
+    try:
+        counts = _map(stage, list(zip(changes, entries)))
+    except (OSError, ReplaceError) as e:
+        _discard(entries, journal)
+        if isinstance(e, ReplaceError):
+            raise
+        raise ReplaceError(f"Could not stage replacement: {e}")
+
+    # From here on a crash leaves a journal that recover_journals rolls back
+    try:
+        _write_manifest(manifest, "committing", entries)
+    except OSError as e:
+        _discard(entries, journal)
+        raise ReplaceError(f"Could not write replace journal: {e}")
+
+    done = 0
+    try:
+        for entry in entries:
+            os.replace(entry["tmp"], entry["path"])
+            done += 1
+    except OSError as e:
+        failed = _rollback(entries[:done])
+        _discard(entries, journal if not failed else None)
+        if failed:
+            raise ReplaceError(
+                f"Replace failed ({e}) and {len(failed)} file(s) could not be restored; "
+                f"originals are kept in {journal}"
+            )
+        raise ReplaceError(f"Replace failed and was rolled back: {e}")
+
+    # Every target is replaced: drop the manifest first so a crash while the
+    # backups are being removed cannot roll the replace back
+    try:
+        manifest.unlink()
+    except OSError as e:
+        logger.warning(f"Could not remove replace manifest {manifest}: {e}")
+    shutil.rmtree(journal, ignore_errors=True)
+    return sum(counts)
+
+
+def _digest(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def _write_manifest(manifest: Path, state: str, entries: list[dict]):
+    tmp = manifest.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"state": state, "entries": entries}))
+    os.replace(tmp, manifest)
+
+
+def _rollback(entries: list[dict], verify: bool = False) -> list[str]:
+    """Restore originals from the journal; returns paths that could not be restored.
+
+    With ``verify``, only targets whose content is still what the replace
+    wrote are restored: others were never replaced or were edited since.
+    """
+    failed: list[str] = []
+    for entry in entries:
+        target = Path(entry["path"])
+        tmp = Path(entry["tmp"])
+        if verify:
+            try:
+                current = _digest(target.read_bytes())
+            except OSError:
+                current = None
+            if current != entry.get("digest"):
+                logger.info(f"Not restoring {target}: not replaced, or edited since")
+                continue
+        try:
+            shutil.copyfile(entry["backup"], tmp)
+            if target.exists():
+                os.chmod(tmp, target.stat().st_mode & 0o7777)
+            os.replace(tmp, target)
+        except OSError as e:
+            logger.error(f"Could not restore {target}: {e}")
+            failed.append(str(target))
+    return failed
+
+
+def _discard(entries: list[dict], journal: Path | None):
+    for entry in entries:
+        try:
+            os.unlink(entry["tmp"])
+        except OSError:
+            pass
+    if journal is not None:
+        shutil.rmtree(journal, ignore_errors=True)
+
+
+def recover_journals():
+    """Roll back replaces interrupted by a crash; called once at startup."""
+    if not JOURNAL_DIR.is_dir():
+        return
+    for journal in JOURNAL_DIR.iterdir():
+        try:
+            manifest = json.loads((journal / "manifest.json").read_text())
+            state, entries = manifest["state"], manifest["entries"]
+        except (OSError, ValueError, KeyError):
+            shutil.rmtree(journal, ignore_errors=True)
+            continue
+        failed: list[str] = []
+        if state == "committing":
+            failed = _rollback(entries, verify=True)
+            logger.warning(f"Rolled back interrupted replace {journal.name} ({len(entries)} files)")
+        # A replace that crashed while staging never touched its targets
+        _discard(entries, journal if not failed else None)
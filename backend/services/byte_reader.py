@@ -0,0 +1,131 @@
+"""Byte-level file reading shared by search and the code scanners.
+
+Files are scanned as ``bytes`` and only the lines that matter are decoded.
+Large files are memory-mapped rather than read, so a scan over a
+vendor-heavy tree does not allocate a copy of every file. A NUL byte near the
+start marks a file as binary, whatever its extension.
+"""
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+# Bytes sniffed for a NUL to decide a file is binary
+BINARY_SNIFF_BYTES = 8192
+# Files at least this large are mapped; smaller ones are cheaper to read whole
+MMAP_MIN_SIZE = 1024 * 1024
+# Mapped files are lowered / newline-counted this many bytes at a time
+WINDOW_SIZE = 1024 * 1024
+
+Buffer = bytes | mmap.mmap
+
+
+def is_binary(buf: Buffer) -> bool:
+    return buf.find(b"\0", 0, BINARY_SNIFF_BYTES) >= 0
+
+
+@contextmanager
+def open_buffer(path: str | Path, skip_binary: bool = True) -> Iterator[Buffer | None]:
+    """Contents of ``path`` as bytes or a read-only map, valid inside the block.
+
+    Yields None when the file cannot be read, or is binary and
+    ``skip_binary`` is set.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        yield None
+        return
+    with f:
+        try:
+            if os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buf = f.read()
+        except (OSError, ValueError):
+            buf = None
+        try:
+            yield None if buf is None or (skip_binary and is_binary(buf)) else buf
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+
+def count_newlines(buf: Buffer, start: int = 0, end: int | None = None) -> int:
+    if end is None:
+        end = len(buf)
+    if isinstance(buf, bytes):
+        return buf.count(b"\n", start, end)
+    total = 0
+    for pos in range(start, end, WINDOW_SIZE):
+        total += buf[pos:min(pos + WINDOW_SIZE, end)].count(b"\n")
+    return total
+
+
+def line_bounds(buf: Buffer, pos: int) -> tuple[int, int]:
+    """(start, end) of the line containing offset ``pos``, excluding the newline."""
+    start = buf.rfind(b"\n", 0, pos) + 1
+    end = buf.find(b"\n", pos)
+    return start, end if end >= 0 else len(buf)
+
+
+def decode_line(buf: Buffer, start: int, end: int, errors: str = "ignore") -> str:
+    return buf[start:end].decode("utf-8", errors=errors).rstrip("\r")
+
+
+def iter_matching_lines(
+    buf: Buffer,
+    pattern: re.Pattern[bytes],
+    errors: str = "ignore",
+) -> Iterator[tuple[int, str]]:
+    """(line number, decoded line) for each line ``pattern`` matches on.
+
+    ``pattern`` is a cheap byte-level prefilter; callers re-check the decoded
+    line with their real pattern.
+    """
+    size = len(buf)
+    line_no = 1
+    counted_to = 0
+    pos = 0
+    while pos < size:
+        m = pattern.search(buf, pos)
+        if m is None:
+            return
+        start, end = line_bounds(buf, m.start())
+        line_no += count_newlines(buf, counted_to, start)
+        counted_to = start
+        yield line_no, decode_line(buf, start, end, errors)
+        pos = end + 1
+
+
+class FoldedView:
+    """``find`` over the ASCII-lowercased contents of a buffer.
+
+    Needles must already be lowercase. Bytes are lowered once; a mapped file
+    is lowered one window at a time, so it is never copied whole.
+    """
+
+    def __init__(self, buf: Buffer):
+        self._buf = buf
+        self._size = len(buf)
+        self._whole = isinstance(buf, bytes) or self._size <= WINDOW_SIZE
+        self._start = 0
+        self._data = buf[:].lower() if self._whole else b""
+
+    def find(self, needle: bytes, start: int = 0) -> int:
+        if self._whole:
+            return self._data.find(needle, start)
+        n = len(needle)
+        pos = start
+        while pos + n <= self._size:
+            if not (self._start <= pos and pos + n <= self._start + len(self._data)):
+                self._start = pos
+                self._data = self._buf[pos:pos + WINDOW_SIZE + n - 1].lower()
+            i = self._data.find(needle, pos - self._start)
+            if i >= 0:
+                return self._start + i
+            # Next window overlaps by n - 1 bytes so no match straddles a seam
+            pos = self._start + len(self._data) - n + 1
+        return -1
@@ -0,0 +1,581 @@
+"""Per-symbol complexity metrics for Python and TS/JS sources.
+
+Python is measured on its ``ast``; TS/JS on a lightweight tokenizer that
+understands strings, template literals, comments and regex literals well
+enough to find every function, method and arrow body. For each symbol:
+
+- cyclomatic — McCabe: 1 + decision points (branches, loops, handlers,
+  ternaries, boolean operators);
+- cognitive — SonarSource-style: structures cost 1 plus their nesting level,
+  ``elif``/``else`` and each run of mixed boolean operators cost 1;
+- nesting — deepest structural nesting inside the body;
+- length — lines from the definition to the end of its body.
+
+Nested named functions are separate symbols and do not count towards their
+parent; lambdas and anonymous callbacks do, one nesting level deeper.
+"""
+import ast
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+logger = logging.getLogger("complexity_metrics")
+
+PYTHON_EXTENSIONS = {".py"}
+SCRIPT_EXTENSIONS = {".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs"}
+# Larger files (bundles, generated code) are not measured
+MAX_ANALYZED_SIZE = 1024 * 1024
+# Below this many items the process pool costs more than it saves
+PARALLEL_MIN_FILES = 32
+
+
+@dataclass(slots=True)
+class SymbolMetrics:
+    name: str  # qualified, e.g. "Parser.parse"
+    start_line: int
+    length: int
+    cyclomatic: int
+    cognitive: int
+    nesting: int
+
+
+def analyze_source(source: str, extension: str) -> list[SymbolMetrics]:
+    """Metrics for every function-like symbol in ``source``, in source order."""
+    if extension in PYTHON_EXTENSIONS:
+        return python_symbols(source)
+    if extension in SCRIPT_EXTENSIONS:
+        return script_symbols(source)
+    return []
+
+
+# --- Python ---
+
+class _PyComplexity(ast.NodeVisitor):
+    """Complexity of one function body; nested defs and classes are skipped."""
+
+    def __init__(self):
+        self.cyclomatic = 1
+        self.cognitive = 0
+        self.nesting = 0
+        self.max_nesting = 0
+
+    def measure(self, node: ast.FunctionDef | ast.AsyncFunctionDef):
+        for child in node.args.defaults + node.args.kw_defaults:
+            if child is not None:
+                self.visit(child)
+        self._visit_block(node.body, nested=False)
+
+    def _visit_block(self, nodes: list, nested: bool = True):
+        if nested:
+            self.nesting += 1
+            self.max_nesting = max(self.max_nesting, self.nesting)
+        for child in nodes:
+            self.visit(child)
+        if nested:
+            self.nesting -= 1
+
+    def _structure(self):
+        self.cyclomatic += 1
+        self.cognitive += 1 + self.nesting
+
+    # Nested scopes are measured as symbols of their own
+    def visit_FunctionDef(self, node):
+        pass
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+    visit_ClassDef = visit_FunctionDef
+
+    def visit_Lambda(self, node: ast.Lambda):
+        self._visit_block([node.body])
+
+    def visit_If(self, node: ast.If, is_elif: bool = False):
+        if is_elif:
+            self.cyclomatic += 1
+            self.cognitive += 1
+        else:
+            self._structure()
+        self.visit(node.test)
+        self._visit_block(node.body)
+        orelse = node.orelse
+        if len(orelse) == 1 and isinstance(orelse[0], ast.If) and orelse[0].col_offset == node.col_offset:
+            self.visit_If(orelse[0], is_elif=True)
+        elif orelse:
+            self.cognitive += 1
+            self._visit_block(orelse)
+
+    def _visit_loop(self, node):
+        self._structure()
+        for field in ("target", "iter", "test"):
+            if hasattr(node, field):
+                self.visit(getattr(node, field))
+        self._visit_block(node.body)
+        if node.orelse:
+            self.cognitive += 1
+            self._visit_block(node.orelse)
+
+    visit_For = visit_AsyncFor = visit_While = _visit_loop
+
+    def visit_Try(self, node):
+        self._visit_block(node.body, nested=False)
+        for handler in node.handlers:
+            self._structure()
+            if handler.type is not None:
+                self.visit(handler.type)
+            self._visit_block(handler.body)
+        self._visit_block(node.orelse, nested=False)
+        self._visit_block(node.finalbody, nested=False)
+
+    visit_TryStar = visit_Try
+
+    def visit_Match(self, node):
+        self.cognitive += 1 + self.nesting
+        self.visit(node.subject)
+        for case in node.cases:
+            self.cyclomatic += 1
+            if case.guard is not None:
+                self.visit(case.guard)
+            self._visit_block(case.body)
+
+    def visit_IfExp(self, node: ast.IfExp):
+        self._structure()
+        self._visit_block([node.test, node.body, node.orelse])
+
+    def visit_BoolOp(self, node: ast.BoolOp):
+        self.cyclomatic += len(node.values) - 1
+        self.cognitive += 1
+        for value in node.values:
+            self.visit(value)
+
+    def visit_comprehension(self, node: ast.comprehension):
+        self.cyclomatic += 1 + len(node.ifs)
+        self.cognitive += 1 + len(node.ifs)
+        self.generic_visit(node)
+
+
+def python_symbols(source: str) -> list[SymbolMetrics]:
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    results: list[SymbolMetrics] = []
+
+    def walk(body: list, scope: list[str]):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                measure = _PyComplexity()
+                measure.measure(node)
+                results.append(SymbolMetrics(
+                    name=".".join(scope + [node.name]),
+                    start_line=node.lineno,
+                    length=(node.end_lineno or node.lineno) - node.lineno + 1,
+                    cyclomatic=measure.cyclomatic,
+                    cognitive=measure.cognitive,
+                    nesting=measure.max_nesting,
+                ))
+                walk(node.body, scope + [node.name])
+            elif isinstance(node, ast.ClassDef):
+                walk(node.body, scope + [node.name])
+            else:
+                # Definitions inside if/try/with blocks at any level
+                for field in ("body", "orelse", "finalbody", "handlers", "cases"):
+                    children = getattr(node, field, None)
+                    if isinstance(children, list):
+                        walk(children, scope)
+
+    walk(tree.body, [])
+    results.sort(key=lambda s: s.start_line)
+    return results
+
+
+# --- TS / JS ---
+
+_SCRIPT_TOKEN = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*")
+  | (?P<ident>[A-Za-z_$][\w$]*)
+  | (?P<number>\.?\d[\w.]*)
+  | (?P<punct>=>|\?\?=?|\?\.|&&=?|\|\|=?|[=!]==?|\.\.\.|[{}()\[\];,:?<>=!+\-*/%&|^~.@#`])
+  | (?P<other>.)
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+_REGEX_LITERAL = re.compile(r"/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[a-z]*")
+# After these a "/" starts a regex literal rather than a division
+_REGEX_PRECEDERS = {
+    "(", ",", "=", ":", "[", "!", "&", "|", "?", "{", "}", ";", "+", "-", "*", "%",
+    "<", ">", "~", "^", "=>", "&&", "||", "??", "==", "===", "!=", "!==",
+    "return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw", "yield", "await",
+}
+SCRIPT_KEYWORDS = {
+    "if", "else", "for", "while", "do", "switch", "case", "default", "catch", "try", "finally",
+    "function", "return", "new", "typeof", "instanceof", "in", "of", "var", "let", "const",
+    "class", "extends", "import", "export", "throw", "await", "yield", "delete", "void", "super", "this",
+}
+_METHOD_PRECEDERS = {
+    "{", "}", ";", ",", "*", "async", "static", "get", "set", "public", "private",
+    "protected", "readonly", "override", "abstract", "@",
+}
+_BRACKETS = {"(": ")", "[": "]", "{": "}"}
+
+
+def tokenize_script(source: str) -> list[tuple[str, int]]:
+    """Significant tokens as (text, line); strings and templates become placeholders."""
+    tokens: list[tuple[str, int]] = []
+    pos = 0
+    line = 1
+    size = len(source)
+    while pos < size:
+        ch = source[pos]
+        if ch == "`":
+            end = _skip_template(source, pos)
+            tokens.append(("`", line))
+            line += source.count("\n", pos, end)
+            pos = end
+            continue
+        if ch == "/" and source[pos + 1:pos + 2] not in ("/", "*"):
+            prev = tokens[-1][0] if tokens else "("
+            if prev in _REGEX_PRECEDERS:
+                m = _REGEX_LITERAL.match(source, pos)
+                if m:
+                    tokens.append(("/re/", line))
+                    pos = m.end()
+                    continue
+        m = _SCRIPT_TOKEN.match(source, pos)
+        kind = m.lastgroup
+        text = m.group()
+        if kind == "string":
+            tokens.append(("'", line))
+        elif kind not in ("ws", "comment"):
+            tokens.append((text, line))
+        line += text.count("\n")
+        pos = m.end()
+    return tokens
+
+
+def _skip_template(source: str, pos: int) -> int:
+    """Index just past the template literal starting at ``pos``."""
+    i = pos + 1
+    depth = 0
+    size = len(source)
+    while i < size:
+        ch = source[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if depth == 0:
+            if ch == "`":
+                return i + 1
+            if source.startswith("${", i):
+                depth = 1
+                i += 2
+                continue
+        else:
+            if ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+            elif ch == "`":
+                # Nested template inside ${...}
+                i = _skip_template(source, i)
+                continue
+        i += 1
+    return size
+
+
+def match_brackets(tokens: list[tuple[str, int]]) -> dict[int, int]:
+    pairs: dict[int, int] = {}
+    stack: list[int] = []
+    for i, (text, _) in enumerate(tokens):
+        if text in _BRACKETS:
+            stack.append(i)
+        elif text in (")", "]", "}"):
+            while stack:
+                j = stack.pop()
+                if _BRACKETS[tokens[j][0]] == text:
+                    pairs[j] = i
+                    pairs[i] = j
+                    break
+    return pairs
+
+
+class _ScriptSymbol:
+    __slots__ = ("name", "start_line", "end_line", "cyclomatic", "cognitive", "max_nesting", "depth")
+
+    def __init__(self, name: str, start_line: int):
+        self.name = name
+        self.start_line = start_line
+        self.end_line = start_line
+        self.cyclomatic = 1
+        self.cognitive = 0
+        self.max_nesting = 0
+        self.depth = 0  # current nesting inside this symbol
+
+
+def script_symbols(source: str) -> list[SymbolMetrics]:
+    tokens = tokenize_script(source)
+    pairs = match_brackets(tokens)
+    n = len(tokens)
+
+    def text(i: int) -> str:
+        return tokens[i][0] if 0 <= i < n else ""
+
+    def is_ident(i: int) -> bool:
+        t = text(i)
+        return bool(t) and (t[0].isalpha() or t[0] in "_$")
+
+    # Braces that open control-structure bodies, and "while"s that close a do-loop
+    control: set[int] = set()
+    do_tails: set[int] = set()
+    for i, (t, _) in enumerate(tokens):
+        if t in ("if", "for", "while", "switch", "catch"):
+            j = i + 1
+            if t == "for" and text(j) == "await":
+                j += 1
+            if text(j) == "(" and j in pairs:
+                j = pairs[j] + 1
+            if text(j) == "{":
+                control.add(j)
+        elif t in ("else", "do") and text(i + 1) == "{":
+            control.add(i + 1)
+            if t == "do" and i + 1 in pairs and text(pairs[i + 1] + 1) == "while":
+                do_tails.add(pairs[i + 1] + 1)
+
+    def header_paren(brace: int) -> int | None:
+        """Index of the ")" closing a parameter list before ``brace``, skipping a return type."""
+        if text(brace - 1) == ")":
+            return brace - 1
+        k = brace - 1
+        while k > 0 and brace - k < 40:
+            t = text(k)
+            if t in (";", "{", "}", "="):
+                return None
+            if t == ")" and text(k + 1) == ":":
+                return k
+            if t in (")", "]", "}") and k in pairs:
+                k = pairs[k]
+            k -= 1
+        return None
+
+    def assigned_name(k: int) -> str | None:
+        """Name a function expression starting at token ``k`` is bound to."""
+        if text(k - 1) == "async":
+            k -= 1
+        if text(k - 1) not in ("=", ":"):
+            return None
+        j = k - 2
+        name = text(j) if is_ident(j) else None
+        # `name: Type = ...` — walk back over the annotation
+        steps = 0
+        while j > 0 and steps < 16 and text(j) not in (";", "{", "}", ",", "(", "=>"):
+            if text(j) == ":" and is_ident(j - 1):
+                name = text(j - 1)
+            j -= 1
+            steps += 1
+        return name if name not in SCRIPT_KEYWORDS else None
+
+    def classify(brace: int) -> tuple[str, str | None]:
+        """('control' | 'function' | 'class' | 'block', name) for an opening brace."""
+        if brace in control:
+            return "control", None
+        if text(brace - 1) == "=>":
+            head = brace - 2
+            close = header_paren(brace - 1)
+            if close is not None and close in pairs:
+                head = pairs[close]
+            if text(head - 1) == ">":
+                # Generic arrow: <T>(x) => {
+                depth = 0
+                while head > 0:
+                    head -= 1
+                    if text(head) == ">":
+                        depth += 1
+                    elif text(head) == "<":
+                        depth -= 1
+                        if depth == 0:
+                            break
+            return "function", assigned_name(head)
+        close = header_paren(brace)
+        if close is not None and close in pairs:
+            q = pairs[close] - 1
+            if text(q) == ">":
+                depth = 0
+                while q > 0:
+                    if text(q) == ">":
+                        depth += 1
+                    elif text(q) == "<":
+                        depth -= 1
+                        if depth == 0:
+                            q -= 1
+                            break
+                    q -= 1
+            if text(q) == "*":
+                q -= 1
+            if text(q) == "function":
+                return "function", assigned_name(q)
+            if is_ident(q) and text(q) not in SCRIPT_KEYWORDS:
+                before = q - 1
+                if text(before) == "*":
+                    before -= 1
+                if text(before) == "function":
+                    return "function", text(q)
+                if before < 0 or text(before) in _METHOD_PRECEDERS or text(before) == "constructor":
+                    return "function", text(q)
+            if text(q) == "constructor":
+                return "function", "constructor"
+            return "block", None
+        # class Name [extends X] [implements Y, Z] {
+        k = brace - 1
+        while k >= 0 and brace - k < 24 and text(k) not in (";", "{", "}", "(", ")", "="):
+            if text(k) == "class":
+                return "class", text(k + 1) if is_ident(k + 1) and text(k + 1) != "extends" else None
+            k -= 1
+        return "block", None
+
+    results: list[SymbolMetrics] = []
+    # Frames: (kind, symbol owning it, class name)
+    stack: list[tuple[str, _ScriptSymbol | None, str | None]] = []
+    symbol: _ScriptSymbol | None = None
+    last_logical: str | None = None
+
+    def scope_names() -> list[str]:
+        names: list[str] = []
+        for kind, sym, class_name in stack:
+            if kind == "class" and class_name:
+                names.append(class_name)
+            elif kind == "symbol" and sym is not None:
+                names = [sym.name]
+        return names
+
+    for i, (t, line) in enumerate(tokens):
+        if t == "{":
+            kind, name = classify(i)
+            if kind == "function" and (name or symbol is None):
+                sym = _ScriptSymbol(".".join(scope_names() + [name or "<anonymous>"]), _definition_line(tokens, i, pairs))
+                stack.append(("symbol", sym, None))
+                symbol = sym
+            elif kind in ("function", "control"):
+                stack.append(("nest", symbol, None))
+                if symbol is not None:
+                    symbol.depth += 1
+                    symbol.max_nesting = max(symbol.max_nesting, symbol.depth)
+            elif kind == "class":
+                stack.append(("class", symbol, name))
+            else:
+                stack.append(("block", symbol, None))
+            last_logical = None
+            continue
+        if t == "}":
+            if stack:
+                kind, sym, _ = stack.pop()
+                if kind == "symbol" and sym is not None:
+                    sym.end_line = line
+                    results.append(SymbolMetrics(
+                        name=sym.name,
+                        start_line=sym.start_line,
+                        length=sym.end_line - sym.start_line + 1,
+                        cyclomatic=sym.cyclomatic,
+                        cognitive=sym.cognitive,
+                        nesting=sym.max_nesting,
+                    ))
+                    symbol = next((s for k, s, _ in reversed(stack) if k == "symbol"), None)
+                elif kind == "nest" and sym is not None:
+                    sym.depth -= 1
+            last_logical = None
+            continue
+        if symbol is None:
+            continue
+
+        nesting = symbol.depth
+        if t == "if":
+            symbol.cyclomatic += 1
+            symbol.cognitive += 1 if text(i - 1) == "else" else 1 + nesting
+        elif t in ("for", "do", "switch", "catch") or (t == "while" and i not in do_tails):
+            if t != "switch":
+                symbol.cyclomatic += 1
+            symbol.cognitive += 1 + nesting
+        elif t == "else" and text(i + 1) != "if":
+            symbol.cognitive += 1
+        elif t == "case":
+            symbol.cyclomatic += 1
+        elif t == "?" and text(i + 1) not in (":", ")", ",", "=", ";"):
+            symbol.cyclomatic += 1
+            symbol.cognitive += 1 + nesting
+        elif t in ("&&", "||", "??"):
+            symbol.cyclomatic += 1
+            if t != last_logical:
+                symbol.cognitive += 1
+            last_logical = t
+            continue
+        elif t in ("(", ")", ";", ",", "=", "?", ":"):
+            last_logical = None
+
+    results.sort(key=lambda s: s.start_line)
+    return results
+
+
+def _definition_line(tokens: list[tuple[str, int]], brace: int, pairs: dict[int, int]) -> int:
+    """Line where the definition owning ``brace`` starts (its name or keyword)."""
+    k = brace - 1
+    if tokens[k][0] == "=>":
+        k -= 1
+    # Walk back over parameters, a return type and the name
+    steps = 0
+    while k > 0 and steps < 64:
+        t = tokens[k][0]
+        if t in (")", "]") and k in pairs:
+            k = pairs[k]
+        elif t in (";", "{", "}", ",", "(", "=>"):
+            return tokens[k + 1][1]
+        k -= 1
+        steps += 1
+    return tokens[max(k, 0)][1]
+
+
+# --- Process pool ---
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = os.cpu_count() or 4
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the server is multi-threaded, forking it is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def map_files(fn: Callable, items: list) -> list:
+    """``[fn(item) for item in items]``, on the process pool when there are enough items.
+
+    Items are file paths or (contents, extension) pairs. ``fn`` must be a
+    module-level function so workers can import it.
+    """
+    if len(items) < PARALLEL_MIN_FILES:
+        return [fn(item) for item in items]
+    chunksize = max(1, len(items) // (_pool_workers * 4))
+    try:
+        return list(_get_pool().map(fn, items, chunksize=chunksize))
+    except Exception as e:
+        logger.warning(f"Metrics pool failed, analysing in-process: {e}")
+        return [fn(item) for item in items]
+
+
+def shutdown_metrics_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -8,6 +8,7 @@ from pathlib import Path
 
 from models.signal_refinery import UnifiedSignal, UnifiedSignalSource
 from models.mission import Signal, SignalSource
+from services.workspace_index import get_workspace_index
 
 logger = logging.getLogger("context_aggregator")
 
@@ -257,10 +258,7 @@ class ContextAggregator:
             return signals
 
         # Build set of project file paths (relative)
-        project_files: set[str] = set()
-        for p in root.rglob("*"):
-            if p.is_file() and not _is_skip_path(p):
-                project_files.add(str(p.relative_to(root)))
+        project_files = {str(p) for p in project_file_paths(root)}
 
         for sig in signals:
             if sig.file_path:
@@ -317,11 +315,7 @@ class ContextAggregator:
         if workspace_root:
             root = Path(workspace_root)
             if root.exists():
-                for p in root.rglob("*"):
-                    if p.is_file() and not _is_skip_path(p):
-                        project_files.append(str(p.relative_to(root)))
-                        if len(project_files) >= 200:
-                            break
+                project_files = [str(p) for p in project_file_paths(root, limit=200)]
 
         # Prepare signals data for prompt
         signals_data = []
@@ -444,5 +438,10 @@ _SKIP_DIRS = {
 }
 
 
-def _is_skip_path(path: Path) -> bool:
-    return any(part in _SKIP_DIRS for part in path.parts)
+def project_file_paths(root: Path, limit: int | None = None) -> list[Path]:
+    """Project files relative to ``root``, served from the shared workspace index."""
+    index = get_workspace_index(root)
+    entries = index.paths(under=root, exclude_dirs=_SKIP_DIRS)
+    if limit is not None:
+        entries = entries[:limit]
+    return [p.relative_to(root) for p in entries]
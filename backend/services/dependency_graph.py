@@ -0,0 +1,459 @@
+"""DependencyGraph — the workspace import graph, kept up to date in memory.
+
+Each source file's import specifiers are parsed once and kept with the
+file's content hash. The graph subscribes to the workspace index's change
+sets, so a sync only looks at the paths reported since the last one: files
+whose (mtime, size) moved are re-read outside the graph lock, and of those
+only files whose content hash changed are re-parsed. A new or deleted file
+re-resolves just the specifiers that could name it (see
+``ImportResolver.update``); only an edited tsconfig/package.json resolves
+everything again. Specifiers are resolved against the
+in-memory file set into a ``CSRGraph``: interned node ids with flat
+forward and reverse edge arrays, so even a 100k-file tree's edges take a few
+MB and dependents of a file are an array slice. Names only come back out at
+query results, and pydantic models only at the API edge. Parsed imports are
+persisted per workspace so a restart does not re-read the tree.
+
+``impact`` walks the reverse edges breadth-first for transitive dependents;
+results are cached per (file, depth) until the graph changes, as are
+``analysis`` (cycles, layers, centrality; see ``graph_analysis``) and
+``communities`` (Louvain levels; see ``graph_clustering``). The persisted
+imports are rewritten at most every ``SAVE_INTERVAL`` seconds.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+
+from services.byte_reader import count_newlines, open_buffer
+from services.csr_graph import CSRGraph
+from services.dependency_service import ALL_SKIP, EXT_TYPE, SOURCE_EXTENSIONS, extract_imports
+from services.graph_analysis import GraphAnalysis, analyze_graph, cycle_path
+from services.graph_clustering import louvain_levels
+from services.import_resolver import CONFIG_NAMES, ImportResolver
+from services.workspace_index import CACHE_DIR, FileEntry, WorkspaceIndex, cache_path, get_workspace_index
+
+logger = logging.getLogger("dependency_graph")
+
+# Bumped when the persisted import format changes
+CACHE_VERSION = 2
+# Cached impact queries; dropped wholesale when the graph changes
+IMPACT_CACHE_SIZE = 512
+# Minimum seconds between rewrites of the persisted imports
+SAVE_INTERVAL = 60.0
+
+
+@dataclass(slots=True)
+class SourceRecord:
+    mtime: float
+    size: int
+    digest: str
+    lines: int
+    imports: list[str]
+
+
+@dataclass(frozen=True, slots=True)
+class Impact:
+    path: str
+    hops: int  # shortest import distance to the changed file
+    paths: int  # shortest import chains reaching the changed file
+    fan_in: int  # files importing this one
+
+
+def _read_record(path: Path, mtime: float, size: int, previous: SourceRecord | None) -> SourceRecord:
+    with open_buffer(path) as data:
+        if data is None:
+            return SourceRecord(mtime, size, "", 0, [])
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if previous is not None and previous.digest == digest:
+            # Touched but not edited: keep the parsed imports
+            return SourceRecord(mtime, size, digest, previous.lines, previous.imports)
+        lines = count_newlines(data) + (1 if len(data) and data[-1:] != b"\n" else 0)
+        imports = extract_imports(data[:].decode("utf-8", errors="replace"), path.suffix)
+        return SourceRecord(mtime, size, digest, lines, imports)
+
+
+class DependencyGraph:
+    def __init__(self, root: Path):
+        self.root = root
+        # Bumped whenever an edge or node changes
+        self.generation = 0
+        self._records: dict[str, SourceRecord] = {}
+        self._csr = CSRGraph([])
+        self._loaded = False
+        self._synced = False
+        self._index: WorkspaceIndex | None = None
+        # Index paths reported changed since the last sync; None = rescan all
+        self._pending: set[str] | None = None
+        self._pending_lock = threading.Lock()
+        self._resolver: ImportResolver | None = None
+        # ``extends`` targets the resolver read; editing one re-resolves like a listed config
+        self._extended: frozenset[str] = frozenset()
+        # (importer directory, specifier) -> importers, to find whom a resolver update affects
+        self._users: dict[tuple[str, str], set[str]] = {}
+        self._impact_cache: dict[tuple[str, int | None], tuple[Impact, ...]] = {}
+        self._impact_generation = 0
+        self._analysis: tuple[int, GraphAnalysis] | None = None
+        self._communities: tuple[int, list[array]] | None = None
+        self._dirty = False
+        self._saved_at = 0.0  # never saved: the first change is written at once
+        # Held for a whole sync; queries only take ``_lock`` to swap results in
+        self._sync_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+
+    # --- Updates ---
+
+    def sync(self) -> bool:
+        """Bring the graph in line with the workspace index; True if it changed.
+
+        While another thread is syncing this returns False at once and the
+        caller reads the previous graph; only the very first sync waits.
+        """
+        if not self._sync_lock.acquire(blocking=not self._synced):
+            return False
+        try:
+            changed = self._sync()
+            self._synced = True
+        except Exception:
+            # The reported paths were taken; rescan rather than lose them
+            with self._pending_lock:
+                self._pending = None
+            raise
+        finally:
+            self._sync_lock.release()
+        self._maybe_save()
+        return changed
+
+    def _on_workspace_change(self, changed: set[str], removed: set[str]):
+        with self._pending_lock:
+            if self._pending is not None:
+                self._pending |= changed
+                self._pending |= removed
+
+    def _sync(self) -> bool:
+        index = get_workspace_index(self.root)
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                self._load()
+        if index is not self._index:
+            if self._index is not None:
+                self._index.unsubscribe(self._on_workspace_change)
+            with self._pending_lock:
+                self._pending = None
+            self._index = index
+            index.subscribe(self._on_workspace_change)
+        with self._pending_lock:
+            pending, self._pending = self._pending, set()
+        prefix = index.relative(self.root) or ""
+        if pending is None:
+            return self._rescan(index, prefix)
+        if not pending:
+            return False
+
+        # Only the reported paths: sources re-read, configs force a full resolve
+        sources: dict[str, FileEntry | None] = {}
+        configs_changed = False
+        for path in pending:
+            if prefix:
+                if not path.startswith(f"{prefix}/"):
+                    continue
+                rel = path[len(prefix) + 1:]
+            else:
+                rel = path
+            directory, _, name = rel.rpartition("/")
+            if directory and any(part in ALL_SKIP for part in directory.split("/")):
+                continue
+            if name in CONFIG_NAMES or rel in self._extended:
+                configs_changed = True
+            elif os.path.splitext(name)[1].lower() in SOURCE_EXTENSIONS:
+                sources[rel] = index.get(path)
+
+        # Files are read without the lock; only this thread changes records
+        records = self._records
+        fresh = {
+            rel: _read_record(self.root / rel, entry.mtime, entry.size, old)
+            for rel, entry in sources.items()
+            if entry is not None
+            and ((old := records.get(rel)) is None or (old.mtime, old.size) != (entry.mtime, entry.size))
+        }
+        removed = [rel for rel, entry in sources.items() if entry is None and rel in records]
+        added = [rel for rel in fresh if rel not in records]
+        reparsed = {rel for rel, record in fresh.items() if rel not in records or record.imports is not records[rel].imports}
+        if not fresh and not removed and not configs_changed:
+            return False
+        with self._lock:
+            for rel in reparsed:
+                if rel in records:
+                    self._track_users(rel, records[rel].imports, False)
+            for rel in removed:
+                self._track_users(rel, records[rel].imports, False)
+                del records[rel]
+            records.update(fresh)
+            for rel in reparsed:
+                self._track_users(rel, records[rel].imports, True)
+            self._dirty = True
+
+        if configs_changed or self._resolver is None:
+            csr = self._resolve_all(index, prefix)
+        elif added or removed:
+            changed = self._resolver.update(added, removed)
+            affected = {
+                rel
+                for python, directory, spec in changed
+                for rel in self._users.get((directory, spec), ())
+                if (EXT_TYPE.get(os.path.splitext(rel)[1]) == "python") == python
+            }
+            names = sorted(records)
+            ids = {rel: i for i, rel in enumerate(names)}
+            rows = {rel: self._targets(rel, ids) for rel in (reparsed | affected) - set(removed)}
+            csr = self._csr.with_nodes(names, rows)
+        elif reparsed:
+            ids = self._csr.ids
+            csr = self._csr.with_rows({ids[rel]: self._targets(rel, ids) for rel in reparsed})
+        else:
+            return False
+        with self._lock:
+            self._csr = csr
+            self.generation += 1
+        return True
+
+    def _rescan(self, index: WorkspaceIndex, prefix: str) -> bool:
+        """Full pass over the index: first sync, or a new index for the root."""
+        cut = len(prefix) + 1 if prefix else 0
+        entries = index.files(extensions=SOURCE_EXTENSIONS, under=self.root, exclude_dirs=ALL_SKIP)
+        previous = self._records
+        records: dict[str, SourceRecord] = {}
+        touched = False
+        for entry in entries:
+            rel = entry.path[cut:]
+            old = previous.get(rel)
+            if old is not None and (old.mtime, old.size) == (entry.mtime, entry.size):
+                records[rel] = old
+                continue
+            records[rel] = _read_record(self.root / rel, entry.mtime, entry.size, old)
+            touched = True
+        with self._lock:
+            self._records = records
+            self._dirty |= touched or records.keys() != previous.keys()
+            self._users = {}
+            for rel, record in records.items():
+                self._track_users(rel, record.imports, True)
+        csr = self._resolve_all(index, prefix)
+        with self._lock:
+            self._csr = csr
+            self.generation += 1
+        return True
+
+    def _resolve_all(self, index: WorkspaceIndex, prefix: str) -> CSRGraph:
+        """A fresh resolver (configs re-read) and every file's edges."""
+        cut = len(prefix) + 1 if prefix else 0
+        listed = [
+            entry.path[cut:]
+            for entry in index.files(extensions={".json"}, under=self.root, exclude_dirs=ALL_SKIP)
+            if entry.path.rpartition("/")[2] in CONFIG_NAMES
+        ]
+        self._resolver = ImportResolver(self._records, self._read_config, listed)
+        # Node ids are re-interned only when the file set changes
+        names = sorted(self._records)
+        ids = {rel: i for i, rel in enumerate(names)}
+        csr = CSRGraph(names, (self._targets(rel, ids) for rel in names))
+        # Resolving may have followed new ``extends`` chains
+        self._extended = frozenset(self._resolver.extended_configs - set(listed))
+        return csr
+
+    def _track_users(self, rel: str, imports: list[str], add: bool):
+        directory = rel.rpartition("/")[0]
+        for spec in imports:
+            key = (directory, spec)
+            if add:
+                self._users.setdefault(key, set()).add(rel)
+            elif key in self._users:
+                self._users[key].discard(rel)
+                if not self._users[key]:
+                    del self._users[key]
+
+    def _targets(self, rel: str, ids: dict[str, int]) -> set[int]:
+        resolve = self._resolver.resolve
+        targets = {ids.get(resolve(spec, rel)) for spec in self._records[rel].imports}
+        targets.discard(None)
+        targets.discard(ids[rel])
+        return targets
+
+    def _read_config(self, rel: str) -> str | None:
+        try:
+            return (self.root / rel).read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return None
+
+    # --- Queries ---
+
+    def __contains__(self, rel: str) -> bool:
+        return rel in self._records
+
+    def snapshot(self) -> CSRGraph:
+        """The current graph; never mutated, so safe to read without the lock."""
+        with self._lock:
+            return self._csr
+
+    def dependencies(self, rel: str) -> set[str]:
+        """Files ``rel`` imports."""
+        csr = self.snapshot()
+        i = csr.ids.get(rel)
+        return set() if i is None else {csr.names[t] for t in csr.successors(i)}
+
+    def dependents(self, rel: str) -> set[str]:
+        """Files importing ``rel``."""
+        csr = self.snapshot()
+        i = csr.ids.get(rel)
+        return set() if i is None else {csr.names[s] for s in csr.predecessors(i)}
+
+    def impact(self, rel: str, depth: int | None = None) -> tuple[Impact, ...]:
+        """Files depending on ``rel`` within ``depth`` hops (all when None).
+
+        Ranked by fan-in, then distance: a dependent many files import
+        spreads a change furthest.
+        """
+        key = (rel, depth)
+        with self._lock:
+            if self._impact_generation != self.generation:
+                self._impact_cache.clear()
+                self._impact_generation = self.generation
+            cached = self._impact_cache.get(key)
+            if cached is not None:
+                return cached
+
+            csr = self._csr
+            start = csr.ids.get(rel)
+            if start is None:
+                return ()
+            roffsets, rsources = csr.roffsets, csr.rsources
+            hops = {start: 0}
+            paths = {start: 1}
+            frontier = [start]
+            level = 0
+            while frontier and (depth is None or level < depth):
+                level += 1
+                found: dict[int, int] = {}
+                for node in frontier:
+                    for k in range(roffsets[node], roffsets[node + 1]):
+                        dependent = rsources[k]
+                        if dependent not in hops:
+                            found[dependent] = found.get(dependent, 0) + paths[node]
+                for dependent, count in found.items():
+                    hops[dependent] = level
+                    paths[dependent] = count
+                frontier = list(found)
+
+            del hops[start]
+            result = tuple(sorted(
+                (Impact(csr.names[i], hops[i], paths[i], csr.in_degree(i)) for i in hops),
+                key=lambda i: (-i.fan_in, i.hops, i.path),
+            ))
+            if len(self._impact_cache) >= IMPACT_CACHE_SIZE:
+                del self._impact_cache[next(iter(self._impact_cache))]
+            self._impact_cache[key] = result
+            return result
+
+    def analysis(self) -> GraphAnalysis:
+        """Cycles, layers and centrality of the whole graph."""
+        with self._lock:
+            if self._analysis is None or self._analysis[0] != self.generation:
+                self._analysis = (self.generation, analyze_graph(self._csr))
+            return self._analysis[1]
+
+    def communities(self) -> list[array]:
+        """Louvain community levels of the whole graph, finest first."""
+        with self._lock:
+            if self._communities is None or self._communities[0] != self.generation:
+                self._communities = (self.generation, louvain_levels(self._csr))
+            return self._communities[1]
+
+    def cycle_path(self, cycle: list[str]) -> list[str]:
+        with self._lock:
+            return cycle_path(cycle, self._csr)
+
+    def lines(self, rel: str) -> int:
+        record = self._records.get(rel)
+        return record.lines if record is not None else 0
+
+    def nodes(self, under: str = "") -> list[str]:
+        csr = self.snapshot()
+        start, end = csr.id_range(under)
+        return csr.names[start:end]
+
+    # --- Persistence ---
+
+    def _maybe_save(self, force: bool = False):
+        """Persist the imports if they changed and the last save is old enough.
+
+        The records are copied under the graph lock and written outside it.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            if not force and time.time() - self._saved_at < SAVE_INTERVAL:
+                return
+            records = list(self._records.items())
+            self._dirty = False
+            self._saved_at = time.time()
+        with self._save_lock:
+            if not self._save(records):
+                with self._lock:
+                    self._dirty = True
+
+    def _save(self, records: list[tuple[str, SourceRecord]]) -> bool:
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            target = cache_path(self.root, ".deps.json")
+            tmp = target.with_suffix(".tmp")
+            payload = {
+                "root": str(self.root),
+                "version": CACHE_VERSION,
+                "files": [
+                    [rel, r.mtime, r.size, r.digest, r.lines, r.imports]
+                    for rel, r in records
+                ],
+            }
+            tmp.write_text(json.dumps(payload, separators=(",", ":")))
+            os.replace(tmp, target)
+            return True
+        except OSError as e:
+            logger.warning(f"Could not persist dependency graph for {self.root}: {e}")
+            return False
+
+    def _load(self):
+        """Reuse persisted imports; edges are re-resolved on the first sync."""
+        try:
+            data = json.loads(cache_path(self.root, ".deps.json").read_text())
+        except (OSError, ValueError):
+            return
+        if data.get("root") != str(self.root) or data.get("version") != CACHE_VERSION:
+            return
+        self._records = {
+            rel: SourceRecord(mtime, size, digest, lines, imports)
+            for rel, mtime, size, digest, lines, imports in data.get("files", [])
+        }
+
+
+_graphs: dict[str, DependencyGraph] = {}
+_graphs_lock = threading.Lock()
+
+
+def get_dependency_graph(root: str | Path, sync: bool = True) -> DependencyGraph:
+    """Shared graph for ``root``, synced with the workspace index unless ``sync`` is False."""
+    resolved = Path(root).resolve()
+    with _graphs_lock:
+        graph = _graphs.get(str(resolved))
+        if graph is None:
+            graph = DependencyGraph(resolved)
+            _graphs[str(resolved)] = graph
+    if sync:
+        graph.sync()
+    return graph
@@ -1,8 +1,11 @@
-import os
 import re
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 
-from models.dependency import DepNode, DepEdge, DepGraphResponse
+from models.dependency import (
+    BlastRadiusResponse, DepCluster, DepClusterEdge, DepClusterResponse, DepNode, DepEdge,
+    DepGraphResponse, ImpactedFile,
+    SymbolDefinition, SymbolQueryResponse, SymbolReference,
+)
 from services.file_service import SKIP_DIRS
 
 SOURCE_EXTENSIONS = {".py", ".ts", ".tsx", ".js", ".jsx"}
@@ -17,7 +20,7 @@ ALL_SKIP = SKIP_DIRS | EXTRA_SKIP
 
 # Import patterns
 PY_IMPORT = re.compile(
-    r"^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w.]+))"
+    r"^\s*(?:from\s+([\w.]+)\s+import\b(.*)|import\s+([\w.]+(?:\s+as\s+\w+)?(?:\s*,\s*[\w.]+(?:\s+as\s+\w+)?)*))"
 )
 JS_IMPORT = re.compile(
     r"""(?:import\s+.*?\s+from\s+['"]([^'"]+)['"]|require\s*\(\s*['"]([^'"]+)['"]\s*\))"""
@@ -32,146 +35,197 @@ EXT_TYPE = {
 }
 
 
+JS_EXTENSIONS = [".ts", ".tsx", ".js", ".jsx"]
+
+
+def extract_imports(content: str, extension: str) -> list[str]:
+    """Import specifiers in ``content``, resolved later by ``ImportResolver``.
+
+    Python yields dotted modules, with ``from pkg import a`` as ``pkg.a`` (the
+    resolver falls back to ``pkg`` when ``a`` is not a module) and relative
+    imports keeping their leading dots. JS/TS yields the specifiers as written.
+    """
+    if EXT_TYPE.get(extension) == "python":
+        results = []
+        for line in content.splitlines():
+            m = PY_IMPORT.match(line)
+            if not m:
+                continue
+            if m.group(3):
+                results.extend(
+                    part.split()[0] for part in m.group(3).split(",")
+                )
+                continue
+            module = m.group(1)
+            names = [
+                name for part in m.group(2).split("#")[0].strip("()\\ \t").split(",")
+                if (name := part.split(" as ")[0].strip()).isidentifier()
+            ]
+            if not names:
+                results.append(module)
+            sep = "" if module.endswith(".") else "."
+            results.extend(f"{module}{sep}{name}" for name in names)
+        return results
+    return [spec for m in JS_IMPORT.finditer(content) if (spec := m.group(1) or m.group(2))]
+
+
 class DependencyService:
     def __init__(self, workspace_root: str):
         self.root = Path(workspace_root)
 
     MAX_NODES = 300
-    MAX_SOURCE_FILES = 5000
+    HIGH_BLAST_RADIUS = 5
 
     def build_graph(self, scope: str | None = None) -> DepGraphResponse:
-        base = self.root / scope if scope else self.root
-
-        # Phase 1: collect ALL source file paths (fast — no reading)
-        source_files: list[Path] = []
-        for dirpath, dirnames, filenames in os.walk(base):
-            dirnames[:] = [d for d in dirnames if d not in ALL_SKIP]
-            for fn in filenames:
-                fp = Path(dirpath) / fn
-                if fp.suffix in SOURCE_EXTENSIONS:
-                    source_files.append(fp)
-                    if len(source_files) >= self.MAX_SOURCE_FILES:
-                        break
-            if len(source_files) >= self.MAX_SOURCE_FILES:
-                break
-
-        # Phase 2: build node stubs (no line counting yet) and parse imports
-        rel_to_path: dict[str, Path] = {}
-        for fp in source_files:
-            rel = str(fp.relative_to(self.root))
-            rel_to_path[rel] = fp
-
-        node_set = set(rel_to_path.keys())
-        edges: list[tuple[str, str]] = []
-        edge_count: dict[str, int] = {rel: 0 for rel in node_set}
-
-        for rel, fp in rel_to_path.items():
-            try:
-                content = fp.read_text(errors="replace")
-            except Exception:
-                continue
-
-            ext_type = EXT_TYPE.get(fp.suffix, "unknown")
-            if ext_type == "python":
-                deps = self._parse_python_imports(content, fp)
-            else:
-                deps = self._parse_js_imports(content, fp)
-
-            for dep in deps:
-                if dep in node_set and dep != rel:
-                    edges.append((rel, dep))
-                    edge_count[rel] = edge_count.get(rel, 0) + 1
-                    edge_count[dep] = edge_count.get(dep, 0) + 1
-
-        # Phase 3: if too many nodes, keep the most connected
-        if len(node_set) > self.MAX_NODES:
-            # Sort by edge count descending, keep top N
-            ranked = sorted(node_set, key=lambda r: edge_count.get(r, 0), reverse=True)
-            kept = set(ranked[:self.MAX_NODES])
-            # Filter edges to only kept nodes
-            edges = [(s, t) for s, t in edges if s in kept and t in kept]
+        from services.dependency_graph import get_dependency_graph
+
+        # Imports are parsed incrementally by the shared graph; scoping and
+        # ranking run over its integer ids, names come back out per kept node
+        graph = get_dependency_graph(self.root)
+        analysis = graph.analysis()
+        csr = analysis.graph
+        start, end = csr.id_range(scope or "")
+        edge_count = [0] * (end - start)
+        for i in range(start, end):
+            for t in csr.successors(i):
+                if start <= t < end:
+                    edge_count[i - start] += 1
+                    edge_count[t - start] += 1
+        cycles = [c for c in analysis.cycles if all(start <= csr.ids[m] < end for m in c)]
+        in_cycle = {csr.ids[m] for c in cycles for m in c}
+
+        # If too many nodes, keep cycle members, then the most connected
+        if end - start > self.MAX_NODES:
+            ranked = sorted(range(start, end), key=lambda i: (i not in in_cycle, -edge_count[i - start], i))
+            kept = sorted(ranked[:self.MAX_NODES])
+            kept_set = set(kept)
+            cycles = [c for c in cycles if all(csr.ids[m] in kept_set for m in c)]
         else:
-            kept = node_set
+            kept = range(start, end)
+            kept_set = None
+        cycle_index = {m: i for i, c in enumerate(cycles) for m in c}
 
-        # Phase 4: build final nodes with line counts (only for kept nodes)
+        # Layers and centrality are those of the whole workspace graph
         nodes: list[DepNode] = []
-        for rel in kept:
-            fp = rel_to_path[rel]
-            try:
-                lines = sum(1 for _ in fp.open(errors="replace"))
-            except Exception:
-                lines = 0
+        edges: list[tuple[str, str]] = []
+        for i in kept:
+            rel = csr.names[i]
+            fp = PurePosixPath(rel)
             nodes.append(DepNode(
                 id=rel,
                 path=rel,
                 name=fp.stem,
                 type=EXT_TYPE.get(fp.suffix, "unknown"),
-                lines=lines,
+                lines=graph.lines(rel),
                 extension=fp.suffix,
+                layer=analysis.layers[i],
+                fan_in=csr.in_degree(i),
+                fan_out=csr.out_degree(i),
+                cycle=cycle_index.get(rel),
             ))
+            for t in csr.successors(i):
+                if start <= t < end and (kept_set is None or t in kept_set):
+                    edges.append((rel, csr.names[t]))
 
         final_edges = [DepEdge(source=s, target=t) for s, t in edges]
-        return DepGraphResponse(nodes=nodes, edges=final_edges)
-
-    def blast_radius(self, file_rel: str) -> dict:
-        """Compute which files depend on the given file (reverse dependencies)."""
-        graph = self.build_graph()
-        dependents: list[str] = []
-        for edge in graph.edges:
-            if edge.target == file_rel:
-                dependents.append(edge.source)
-        return {
-            "file": file_rel,
-            "dependents": dependents,
-            "count": len(dependents),
-            "high": len(dependents) >= 5,
-        }
-
-    def _parse_python_imports(self, content: str, file_path: Path) -> list[str]:
-        results = []
-        for line in content.splitlines():
-            m = PY_IMPORT.match(line)
-            if not m:
-                continue
-            module = m.group(1) or m.group(2)
-            if not module:
-                continue
-
-            parts = module.split(".")
-            candidates = [
-                file_path.parent / "/".join(parts) / "__init__.py",
-                file_path.parent / ("/".join(parts) + ".py"),
-                self.root / "/".join(parts) / "__init__.py",
-                self.root / ("/".join(parts) + ".py"),
-            ]
-            for c in candidates:
-                if c.exists():
-                    try:
-                        results.append(str(c.relative_to(self.root)))
-                    except ValueError:
-                        pass
-                    break
-        return results
-
-    def _parse_js_imports(self, content: str, file_path: Path) -> list[str]:
-        results = []
-        for m in JS_IMPORT.finditer(content):
-            specifier = m.group(1) or m.group(2)
-            if not specifier or not specifier.startswith("."):
-                continue
-
-            base = (file_path.parent / specifier).resolve()
-            candidates = []
-            for ext in [".ts", ".tsx", ".js", ".jsx"]:
-                candidates.append(base.with_suffix(ext))
-            for ext in [".ts", ".tsx", ".js", ".jsx"]:
-                candidates.append(base / f"index{ext}")
-
-            for c in candidates:
-                if c.exists():
-                    try:
-                        results.append(str(c.relative_to(self.root)))
-                    except ValueError:
-                        pass
-                    break
-        return results
+        return DepGraphResponse(
+            nodes=nodes,
+            edges=final_edges,
+            cycles=cycles,
+            depth=analysis.depth,
+            total_nodes=end - start,
+        )
+
+    CLUSTER_MODES = ("directory", "community")
+
+    def build_clusters(
+        self, scope: str | None = None, mode: str = "directory", expanded: list[str] | None = None,
+    ) -> DepClusterResponse:
+        """The graph collapsed into directory or community clusters, with the
+        ``expanded`` cluster ids opened one level. Unlike ``build_graph``
+        nothing is dropped: every file in scope is in exactly one cluster."""
+        from services.dependency_graph import get_dependency_graph
+        from services.graph_clustering import collapse, community_clusters, directory_clusters
+
+        if mode not in self.CLUSTER_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(self.CLUSTER_MODES)}")
+        graph = get_dependency_graph(self.root)
+        analysis = graph.analysis()
+        csr = analysis.graph
+        expanded = set(expanded or ())
+        if mode == "directory":
+            clusters = directory_clusters(csr, scope or "", expanded)
+        else:
+            clusters = community_clusters(csr, graph.communities(), scope or "", expanded)
+        collapsed = collapse(csr, clusters)
+
+        result: list[DepCluster] = []
+        for c, cluster in enumerate(clusters):
+            names = [csr.names[i] for i in cluster.members]
+            result.append(DepCluster(
+                id=cluster.id,
+                label=cluster.label,
+                kind=cluster.kind,
+                path=cluster.path,
+                files=len(names),
+                lines=sum(graph.lines(rel) for rel in names),
+                internal_edges=collapsed.internal[c],
+                fan_in=collapsed.fan_in[c],
+                fan_out=collapsed.fan_out[c],
+                cycle_files=sum(1 for rel in names if rel in analysis.cycle_of),
+                expandable=cluster.expandable,
+            ))
+        edges = [
+            DepClusterEdge(source=clusters[s].id, target=clusters[t].id, weight=weight)
+            for (s, t), weight in sorted(collapsed.weights.items())
+        ]
+        return DepClusterResponse(
+            mode=mode,
+            clusters=result,
+            edges=edges,
+            total_files=sum(c.files for c in result),
+            total_edges=sum(collapsed.internal) + sum(collapsed.weights.values()),
+        )
+
+    def blast_radius(self, file_rel: str, depth: int | None = None) -> BlastRadiusResponse:
+        """Files depending on the given file, transitively up to ``depth`` hops."""
+        from services.dependency_graph import get_dependency_graph
+
+        if depth is not None and depth < 1:
+            raise ValueError("depth must be at least 1")
+        file_rel = PurePosixPath(file_rel).as_posix()
+        impact = get_dependency_graph(self.root).impact(file_rel, depth)
+        return BlastRadiusResponse(
+            file=file_rel,
+            depth=depth,
+            direct=sorted(i.path for i in impact if i.hops == 1),
+            dependents=[i.path for i in impact],
+            impact=[ImpactedFile(path=i.path, hops=i.hops, paths=i.paths, fan_in=i.fan_in) for i in impact],
+            count=len(impact),
+            high=len(impact) >= self.HIGH_BLAST_RADIUS,
+        )
+
+    def symbol_usages(self, symbol: str, file: str | None = None) -> SymbolQueryResponse:
+        """Definitions of ``symbol``, the call sites that use it and the calls it makes."""
+        from services.symbol_index import get_symbol_index
+
+        if not symbol.strip():
+            raise ValueError("symbol is required")
+        index = get_symbol_index(self.root)
+        return SymbolQueryResponse(
+            symbol=symbol,
+            definitions=[
+                SymbolDefinition(
+                    file=rel, name=d.name, qualname=d.qualname, kind=d.kind, line=d.line, end_line=d.end_line,
+                )
+                for rel, d in index.definitions(symbol, file)
+            ],
+            callers=[
+                SymbolReference(file=site.file, line=site.line, caller=site.caller)
+                for site in index.callers(symbol, file)
+            ],
+            callees=[
+                SymbolReference(file=site.file, line=site.line, caller=site.caller, name=name)
+                for name, site in index.callees(symbol, file)
+            ],
+        )
@@ -1,8 +1,17 @@
 import ast
+import bisect
 import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from pathlib import Path
+from typing import Iterator
 
-from models.file import FileTreeNode, FileSearchMatch, SyntaxError_
+from models.file import FileTreeNode, FileTreeLevelResponse, FileSearchMatch, SyntaxError_
+from services.ignore_rules import IgnoreRules, get_ignore_rules
+from services.search_engine import SearchPlan, compile_search, search_file
+from services.parallel_search import PARALLEL_MIN_FILES, parallel_search
 
 EXTENSION_LANGUAGE_MAP: dict[str, str] = {
     ".py": "python",
@@ -32,9 +41,25 @@ EXTENSION_LANGUAGE_MAP: dict[str, str] = {
 SKIP_DIRS = {".git", "node_modules", "__pycache__", "target", ".venv", "venv", "dist", ".next", ".claude"}
 
 
+# Directory listings cached for the lazy tree, keyed by path
+DIR_CACHE_SIZE = 2048
+# A directory modified this recently may change again within the same mtime tick
+RACY_MTIME_SECONDS = 2.0
+
+
 class FileService:
     def __init__(self, workspace_root: str = ""):
         self.workspace_root = workspace_root
+        self._dir_cache: OrderedDict[str, tuple[str, list[tuple], list[FileTreeNode]]] = OrderedDict()
+        self._dir_cache_lock = threading.Lock()
+
+    def _index_for(self, root_path: Path):
+        from services.workspace_index import get_workspace_index
+        return get_workspace_index(root_path)
+
+    def _notify_index(self, paths: list[Path]):
+        from services.workspace_index import notify_paths_changed
+        notify_paths_changed(paths)
 
     def _validate_path(self, path: str) -> Path:
         resolved = Path(path).resolve()
@@ -59,15 +84,42 @@ class FileService:
     def write_file(self, path: str, content: str) -> bool:
         resolved = self._validate_path(path)
         resolved.write_text(content, encoding="utf-8")
+        self._notify_index([resolved])
         return True
 
     def get_file_tree(self, root: str, max_depth: int = 5) -> list[FileTreeNode]:
         root_path = self._validate_path(root)
         if not root_path.is_dir():
             return []
-        return self._build_tree(root_path, max_depth, 0)
+        from services.workspace_index import find_workspace_index
+        index = find_workspace_index(root_path)
+        if index is not None:
+            index.ensure_fresh()
+            return self._build_tree_from_index(index, root_path, max_depth, 0)
+        return self._build_tree(root_path, max_depth, 0, get_ignore_rules(root_path))
+
+    def _build_tree_from_index(self, index, path: Path, max_depth: int, depth: int) -> list[FileTreeNode]:
+        """Same shape as ``_build_tree`` but served from the in-memory index."""
+        if depth >= max_depth:
+            return []
 
-    def _build_tree(self, path: Path, max_depth: int, depth: int) -> list[FileTreeNode]:
+        dir_names, file_names = index.listdir(path)
+        nodes: list[FileTreeNode] = []
+        for name in sorted(dir_names, key=str.lower):
+            entry = path / name
+            nodes.append(FileTreeNode(
+                name=name,
+                path=str(entry),
+                is_dir=True,
+                children=self._build_tree_from_index(index, entry, max_depth, depth + 1),
+            ))
+        for name in sorted(file_names, key=str.lower):
+            nodes.append(FileTreeNode(name=name, path=str(path / name), is_dir=False))
+        return nodes
+
+    def _build_tree(
+        self, path: Path, max_depth: int, depth: int, ignore: IgnoreRules, rel: str = ""
+    ) -> list[FileTreeNode]:
         if depth >= max_depth:
             return []
 
@@ -77,14 +129,19 @@ class FileService:
         except PermissionError:
             return []
 
+        matcher = ignore.matcher(rel)
         for entry in entries:
             if entry.name.startswith(".") and entry.name in SKIP_DIRS:
                 continue
             if entry.name in SKIP_DIRS:
                 continue
+            if matcher.ignores(entry.name, entry.is_dir()):
+                continue
 
             if entry.is_dir():
-                children = self._build_tree(entry, max_depth, depth + 1)
+                children = self._build_tree(
+                    entry, max_depth, depth + 1, ignore, f"{rel}/{entry.name}" if rel else entry.name
+                )
                 nodes.append(FileTreeNode(
                     name=entry.name,
                     path=str(entry),
@@ -99,6 +156,99 @@ class FileService:
                 ))
         return nodes
 
+    def list_directory(
+        self,
+        path: str,
+        cursor: str | None = None,
+        limit: int = 500,
+        etag: str | None = None,
+    ) -> FileTreeLevelResponse:
+        """One level of the file tree, a page at a time.
+
+        Entries are sorted like ``get_file_tree`` (directories first) and the
+        cursor is the sort key of the last entry returned, so pages stay
+        consistent while entries are added or removed. When ``etag`` matches
+        the directory's current one, no entries are returned.
+        """
+        dir_path = self._validate_path(path)
+        if not dir_path.is_dir():
+            raise ValueError(f"Not a directory: {path}")
+        from services.workspace_index import find_workspace_index
+        index = find_workspace_index(dir_path)
+        ignore = index.ignore if index is not None else get_ignore_rules(dir_path)
+        rel = (index.relative(dir_path) or "") if index is not None else ""
+        current, keys, nodes = self._read_directory(dir_path, ignore, rel)
+        response = FileTreeLevelResponse(path=str(dir_path), etag=current, total=len(nodes))
+        if etag == current and cursor is None:
+            response.not_modified = True
+            return response
+
+        start = 0
+        if cursor:
+            kind, sep, name = cursor.partition("/")
+            if not sep or kind not in ("0", "1"):
+                raise ValueError("Invalid cursor")
+            start = bisect.bisect_right(keys, (int(kind), name.lower(), name))
+        page = nodes[start:start + max(1, limit)]
+        response.entries = page
+        if start + len(page) < len(nodes):
+            last = keys[start + len(page) - 1]
+            response.next_cursor = f"{last[0]}/{last[2]}"
+        return response
+
+    def _read_directory(
+        self, dir_path: Path, ignore: IgnoreRules, rel: str
+    ) -> tuple[str, list[tuple], list[FileTreeNode]]:
+        """(etag, sort keys, nodes) for a directory, cached until its mtime or
+        the ignore rules change."""
+        st = dir_path.stat()
+        matcher = ignore.matcher(rel)
+        stamp = f"{st.st_ino:x}-{st.st_mtime_ns:x}-{ignore.version:x}"
+        key = str(dir_path)
+        with self._dir_cache_lock:
+            cached = self._dir_cache.get(key)
+            if cached is not None and cached[0].startswith(f"{stamp}-"):
+                self._dir_cache.move_to_end(key)
+                return cached
+
+        entries: list[tuple[tuple, FileTreeNode]] = []
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if entry.name in SKIP_DIRS:
+                        continue
+                    # DirEntry types come from the scandir call itself; only
+                    # symlinks cost an extra stat
+                    try:
+                        is_dir = entry.is_dir()
+                        if not is_dir and not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    if matcher.ignores(entry.name, is_dir):
+                        continue
+                    entries.append((
+                        (0 if is_dir else 1, entry.name.lower(), entry.name),
+                        FileTreeNode(name=entry.name, path=entry.path, is_dir=is_dir),
+                    ))
+        except PermissionError:
+            pass
+        entries.sort(key=lambda e: e[0])
+        keys = [k for k, _ in entries]
+        nodes = [n for _, n in entries]
+        names_crc = zlib.crc32("\0".join(f"{k[0]}{k[2]}" for k in keys).encode("utf-8", "surrogateescape"))
+        result = (f"{stamp}-{names_crc:08x}", keys, nodes)
+
+        # Racy listings are not cached: a change within the same mtime tick
+        # would otherwise go unnoticed
+        if time.time() - st.st_mtime > RACY_MTIME_SECONDS:
+            with self._dir_cache_lock:
+                self._dir_cache[key] = result
+                self._dir_cache.move_to_end(key)
+                while len(self._dir_cache) > DIR_CACHE_SIZE:
+                    self._dir_cache.popitem(last=False)
+        return result
+
     def scan_project(self, root: str) -> dict:
         root_path = Path(root).resolve()
         if not root_path.is_dir():
@@ -110,23 +260,21 @@ class FileService:
             "README.md", ".gitignore",
         }
 
-        total_files = 0
-        total_dirs = 0
+        index = self._index_for(root_path)
+        prefix = index.relative(root_path) or ""
+        cut = len(prefix) + 1 if prefix else 0
+        entries = index.files(under=root_path)
+
+        total_files = len(entries)
+        total_dirs = len(index.dirs(under=root_path))
         key_files: list[str] = []
         file_types: dict[str, int] = {}
 
-        for dirpath, dirnames, filenames in os.walk(root_path):
-            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
-            total_dirs += len(dirnames)
-
-            for fname in filenames:
-                total_files += 1
-                ext = Path(fname).suffix.lower()
-                if ext:
-                    file_types[ext] = file_types.get(ext, 0) + 1
-                if fname in KEY_FILE_NAMES:
-                    rel = os.path.relpath(os.path.join(dirpath, fname), root_path)
-                    key_files.append(rel)
+        for entry in entries:
+            if entry.extension:
+                file_types[entry.extension] = file_types.get(entry.extension, 0) + 1
+            if entry.path.rsplit("/", 1)[-1] in KEY_FILE_NAMES:
+                key_files.append(entry.path[cut:])
 
         return {
             "path": str(root_path),
@@ -146,40 +294,91 @@ class FileService:
         ".pyc", ".pyo", ".class",
     }
 
-    def search_files(self, root: str, query: str, max_results: int = 100) -> tuple[list[FileSearchMatch], bool]:
-        root_path = self._validate_path(root)
-        if not root_path.is_dir():
-            return [], False
+    SEARCH_HEARTBEAT_FILES = 256
+
+    def search_files(
+        self,
+        root: str,
+        query: str,
+        max_results: int = 100,
+        mode: str = "literal",
+        case_sensitive: bool = False,
+        context_lines: int = 0,
+    ) -> tuple[list[FileSearchMatch], bool]:
+        plan, candidates = self._prepare_search(root, query, mode, case_sensitive)
+        if len(candidates) >= PARALLEL_MIN_FILES:
+            # Cold query over a large tree: fan out across processes
+            result = parallel_search(candidates, plan, max_results, context_lines)
+            if result is not None:
+                return result
 
-        query_lower = query.lower()
         matches: list[FileSearchMatch] = []
-        truncated = False
-
-        for dirpath, dirnames, filenames in os.walk(root_path):
-            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
-
-            for fname in filenames:
-                ext = Path(fname).suffix.lower()
-                if ext in self.BINARY_EXTENSIONS:
-                    continue
-
-                fpath = os.path.join(dirpath, fname)
-                try:
-                    with open(fpath, "r", encoding="utf-8", errors="ignore") as f:
-                        for line_num, line in enumerate(f, 1):
-                            if query_lower in line.lower():
-                                matches.append(FileSearchMatch(
-                                    path=fpath,
-                                    line=line_num,
-                                    text=line.rstrip("\n\r")[:200],
-                                ))
-                                if len(matches) >= max_results:
-                                    truncated = True
-                                    return matches, truncated
-                except (OSError, UnicodeDecodeError):
-                    continue
-
-        return matches, truncated
+        for found in self._scan_candidates(candidates, plan, max_results, context_lines):
+            matches.extend(found)
+        return matches, len(matches) >= max_results
+
+    def iter_search(
+        self,
+        root: str,
+        query: str,
+        max_results: int = 100,
+        mode: str = "literal",
+        case_sensitive: bool = False,
+        context_lines: int = 0,
+        cancel: threading.Event | None = None,
+    ) -> Iterator[list[FileSearchMatch]]:
+        """Like ``search_files`` but yields each file's matches as soon as it is scanned.
+
+        Bad input raises here, before iteration starts. An empty batch is
+        yielded every few hundred files so consumers can flush and check for
+        disconnects; setting ``cancel`` stops the scan before the next file.
+        """
+        plan, candidates = self._prepare_search(root, query, mode, case_sensitive)
+        return self._scan_candidates(candidates, plan, max_results, context_lines, cancel)
+
+    def _prepare_search(
+        self, root: str, query: str, mode: str, case_sensitive: bool,
+    ) -> tuple[SearchPlan, list[Path]]:
+        root_path = self._validate_path(root)
+        plan = compile_search(query, mode, case_sensitive)
+        if not root_path.is_dir():
+            return plan, []
+        candidates = [
+            fp for fp in self.search_candidates(root_path, plan)
+            if fp.suffix.lower() not in self.BINARY_EXTENSIONS
+        ]
+        return plan, candidates
+
+    def _scan_candidates(
+        self,
+        candidates: list[Path],
+        plan: SearchPlan,
+        max_results: int,
+        context_lines: int,
+        cancel: threading.Event | None = None,
+    ) -> Iterator[list[FileSearchMatch]]:
+        remaining = max_results
+        since_yield = 0
+        for fp in candidates:
+            if remaining <= 0 or (cancel is not None and cancel.is_set()):
+                return
+            found, _ = search_file(fp, plan, context_lines, remaining)
+            since_yield += 1
+            if found or since_yield >= self.SEARCH_HEARTBEAT_FILES:
+                remaining -= len(found)
+                since_yield = 0
+                yield found
+
+    def search_candidates(self, root_path: Path, plan: SearchPlan) -> list[Path]:
+        """Files worth opening for ``plan``: trigram candidates when possible."""
+        from services.trigram_index import get_trigram_index
+        index = self._index_for(root_path)
+        candidates = None
+        if plan.literals:
+            candidates = get_trigram_index(index).candidates_for_all(plan.literals, under=root_path)
+        if candidates is None:
+            candidates = index.paths(under=root_path)
+        return candidates
 
     def check_syntax(self, path: str, content: str) -> tuple[list[SyntaxError_], bool]:
         language = self.detect_language(path)
@@ -199,35 +398,41 @@ class FileService:
             )
             return [error], False
 
-    def replace_in_files(self, root: str, search: str, replace: str) -> tuple[int, int]:
+    def replace_in_files(
+        self,
+        root: str,
+        search: str,
+        replace: str,
+        dry_run: bool = False,
+        paths: list[str] | None = None,
+    ) -> list:
+        """Replace ``search`` with ``replace`` across the tree, all-or-nothing.
+
+        Returns the ``ReplaceChange`` per affected file. With ``dry_run``
+        nothing is written and each change carries a diff; ``paths`` restricts
+        the replace to those files. Raises ReplaceError when the write had to
+        be rolled back.
+        """
+        from services.bulk_replace import apply_replace, plan_replace
         root_path = self._validate_path(root)
         if not root_path.is_dir():
-            return 0, 0
-
-        files_modified = 0
-        replacements_made = 0
-
-        for dirpath, dirnames, filenames in os.walk(root_path):
-            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
-
-            for fname in filenames:
-                ext = Path(fname).suffix.lower()
-                if ext in self.BINARY_EXTENSIONS:
-                    continue
-
-                fpath = os.path.join(dirpath, fname)
-                try:
-                    with open(fpath, "r", encoding="utf-8", errors="ignore") as f:
-                        content = f.read()
-
-                    count = content.count(search)
-                    if count > 0:
-                        new_content = content.replace(search, replace)
-                        with open(fpath, "w", encoding="utf-8") as f:
-                            f.write(new_content)
-                        files_modified += 1
-                        replacements_made += count
-                except (OSError, UnicodeDecodeError):
-                    continue
-
-        return files_modified, replacements_made
+            return []
+        if not search:
+            raise ValueError("Search string must not be empty")
+
+        plan = compile_search(search, mode="literal", case_sensitive=True)
+        candidates = [
+            fp for fp in self.search_candidates(root_path, plan)
+            if fp.suffix.lower() not in self.BINARY_EXTENSIONS
+        ]
+        if paths is not None:
+            wanted = {self._validate_path(p) for p in paths}
+            candidates = [fp for fp in candidates if fp in wanted]
+
+        needle = search.encode("utf-8")
+        replacement = replace.encode("utf-8")
+        changes = plan_replace(candidates, needle, replacement, root_path, with_diff=dry_run)
+        if not dry_run:
+            apply_replace(changes, needle, replacement)
+            self._notify_index([c.path for c in changes])
+        return changes
@@ -30,6 +30,15 @@ class GitService:
         except FileNotFoundError:
             return False
 
+    def head_commit(self) -> str | None:
+        """SHA of HEAD, or None outside a repository / before the first commit."""
+        try:
+            r = self._run(["rev-parse", "--verify", "-q", "HEAD"], check=False)
+        except FileNotFoundError:
+            return None
+        sha = r.stdout.strip()
+        return sha if r.returncode == 0 and sha else None
+
     def status(self) -> GitStatusResponse:
         r = self._run(["status", "--porcelain=v1", "-b"])
         lines = r.stdout.splitlines()
@@ -0,0 +1,162 @@
+"""Linear-time analytics over the import graph.
+
+- Strongly connected components (Tarjan, iterative so deep graphs do not hit
+  the recursion limit). Components of two or more files are import cycles.
+- Topological layers over the component DAG: layer 0 imports nothing in the
+  workspace, and every other file sits one layer above its highest
+  dependency. Files in one cycle share a layer.
+- Fan-in / fan-out (degree) centrality, read straight off the CSR offsets.
+
+Everything is O(nodes + edges) over integer node ids; names only appear in
+the cycle lists. ``DependencyGraph.analysis`` caches the result until the
+graph changes.
+"""
+from array import array
+from collections import deque
+from dataclasses import dataclass
+
+from services.csr_graph import CSRGraph
+
+
+@dataclass(frozen=True, slots=True)
+class GraphAnalysis:
+    graph: CSRGraph
+    cycles: list[list[str]]  # components of 2+ files, largest first, members sorted
+    cycle_of: dict[str, int]  # file -> index into ``cycles``
+    layers: array  # layer per node id
+
+    @property
+    def depth(self) -> int:
+        """Number of layers: the longest import chain, cycles collapsed."""
+        return max(self.layers, default=-1) + 1
+
+    def layer(self, rel: str) -> int:
+        i = self.graph.ids.get(rel)
+        return self.layers[i] if i is not None else 0
+
+    def fan_in(self, rel: str) -> int:
+        i = self.graph.ids.get(rel)
+        return self.graph.in_degree(i) if i is not None else 0
+
+    def fan_out(self, rel: str) -> int:
+        i = self.graph.ids.get(rel)
+        return self.graph.out_degree(i) if i is not None else 0
+
+
+def strongly_connected_components(graph: CSRGraph) -> list[list[int]]:
+    """Tarjan's algorithm. Components come out dependencies first: every
+    component is emitted after all components it can reach."""
+    n = len(graph)
+    offsets, targets = graph.offsets, graph.targets
+    index = array("i", [-1]) * n
+    lowlink = array("I", bytes(4 * n))
+    on_stack = bytearray(n)
+    stack: list[int] = []
+    components: list[list[int]] = []
+    counter = 0
+
+    for start in range(n):
+        if index[start] >= 0:
+            continue
+        index[start] = lowlink[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack[start] = 1
+        # (node, next edge position) pairs stand in for recursion
+        work = [[start, offsets[start]]]
+        while work:
+            frame = work[-1]
+            node, k = frame
+            end = offsets[node + 1]
+            advanced = False
+            while k < end:
+                succ = targets[k]
+                k += 1
+                if index[succ] < 0:
+                    index[succ] = lowlink[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack[succ] = 1
+                    frame[1] = k
+                    work.append([succ, offsets[succ]])
+                    advanced = True
+                    break
+                if on_stack[succ] and index[succ] < lowlink[node]:
+                    lowlink[node] = index[succ]
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if lowlink[node] < lowlink[parent]:
+                    lowlink[parent] = lowlink[node]
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = 0
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+def analyze_graph(graph: CSRGraph) -> GraphAnalysis:
+    components = strongly_connected_components(graph)
+    offsets, targets = graph.offsets, graph.targets
+
+    component_of = array("I", bytes(4 * len(graph)))
+    for i, component in enumerate(components):
+        for member in component:
+            component_of[member] = i
+
+    # Dependencies are emitted first, so one pass in order sees every
+    # successor component's layer before it is needed
+    component_layer = array("I")
+    for i, component in enumerate(components):
+        layer = 0
+        for member in component:
+            for k in range(offsets[member], offsets[member + 1]):
+                j = component_of[targets[k]]
+                if j != i and component_layer[j] + 1 > layer:
+                    layer = component_layer[j] + 1
+        component_layer.append(layer)
+
+    names = graph.names
+    cycles = sorted(
+        (sorted(names[member] for member in component) for component in components if len(component) > 1),
+        key=lambda c: (-len(c), c[0]),
+    )
+    cycle_of = {member: i for i, cycle in enumerate(cycles) for member in cycle}
+    return GraphAnalysis(
+        graph=graph,
+        cycles=cycles,
+        cycle_of=cycle_of,
+        layers=array("I", (component_layer[c] for c in component_of)),
+    )
+
+
+def cycle_path(cycle: list[str], graph: CSRGraph) -> list[str]:
+    """A shortest import loop through the first member of ``cycle``, for display
+    (first file repeated at the end)."""
+    members = {graph.ids[member] for member in cycle if member in graph.ids}
+    start = graph.ids.get(cycle[0])
+    if start is None:
+        return cycle + [cycle[0]]
+    parent: dict[int, int] = {}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for succ in graph.successors(node):
+            if succ not in members:
+                continue
+            if succ == start:
+                path = [node]
+                while path[-1] != start:
+                    path.append(parent[path[-1]])
+                return [graph.names[i] for i in reversed(path)] + [cycle[0]]
+            if succ not in parent:
+                parent[succ] = node
+                queue.append(succ)
+    return cycle + [cycle[0]]
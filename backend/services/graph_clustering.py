@@ -0,0 +1,255 @@
+"""Level-of-detail views of the import graph.
+
+Rather than pruning a big graph to its best-connected files, files are
+grouped into clusters that collapse into weighted aggregate edges. Each
+clustering is hierarchical, so a client can start with a handful of
+clusters and ask for any of them to be expanded one level:
+
+- Directory: a cluster per directory. Node ids are sorted paths, so a
+  directory is a contiguous id range and needs no membership tables.
+- Community: multilevel Louvain modularity clustering over the undirected
+  import graph; each level merges the communities of the level below.
+  ``DependencyGraph.communities`` caches the levels until the graph changes.
+
+Cluster ids are stable strings ("dir:<path>", "community:<level>.<n>",
+"file:<path>"); ``collapse`` aggregates the file-level edges between the
+visible clusters so totals always match the underlying graph.
+"""
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Collection, Iterable, Sequence
+
+from services.csr_graph import CSRGraph
+
+# Local-moving sweeps per Louvain level; sweeps stop early once no file moves
+MAX_LOUVAIN_PASSES = 16
+
+
+@dataclass(frozen=True, slots=True)
+class Cluster:
+    id: str
+    label: str
+    kind: str  # "directory" | "community" | "file"
+    path: str | None  # directory or file path; None for communities
+    members: Sequence[int]  # node ids
+    expandable: bool
+
+
+@dataclass(slots=True)
+class CollapsedGraph:
+    internal: list[int]  # imports with both ends in the cluster
+    fan_in: list[int]  # imports of the cluster's files from outside it
+    fan_out: list[int]  # imports by the cluster's files of files outside it
+    weights: dict[tuple[int, int], int]  # (cluster, cluster) -> imports between them
+
+
+def _file_cluster(graph: CSRGraph, i: int) -> Cluster:
+    rel = graph.names[i]
+    return Cluster(f"file:{rel}", rel.rpartition("/")[2], "file", rel, (i,), False)
+
+
+def directory_clusters(graph: CSRGraph, scope: str = "", expanded: Collection[str] = ()) -> list[Cluster]:
+    """Subdirectories and files directly under ``scope``, with every expanded
+    directory replaced by its own children."""
+    scope = scope.strip("/")
+    prefix = f"{scope}/" if scope else ""
+    start, end = graph.id_range(scope)
+    clusters: list[Cluster] = []
+    i = start
+    while i < end:
+        directory = prefix
+        rest = graph.names[i][len(prefix):]
+        while True:
+            head, sep, rest = rest.partition("/")
+            if not sep:
+                clusters.append(_file_cluster(graph, i))
+                i += 1
+                break
+            path = directory + head
+            if f"dir:{path}" in expanded:
+                directory = f"{path}/"
+                continue
+            first, last = graph.id_range(path)
+            clusters.append(Cluster(f"dir:{path}", f"{head}/", "directory", path, range(first, last), True))
+            i = last
+            break
+    return clusters
+
+
+def louvain_levels(graph: CSRGraph) -> list[array]:
+    """Community of every node at each Louvain level, finest first.
+
+    Import direction is ignored and an import both ways counts twice. Files
+    with no workspace imports either way all share one community, which
+    leaves modularity unchanged and keeps them from flooding the top level.
+    """
+    n = len(graph)
+    offsets = array("I", [0])
+    neighbours = array("I")
+    for i in range(n):
+        neighbours.extend(graph.successors(i))
+        neighbours.extend(graph.predecessors(i))
+        offsets.append(len(neighbours))
+    weights: array | None = None  # every level-0 edge weighs 1
+
+    levels: list[array] = []
+    size = n
+    while size:
+        community = _local_moving(size, offsets, neighbours, weights)
+        if not levels:
+            isolated = [i for i in range(n) if offsets[i] == offsets[i + 1]]
+            for i in isolated[1:]:
+                community[i] = community[isolated[0]]
+        # Renumber in order of first appearance, which follows path order
+        numbering: dict[int, int] = {}
+        for i, c in enumerate(community):
+            community[i] = numbering.setdefault(c, len(numbering))
+        count = len(numbering)
+        if count == size:
+            break
+        levels.append(array("I", community) if not levels else array("I", (community[c] for c in levels[-1])))
+
+        rows: list[dict[int, int]] = [{} for _ in range(count)]
+        for i in range(size):
+            row = rows[community[i]]
+            for k in range(offsets[i], offsets[i + 1]):
+                c = community[neighbours[k]]
+                row[c] = row.get(c, 0) + (weights[k] if weights is not None else 1)
+        offsets, neighbours, weights = array("I", [0]), array("I"), array("I")
+        for row in rows:
+            for c in sorted(row):
+                neighbours.append(c)
+                weights.append(row[c])
+            offsets.append(len(neighbours))
+        size = count
+    return levels
+
+
+def _local_moving(size: int, offsets: array, neighbours: array, weights: array | None) -> list[int]:
+    """One Louvain phase: move nodes to the neighbouring community with the
+    best modularity gain until no node moves."""
+    if weights is None:
+        degree = [offsets[i + 1] - offsets[i] for i in range(size)]
+    else:
+        degree = [sum(weights[offsets[i]:offsets[i + 1]]) for i in range(size)]
+    total = sum(degree)
+    community = list(range(size))
+    if not total:
+        return community
+    community_degree = degree[:]
+    for _ in range(MAX_LOUVAIN_PASSES):
+        moved = 0
+        for i in range(size):
+            k_i = degree[i]
+            if not k_i:
+                continue
+            current = community[i]
+            links: dict[int, int] = {}
+            for k in range(offsets[i], offsets[i + 1]):
+                j = neighbours[k]
+                if j != i:
+                    c = community[j]
+                    links[c] = links.get(c, 0) + (weights[k] if weights is not None else 1)
+            community_degree[current] -= k_i
+            best = current
+            best_gain = links.get(current, 0) - community_degree[current] * k_i / total
+            for c, w in links.items():
+                gain = w - community_degree[c] * k_i / total
+                if gain > best_gain:
+                    best, best_gain = c, gain
+            community_degree[best] += k_i
+            if best != current:
+                community[i] = best
+                moved += 1
+        if not moved:
+            break
+    return community
+
+
+def community_clusters(
+    graph: CSRGraph,
+    levels: list[array],
+    scope: str = "",
+    expanded: Collection[str] = (),
+) -> list[Cluster]:
+    """Top-level communities with files under ``scope``; an expanded
+    community is replaced by its communities one level down (files at the
+    bottom). Single-file communities are shown as the file."""
+    start, end = graph.id_range(scope)
+    clusters: list[Cluster] = []
+
+    def show(level: int, k: int, group: list[int]):
+        cluster_id = f"community:{level}.{k}"
+        if len(group) == 1:
+            clusters.append(_file_cluster(graph, group[0]))
+        elif cluster_id in expanded:
+            expand(level, group)
+        else:
+            clusters.append(Cluster(cluster_id, _community_label(graph, group), "community", None, group, True))
+
+    def expand(level: int, members: list[int]):
+        if not level:
+            clusters.extend(_file_cluster(graph, i) for i in members)
+            return
+        groups = _group(members, levels[level - 1])
+        if len(groups) == 1:
+            # Nothing split at the level below: open that one too
+            expand(level - 1, members)
+            return
+        for k, group in groups.items():
+            show(level - 1, k, group)
+
+    if levels:
+        top = len(levels) - 1
+        for k, group in _group(range(start, end), levels[top]).items():
+            show(top, k, group)
+    else:
+        clusters.extend(_file_cluster(graph, i) for i in range(start, end))
+    return clusters
+
+
+def _group(members: Iterable[int], labels: array) -> dict[int, list[int]]:
+    groups: dict[int, list[int]] = {}
+    for i in members:
+        groups.setdefault(labels[i], []).append(i)
+    return groups
+
+
+def _community_label(graph: CSRGraph, members: list[int]) -> str:
+    """The directory most of the community lives in."""
+    directories = Counter(graph.names[i].rpartition("/")[0] for i in members)
+    directory, count = min(directories.items(), key=lambda item: (-item[1], item[0]))
+    label = f"{directory or '.'}/"
+    return label if count == len(members) else f"{label} +{len(directories) - 1}"
+
+
+def collapse(graph: CSRGraph, clusters: list[Cluster]) -> CollapsedGraph:
+    """Aggregate file-level imports onto ``clusters``. Work is proportional to
+    the imports touching visible files, not the whole graph."""
+    assign = array("i", [-1]) * len(graph)
+    for c, cluster in enumerate(clusters):
+        for i in cluster.members:
+            assign[i] = c
+    offsets, targets = graph.offsets, graph.targets
+    roffsets, rsources = graph.roffsets, graph.rsources
+    internal = [0] * len(clusters)
+    fan_in = [0] * len(clusters)
+    fan_out = [0] * len(clusters)
+    weights: dict[tuple[int, int], int] = {}
+    for c, cluster in enumerate(clusters):
+        for i in cluster.members:
+            for k in range(offsets[i], offsets[i + 1]):
+                t = assign[targets[k]]
+                if t == c:
+                    internal[c] += 1
+                    continue
+                fan_out[c] += 1
+                if t >= 0:
+                    fan_in[t] += 1
+                    weights[(c, t)] = weights.get((c, t), 0) + 1
+            # Imports from visible clusters were counted above
+            for k in range(roffsets[i], roffsets[i + 1]):
+                if assign[rsources[k]] < 0:
+                    fan_in[c] += 1
+    return CollapsedGraph(internal, fan_in, fan_out, weights)
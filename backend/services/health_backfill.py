@@ -0,0 +1,410 @@
+"""Health backfill — score past commits without checking anything out.
+
+One ``git log --first-parent --raw`` stream yields every commit's changed
+blobs; the job keeps the workspace's source tree as a path -> blob SHA map
+and patches it commit by commit. Blob contents come from a single
+long-lived ``git cat-file --batch`` process.
+
+Metrics are cached by blob SHA, both in memory and on disk, so a file that
+did not change between commits, or that another branch or an earlier run
+already saw, is never analysed twice. Each commit is then scored by
+``HealthService`` over the cached metrics and recorded in the health
+history with the commit's timestamp.
+"""
+import json
+import logging
+import sqlite3
+import subprocess
+import threading
+from pathlib import Path
+from typing import Iterator
+
+from models.health import HealthBackfillStatus
+from services.byte_reader import is_binary
+from services.complexity_metrics import SymbolMetrics, map_files
+from services.file_service import SKIP_DIRS
+from services.health_history import HealthHistory
+from services.health_service import SOURCE_EXTENSIONS, FileMetrics, HealthService, analyze_bytes
+from services.ignore_rules import get_ignore_rules
+from services.test_mapping import TestMap
+from services.workspace_index import CACHE_DIR
+
+logger = logging.getLogger("health_backfill")
+
+BLOB_CACHE_PATH = CACHE_DIR / "blob_metrics.db"
+# Commits whose new blobs are fetched and analysed together
+BATCH_COMMITS = 100
+SUBMODULE_MODE = "160000"
+
+BlobKey = tuple[str, str]  # (blob sha, extension)
+
+
+class CatFileReader:
+    """Blob contents from one long-lived ``git cat-file --batch`` process."""
+
+    def __init__(self, cwd: str):
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._lock = threading.Lock()
+
+    def read(self, sha: str) -> bytes | None:
+        with self._lock:
+            self._proc.stdin.write(sha.encode("ascii") + b"\n")
+            self._proc.stdin.flush()
+            header = self._proc.stdout.readline().split()
+            if len(header) != 3:
+                # "<sha> missing" / "<sha> ambiguous"
+                return None
+            size = int(header[2])
+            data = self._proc.stdout.read(size)
+            self._proc.stdout.read(1)  # trailing newline
+        return data if header[1] == b"blob" else None
+
+    def close(self):
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+
+
+class BlobMetricsCache:
+    """On-disk FileMetrics by (blob sha, extension); None marks a binary blob."""
+
+    def __init__(self, path: Path = BLOB_CACHE_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs_v4 ("
+            "sha TEXT NOT NULL, ext TEXT NOT NULL, data TEXT, PRIMARY KEY (sha, ext)"
+            ") WITHOUT ROWID"
+        )
+
+    def get_many(self, keys: list[BlobKey]) -> dict[BlobKey, FileMetrics | None]:
+        found: dict[BlobKey, FileMetrics | None] = {}
+        for key in keys:
+            row = self._conn.execute("SELECT data FROM blobs_v4 WHERE sha=? AND ext=?", key).fetchone()
+            if row is not None:
+                found[key] = _decode(row[0])
+        return found
+
+    def put_many(self, items: dict[BlobKey, FileMetrics | None]):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO blobs_v4 (sha, ext, data) VALUES (?, ?, ?)",
+                [(sha, ext, _encode(m)) for (sha, ext), m in items.items()],
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+def _encode(metrics: FileMetrics | None) -> str | None:
+    if metrics is None:
+        return None
+    return json.dumps({
+        "l": metrics.lines,
+        "f": [[f.name, f.start_line, f.length, f.cyclomatic, f.cognitive, f.nesting] for f in metrics.functions],
+        "a": metrics.anomalies,
+        "i": metrics.imports,
+    }, separators=(",", ":"))
+
+
+def _decode(data: str | None) -> FileMetrics | None:
+    if data is None:
+        return None
+    raw = json.loads(data)
+    return FileMetrics(
+        lines=raw["l"],
+        functions=[SymbolMetrics(*f) for f in raw["f"]],
+        anomalies=[tuple(a) for a in raw["a"]],
+        imports=raw["i"],
+    )
+
+
+def _analyze_blob(item: tuple[bytes, str]) -> FileMetrics | None:
+    """Metrics pool worker: one blob's metrics, None when it is binary."""
+    data, extension = item
+    if is_binary(data):
+        return None
+    return analyze_bytes(data, extension)
+
+
+# --- Git plumbing ---
+
+def _git(root: str, args: list[str]) -> str:
+    r = subprocess.run(["git"] + args, cwd=root, capture_output=True, text=True, shell=False)
+    if r.returncode != 0:
+        raise ValueError(r.stderr.strip() or f"git {args[0]} failed")
+    return r.stdout
+
+
+def _iter_log(root: str, rev_range: str, max_commits: int | None) -> Iterator[tuple[str, int, str | None, list]]:
+    """(sha, commit time, first parent, [(status, mode, blob sha, path)]) oldest first."""
+    args = [
+        "git", "log", "--first-parent", "--reverse", "--root", "--raw", "-z",
+        "--no-renames", "--no-abbrev", "--format=%x01%H %ct %P",
+    ]
+    if max_commits:
+        args.append(f"--max-count={max_commits}")
+    args += [rev_range, "--"]
+    proc = subprocess.Popen(args, cwd=root, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    current: tuple[str, int, str | None, list] | None = None
+    pending_meta: list[str] | None = None
+    buffer = b""
+    try:
+        while True:
+            chunk = proc.stdout.read(1 << 16)
+            if not chunk:
+                break
+            buffer += chunk
+            *tokens, buffer = buffer.split(b"\0")
+            for raw in tokens:
+                token = raw.decode("utf-8", errors="surrogateescape").lstrip("\n")
+                if pending_meta is not None:
+                    # Path following a ":<old mode> <new mode> <old> <new> <status>" record
+                    _, mode, _, blob, status = pending_meta
+                    current[3].append((status[0], mode, blob, token))
+                    pending_meta = None
+                elif token.startswith("\x01"):
+                    if current is not None:
+                        yield current
+                    fields = token[1:].split()
+                    current = (fields[0], int(fields[1]), fields[2] if len(fields) > 2 else None, [])
+                elif token.startswith(":"):
+                    pending_meta = token[1:].split()
+        if current is not None:
+            yield current
+    finally:
+        proc.stdout.close()
+        proc.kill()
+        proc.wait()
+
+
+def _ls_tree(root: str, commit: str) -> Iterator[tuple[str, str, str]]:
+    """(mode, blob sha, path) of every blob in ``commit``."""
+    out = _git(root, ["ls-tree", "-r", "-z", "--full-tree", commit])
+    for entry in out.split("\0"):
+        if not entry:
+            continue
+        meta, _, path = entry.partition("\t")
+        mode, kind, sha = meta.split()
+        if kind == "blob":
+            yield mode, sha, path
+
+
+# --- Job ---
+
+class BackfillJob:
+    def __init__(self, root: str, history: HealthHistory, rev_range: str = "HEAD", max_commits: int | None = None):
+        if not rev_range or rev_range.startswith("-"):
+            raise ValueError("Invalid revision range")
+        self.root = str(Path(root).resolve())
+        self.history = history
+        self.rev_range = rev_range
+        self.max_commits = max_commits
+        self.status = "running"
+        self.total = 0
+        self.done = 0
+        self.recorded = 0
+        self.blobs_analyzed = 0
+        self.blobs_cached = 0
+        self.error: str | None = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="health-backfill", daemon=True)
+        self._ignore = get_ignore_rules(self.root)
+        self._prefix = ""
+        self._test_map = TestMap()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def to_model(self) -> HealthBackfillStatus:
+        return HealthBackfillStatus(
+            root=self.root,
+            status=self.status,
+            rev_range=self.rev_range,
+            total=self.total,
+            done=self.done,
+            recorded=self.recorded,
+            blobs_analyzed=self.blobs_analyzed,
+            blobs_cached=self.blobs_cached,
+            error=self.error,
+        )
+
+    def _run(self):
+        reader = None
+        cache = None
+        try:
+            self._prefix = _git(self.root, ["rev-parse", "--show-prefix"]).strip()
+            count_args = ["rev-list", "--first-parent", "--count"]
+            if self.max_commits:
+                count_args.append(f"--max-count={self.max_commits}")
+            self.total = int(_git(self.root, count_args + [self.rev_range, "--"]).strip() or 0)
+            reader = CatFileReader(self.root)
+            cache = BlobMetricsCache()
+            self._backfill(reader, cache)
+            self.status = "cancelled" if self._cancel.is_set() else "done"
+        except Exception as e:
+            logger.error(f"Health backfill failed: {e}")
+            self.status = "failed"
+            self.error = str(e)[:500]
+        finally:
+            if reader is not None:
+                reader.close()
+            if cache is not None:
+                cache.close()
+
+    def _backfill(self, reader: CatFileReader, cache: BlobMetricsCache):
+        recorded = self.history.commits(self.root, source="backfill")
+        tree: dict[str, BlobKey] = {}
+        metrics: dict[BlobKey, FileMetrics | None] = {}
+        previous: dict[str, tuple] | None = None
+        batch: list[tuple[str, int, str | None, list]] = []
+        first = True
+
+        for commit in _iter_log(self.root, self.rev_range, self.max_commits):
+            if self._cancel.is_set():
+                return
+            if first and commit[2]:
+                # Range starts mid-history: begin from the parent's tree
+                for mode, sha, path in _ls_tree(self.root, commit[2]):
+                    self._apply(tree, "A", mode, sha, path)
+            first = False
+            batch.append(commit)
+            if len(batch) >= BATCH_COMMITS:
+                previous = self._run_batch(batch, tree, metrics, previous, recorded, reader, cache)
+                batch = []
+        if batch and not self._cancel.is_set():
+            self._run_batch(batch, tree, metrics, previous, recorded, reader, cache)
+
+    def _run_batch(self, batch, tree, metrics, previous, recorded, reader, cache):
+        # Every blob a commit of this batch can see: the tree so far plus new blobs
+        needed = set(tree.values())
+        for _, _, _, changes in batch:
+            for status, mode, sha, path in changes:
+                key = self._key(status, mode, sha, path)
+                if key is not None:
+                    needed.add(key)
+        self._load_metrics(needed - metrics.keys(), metrics, reader, cache)
+
+        for sha, ts, _, changes in batch:
+            if self._cancel.is_set():
+                return previous
+            for status, mode, blob, path in changes:
+                self._apply(tree, status, mode, blob, path)
+            self.done += 1
+            if sha in recorded:
+                # The next recorded commit writes a full file snapshot
+                previous = None
+                continue
+            file_metrics = [
+                (path, metrics[key]) for path, key in sorted(tree.items())
+                if metrics.get(key) is not None
+            ]
+            svc = HealthService(self.root, metrics=file_metrics, test_map=self._test_map)
+            files = {rel: m.summary() for rel, m in file_metrics}
+            self.history.record(
+                self.root, svc.scan(), files,
+                commit=sha, source="backfill", ts=float(ts), base=previous or {},
+            )
+            self.recorded += 1
+            previous = files
+
+        # Keep only what the current tree still uses in memory
+        live = set(tree.values())
+        for key in [k for k in metrics if k not in live]:
+            del metrics[key]
+        return previous
+
+    def _load_metrics(self, keys: set[BlobKey], metrics: dict, reader: CatFileReader, cache: BlobMetricsCache):
+        if not keys:
+            return
+        cached = cache.get_many(list(keys))
+        metrics.update(cached)
+        self.blobs_cached += len(cached)
+        missing = [k for k in keys if k not in cached]
+        items: list[tuple[bytes, str]] = []
+        fetched: list[BlobKey] = []
+        for key in missing:
+            data = reader.read(key[0])
+            if data is None:
+                metrics[key] = None
+                continue
+            items.append((data, key[1]))
+            fetched.append(key)
+        analyzed = dict(zip(fetched, map_files(_analyze_blob, items)))
+        metrics.update(analyzed)
+        cache.put_many(analyzed)
+        self.blobs_analyzed += len(analyzed)
+
+    def _key(self, status: str, mode: str, sha: str, path: str) -> BlobKey | None:
+        rel = self._relative(path)
+        if rel is None or status == "D" or mode == SUBMODULE_MODE:
+            return None
+        return sha, Path(rel).suffix
+
+    def _apply(self, tree: dict[str, BlobKey], status: str, mode: str, sha: str, path: str):
+        rel = self._relative(path)
+        if rel is None:
+            return
+        if status == "D" or mode == SUBMODULE_MODE:
+            tree.pop(rel, None)
+        else:
+            tree[rel] = (sha, Path(rel).suffix)
+
+    def _relative(self, path: str) -> str | None:
+        """Workspace-relative path of a repository path, None if not scanned."""
+        if self._prefix:
+            if not path.startswith(self._prefix):
+                return None
+            path = path[len(self._prefix):]
+        if Path(path).suffix not in SOURCE_EXTENSIONS:
+            return None
+        parts = path.split("/")
+        if any(part in SKIP_DIRS for part in parts[:-1]):
+            return None
+        # Today's ignore rules stand in for the ones in force at the time
+        if self._ignore.is_ignored(path):
+            return None
+        return path
+
+
+_jobs: dict[str, BackfillJob] = {}
+_jobs_lock = threading.Lock()
+
+
+def start_backfill(
+    root: str,
+    history: HealthHistory,
+    rev_range: str = "HEAD",
+    max_commits: int | None = None,
+) -> BackfillJob:
+    job = BackfillJob(root, history, rev_range, max_commits)
+    with _jobs_lock:
+        existing = _jobs.get(job.root)
+        if existing is not None and existing.running:
+            raise ValueError("A backfill is already running for this workspace")
+        _jobs[job.root] = job
+    job.start()
+    return job
+
+
+def get_backfill(root: str) -> BackfillJob | None:
+    with _jobs_lock:
+        return _jobs.get(str(Path(root).resolve()))
@@ -0,0 +1,278 @@
+"""HealthDaemon — keeps the workspace health report current in the background.
+
+The daemon recomputes the scan/watch reports off the event loop whenever the
+workspace index reports file changes (debounced), or the configured
+workspace changes. Recomputes are incremental: only files whose (mtime,
+size) changed are re-analysed (see ``health_service``). HTTP handlers read
+the last snapshot without doing any work, and subscribers receive score and
+finding deltas as they happen. Each recompute is also appended to the
+health history, tagged with the HEAD commit.
+"""
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from models.health import CriticalAnomaly, HealthScanResponse, HealthWatchResponse
+from services.git_service import GitService
+from services.health_history import HealthHistory
+from services.health_service import HealthService
+from services.workspace_index import WorkspaceIndex, get_workspace_index
+
+logger = logging.getLogger("health_daemon")
+
+# Quiet period after the last file change before recomputing
+DEBOUNCE_SECONDS = 1.0
+# Settings (workspace root) and unwatched indexes are re-checked this often
+CHECK_INTERVAL = 10.0
+SUBSCRIBER_QUEUE_SIZE = 32
+
+
+@dataclass
+class HealthSnapshot:
+    root: str
+    version: int
+    computed_at: float
+    scan: HealthScanResponse
+    watch: HealthWatchResponse
+
+
+def _finding_key(finding: CriticalAnomaly) -> tuple:
+    return finding.severity, finding.category, finding.sector, finding.message
+
+
+class HealthDaemon:
+    def __init__(
+        self,
+        root_loader: Callable[[], str] | None = None,
+        history: HealthHistory | None = None,
+    ):
+        self._root_loader = root_loader
+        self._history = history
+        self._last_commit: dict[str, str | None] = {}
+        self._snapshot: HealthSnapshot | None = None
+        self._version = 0
+        self._task: asyncio.Task | None = None
+        self._running = False
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._ready: asyncio.Event | None = None
+        self._dirty_at: float | None = None
+        self._dirty_lock = threading.Lock()
+        self._index: WorkspaceIndex | None = None
+        self._generation = -1
+        self._subscribers: set[asyncio.Queue] = set()
+
+    @property
+    def active(self) -> bool:
+        return self._running and self._task is not None and not self._task.done()
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._running = True
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("HealthDaemon started")
+
+    def stop(self):
+        self._running = False
+        self._attach(None)
+        if self._task and not self._task.done():
+            self._task.cancel()
+        logger.info("HealthDaemon stopped")
+
+    # --- Snapshots ---
+
+    def snapshot(self, root: str | None = None) -> HealthSnapshot | None:
+        """Last computed report, if it is for ``root`` (or any root when None)."""
+        snap = self._snapshot
+        if snap is None or (root is not None and snap.root != str(Path(root).resolve())):
+            return None
+        return snap
+
+    async def wait_snapshot(self, root: str, timeout: float = 60.0) -> HealthSnapshot:
+        """Snapshot for ``root``, waiting for the first computation if needed.
+
+        Falls back to computing in a worker thread when the daemon is not
+        running or is busy with another workspace.
+        """
+        snap = self.snapshot(root)
+        if snap is not None:
+            return snap
+        if self.active and self._current_root() == str(Path(root).resolve()):
+            self._wake.set()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            snap = self.snapshot(root)
+            if snap is not None:
+                return snap
+        scan, watch, _ = await asyncio.to_thread(_compute, root)
+        return HealthSnapshot(str(Path(root).resolve()), self._version, time.time(), scan, watch)
+
+    # --- Push updates ---
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue receiving one event dict per published change."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def snapshot_event(self, snap: HealthSnapshot) -> dict:
+        return {
+            "type": "snapshot",
+            "version": snap.version,
+            "scores": snap.watch.scores.model_dump(),
+            "has_critical": snap.watch.has_critical,
+            "anomalies": [a.model_dump() for a in snap.watch.anomalies],
+        }
+
+    def _publish(self, old: HealthSnapshot | None, new: HealthSnapshot):
+        if old is None or old.root != new.root:
+            event = self.snapshot_event(new)
+        else:
+            before = {_finding_key(a): a for a in old.watch.anomalies}
+            after = {_finding_key(a): a for a in new.watch.anomalies}
+            added = [a.model_dump() for k, a in after.items() if k not in before or a != before[k]]
+            removed = [a.model_dump() for k, a in before.items() if k not in after]
+            scores_changed = old.watch.scores != new.watch.scores
+            if not (added or removed or scores_changed or old.watch.has_critical != new.watch.has_critical):
+                return
+            event = {
+                "type": "delta",
+                "version": new.version,
+                "has_critical": new.watch.has_critical,
+                "added": added,
+                "removed": removed,
+            }
+            if scores_changed:
+                event["scores"] = new.watch.scores.model_dump()
+        for queue in list(self._subscribers):
+            if queue.full():
+                # A stalled client gets a fresh snapshot instead of a backlog
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.snapshot_event(new))
+            else:
+                queue.put_nowait(event)
+
+    # --- Internal ---
+
+    def _current_root(self) -> str | None:
+        root = self._load_root()
+        if not root or not Path(root).is_dir():
+            return None
+        return str(Path(root).resolve())
+
+    def _load_root(self) -> str:
+        if self._root_loader:
+            return self._root_loader()
+        from routes.settings import load_settings
+        return load_settings().get("workspace_root", "")
+
+    def _attach(self, index: WorkspaceIndex | None):
+        if self._index is index:
+            return
+        if self._index is not None:
+            self._index.unsubscribe(self._on_change)
+        self._index = index
+        self._generation = -1
+        if index is not None:
+            index.subscribe(self._on_change)
+
+    def _on_change(self, changed: set[str], removed: set[str]):
+        # Called from the watcher thread
+        self._mark_dirty()
+
+    def _mark_dirty(self):
+        with self._dirty_lock:
+            self._dirty_at = time.monotonic()
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self):
+        while self._running:
+            try:
+                await self._cycle()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Health recompute failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                break
+            self._wake.clear()
+            # Let a burst of edits settle before recomputing
+            while True:
+                with self._dirty_lock:
+                    dirty_at = self._dirty_at
+                wait = DEBOUNCE_SECONDS - (time.monotonic() - dirty_at) if dirty_at else 0
+                if wait <= 0:
+                    break
+                try:
+                    await asyncio.sleep(wait)
+                except asyncio.CancelledError:
+                    return
+
+    async def _cycle(self):
+        root = self._current_root()
+        if root is None:
+            self._attach(None)
+            if self._snapshot is not None:
+                self._snapshot = None
+                self._ready.clear()
+            return
+        index = await asyncio.to_thread(get_workspace_index, root)
+        self._attach(index)
+        with self._dirty_lock:
+            dirty, self._dirty_at = self._dirty_at is not None, None
+        current = self._snapshot
+        if (
+            current is not None
+            and current.root == root
+            and not dirty
+            and index.generation == self._generation
+        ):
+            return
+        if current is not None and current.root != root:
+            self._ready.clear()
+        generation = index.generation
+        scan, watch, files = await asyncio.to_thread(_compute, root)
+        self._generation = generation
+        self._version += 1
+        snap = HealthSnapshot(root, self._version, time.time(), scan, watch)
+        self._snapshot = snap
+        self._ready.set()
+        self._publish(current, snap)
+        if self._history is not None:
+            await asyncio.to_thread(self._record, root, scan, files)
+
+    def _record(self, root: str, scan: HealthScanResponse, files: dict):
+        try:
+            commit = GitService(root).head_commit()
+            # The first scan on a new HEAD marks the commit in the series
+            source = "commit" if root in self._last_commit and self._last_commit[root] != commit else "scan"
+            self._last_commit[root] = commit
+            self._history.record(root, scan, files, commit=commit, source=source)
+        except Exception as e:
+            logger.warning(f"Could not record health history: {e}")
+
+
+def _compute(root: str) -> tuple[HealthScanResponse, HealthWatchResponse, dict]:
+    # One service shares its file metrics between both reports
+    svc = HealthService(root)
+    files = {rel: m.summary() for rel, m in svc.file_metrics()}
+    return svc.scan(), svc.watch(), files
@@ -0,0 +1,301 @@
+"""HealthHistory — time series of health metrics, per project and per file.
+
+Every recorded scan adds one ``samples`` row with the project-wide scores
+and totals, tagged with the HEAD commit. Per-file metrics are delta-encoded:
+``file_metrics`` only gets a row for files whose metrics differ from the
+previous sample (or that were removed), so a file's series is a list of
+change points and an idle tree costs one row per scan.
+
+Scans within ``MERGE_WINDOW`` of the previous sample on the same commit
+update that sample instead of adding a new one, so a burst of edits does
+not flood the series. Range queries are downsampled in SQL into at most
+``buckets`` averaged points.
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from models.health import FileHealthPoint, HealthSample, HealthScanResponse
+
+DB_PATH = Path(__file__).parent.parent / "health_history.db"
+
+# Samples this close together on the same commit are merged
+MERGE_WINDOW = 300.0
+MAX_BUCKETS = 2000
+
+_SAMPLE_COLUMNS = (
+    "complexity", "coverage", "cleanliness", "file_size",
+    "files", "functions", "anomalies", "complex_functions",
+)
+_FILE_COLUMNS = ("lines", "functions", "max_cognitive", "total_cognitive", "anomalies")
+
+
+class HealthHistory:
+    def __init__(self, db_path: Path | None = None):
+        self._conn = sqlite3.connect(str(db_path or DB_PATH), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._init_schema()
+
+    def _init_schema(self):
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS samples (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                root TEXT NOT NULL,
+                ts REAL NOT NULL,
+                commit_sha TEXT,
+                source TEXT NOT NULL DEFAULT 'scan',
+                complexity INTEGER NOT NULL,
+                coverage INTEGER NOT NULL,
+                cleanliness INTEGER NOT NULL,
+                file_size INTEGER NOT NULL,
+                files INTEGER NOT NULL DEFAULT 0,
+                functions INTEGER NOT NULL DEFAULT 0,
+                anomalies INTEGER NOT NULL DEFAULT 0,
+                complex_functions INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS samples_root_ts ON samples(root, ts);
+            CREATE TABLE IF NOT EXISTS file_metrics (
+                sample_id INTEGER NOT NULL REFERENCES samples(id),
+                path TEXT NOT NULL,
+                lines INTEGER NOT NULL DEFAULT 0,
+                functions INTEGER NOT NULL DEFAULT 0,
+                max_cognitive INTEGER NOT NULL DEFAULT 0,
+                total_cognitive INTEGER NOT NULL DEFAULT 0,
+                anomalies INTEGER NOT NULL DEFAULT 0,
+                removed INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (sample_id, path)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS file_metrics_path ON file_metrics(path, sample_id);
+            -- Latest metrics per file, the base the next delta is taken against
+            CREATE TABLE IF NOT EXISTS file_state (
+                root TEXT NOT NULL,
+                path TEXT NOT NULL,
+                lines INTEGER NOT NULL,
+                functions INTEGER NOT NULL,
+                max_cognitive INTEGER NOT NULL,
+                total_cognitive INTEGER NOT NULL,
+                anomalies INTEGER NOT NULL,
+                PRIMARY KEY (root, path)
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+
+    # --- Recording ---
+
+    def record(
+        self,
+        root: str,
+        scan: HealthScanResponse,
+        files: dict[str, tuple[int, int, int, int, int]],
+        commit: str | None = None,
+        source: str = "scan",
+        ts: float | None = None,
+        base: dict[str, tuple[int, int, int, int, int]] | None = None,
+    ) -> int:
+        """Store one scan; returns the sample id.
+
+        ``files`` maps root-relative paths to (lines, functions, max
+        cognitive, total cognitive, anomalies). File deltas are taken
+        against the last recorded scan, or against ``base`` when given —
+        for series recorded out of band, such as a history backfill.
+        """
+        ts = time.time() if ts is None else ts
+        s = scan.scores
+        values = (
+            s.complexity, s.coverage, s.cleanliness, s.file_size,
+            len(files),
+            sum(f[1] for f in files.values()),
+            sum(f[4] for f in files.values()),
+            len(scan.complex_functions),
+        )
+        with self._lock, self._conn:
+            last = self._conn.execute(
+                "SELECT id, ts, commit_sha, source FROM samples WHERE root=? ORDER BY ts DESC, id DESC LIMIT 1",
+                (root,),
+            ).fetchone()
+            if (
+                base is None
+                and last is not None
+                and ts - last["ts"] < MERGE_WINDOW
+                and last["commit_sha"] == commit
+                and last["source"] == source
+            ):
+                sample_id = last["id"]
+                self._conn.execute(
+                    f"UPDATE samples SET ts=?, {', '.join(f'{c}=?' for c in _SAMPLE_COLUMNS)} WHERE id=?",
+                    (ts, *values, sample_id),
+                )
+            else:
+                cur = self._conn.execute(
+                    f"INSERT INTO samples (root, ts, commit_sha, source, {', '.join(_SAMPLE_COLUMNS)}) "
+                    f"VALUES (?, ?, ?, ?, {', '.join('?' * len(_SAMPLE_COLUMNS))})",
+                    (root, ts, commit, source, *values),
+                )
+                sample_id = cur.lastrowid
+            self._record_files(root, sample_id, files, base)
+        return sample_id
+
+    def _record_files(
+        self,
+        root: str,
+        sample_id: int,
+        files: dict[str, tuple[int, int, int, int, int]],
+        base: dict[str, tuple[int, int, int, int, int]] | None,
+    ):
+        if base is not None:
+            previous = {path: tuple(values) for path, values in base.items()}
+        else:
+            previous = {
+                row["path"]: tuple(row[c] for c in _FILE_COLUMNS)
+                for row in self._conn.execute(
+                    f"SELECT path, {', '.join(_FILE_COLUMNS)} FROM file_state WHERE root=?", (root,),
+                )
+            }
+        changed = [(path, values) for path, values in files.items() if previous.get(path) != tuple(values)]
+        removed = [path for path in previous if path not in files]
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO file_metrics (sample_id, path, {', '.join(_FILE_COLUMNS)}, removed) "
+            f"VALUES (?, ?, {', '.join('?' * len(_FILE_COLUMNS))}, 0)",
+            [(sample_id, path, *values) for path, values in changed],
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO file_metrics (sample_id, path, removed) VALUES (?, ?, 1)",
+            [(sample_id, path) for path in removed],
+        )
+        if base is not None:
+            return
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO file_state (root, path, {', '.join(_FILE_COLUMNS)}) "
+            f"VALUES (?, ?, {', '.join('?' * len(_FILE_COLUMNS))})",
+            [(root, path, *values) for path, values in changed],
+        )
+        self._conn.executemany(
+            "DELETE FROM file_state WHERE root=? AND path=?",
+            [(root, path) for path in removed],
+        )
+
+    # --- Queries ---
+
+    def commits(self, root: str, source: str | None = None) -> set[str]:
+        """Commits with a recorded sample (of ``source``, if given)."""
+        query = "SELECT DISTINCT commit_sha FROM samples WHERE root=? AND commit_sha IS NOT NULL"
+        params: tuple = (root,)
+        if source is not None:
+            query += " AND source=?"
+            params += (source,)
+        with self._lock:
+            return {row[0] for row in self._conn.execute(query, params)}
+
+    def samples(
+        self,
+        root: str,
+        start: float | None = None,
+        end: float | None = None,
+        buckets: int = 200,
+    ) -> tuple[list[HealthSample], float]:
+        """Project samples in [start, end], averaged into at most ``buckets`` points.
+
+        Returns (samples, bucket width in seconds; 0 when not downsampled).
+        """
+        start, end = self._range(root, start, end)
+        buckets = max(1, min(buckets, MAX_BUCKETS))
+        with self._lock:
+            count = self._conn.execute(
+                "SELECT COUNT(*) FROM samples WHERE root=? AND ts BETWEEN ? AND ?", (root, start, end),
+            ).fetchone()[0]
+            if count <= buckets:
+                rows = self._conn.execute(
+                    f"SELECT ts, commit_sha, source, {', '.join(_SAMPLE_COLUMNS)} FROM samples "
+                    "WHERE root=? AND ts BETWEEN ? AND ? ORDER BY ts",
+                    (root, start, end),
+                ).fetchall()
+                return [_row_to_sample(row) for row in rows], 0.0
+            width = (end - start) / buckets or 1.0
+            # Each bucket averages its samples; with a single MAX() the bare
+            # commit_sha column comes from the bucket's last sample
+            rows = self._conn.execute(
+                f"""
+                SELECT MAX(ts) AS ts, commit_sha, 'bucket' AS source,
+                       {', '.join(f'AVG({c}) AS {c}' for c in _SAMPLE_COLUMNS)}
+                FROM samples
+                WHERE root=? AND ts BETWEEN ? AND ?
+                GROUP BY MIN(CAST((ts - ?) / ? AS INTEGER), ?)
+                ORDER BY ts
+                """,
+                (root, start, end, start, width, buckets - 1),
+            ).fetchall()
+        return [_row_to_sample(row) for row in rows], width
+
+    def file_points(
+        self,
+        root: str,
+        path: str,
+        start: float | None = None,
+        end: float | None = None,
+        buckets: int = 200,
+    ) -> list[FileHealthPoint]:
+        """Change points of one file in [start, end], the value in force at
+        ``start`` first; thinned to the last change per bucket."""
+        start, end = self._range(root, start, end)
+        buckets = max(1, min(buckets, MAX_BUCKETS))
+        columns = ", ".join(f"f.{c}" for c in _FILE_COLUMNS)
+        with self._lock:
+            base = self._conn.execute(
+                f"SELECT s.ts, s.commit_sha, {columns}, f.removed FROM file_metrics f "
+                "JOIN samples s ON s.id = f.sample_id "
+                "WHERE f.path=? AND s.root=? AND s.ts < ? ORDER BY s.ts DESC LIMIT 1",
+                (path, root, start),
+            ).fetchone()
+            rows = self._conn.execute(
+                f"SELECT s.ts, s.commit_sha, {columns}, f.removed FROM file_metrics f "
+                "JOIN samples s ON s.id = f.sample_id "
+                "WHERE f.path=? AND s.root=? AND s.ts BETWEEN ? AND ? ORDER BY s.ts",
+                (path, root, start, end),
+            ).fetchall()
+        points = [_row_to_file_point(row) for row in rows]
+        if base is not None and not base["removed"]:
+            first = _row_to_file_point(base)
+            first.ts = start
+            points.insert(0, first)
+        if len(points) > buckets:
+            width = (end - start) / buckets or 1.0
+            thinned: dict[int, FileHealthPoint] = {}
+            for point in points:
+                thinned[min(int((point.ts - start) / width), buckets - 1)] = point
+            points = list(thinned.values())
+        return points
+
+    def _range(self, root: str, start: float | None, end: float | None) -> tuple[float, float]:
+        if start is None:
+            with self._lock:
+                row = self._conn.execute("SELECT MIN(ts) FROM samples WHERE root=?", (root,)).fetchone()
+            start = row[0] if row and row[0] is not None else 0.0
+        if end is None:
+            end = time.time()
+        if end < start:
+            raise ValueError("end must not be before start")
+        return start, end
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _row_to_sample(row: sqlite3.Row) -> HealthSample:
+    return HealthSample(
+        ts=row["ts"],
+        commit=row["commit_sha"],
+        source=row["source"],
+        **{c: row[c] for c in _SAMPLE_COLUMNS},
+    )
+
+
+def _row_to_file_point(row: sqlite3.Row) -> FileHealthPoint:
+    return FileHealthPoint(
+        ts=row["ts"],
+        commit=row["commit_sha"],
+        removed=bool(row["removed"]),
+        **{c: row[c] for c in _FILE_COLUMNS},
+    )
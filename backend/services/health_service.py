@@ -1,23 +1,88 @@
 import os
-import re
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
 
 from models.health import ComplexFunction, CodeAnomaly, LargeFile, HealthScores, HealthScanResponse, CriticalAnomaly, HealthWatchResponse
-from services.file_service import SKIP_DIRS
+from services.byte_reader import Buffer, count_newlines, open_buffer
+from services.complexity_metrics import MAX_ANALYZED_SIZE, SymbolMetrics, analyze_source, map_files
+from services.dependency_service import extract_imports
+from services.markers import extract_markers
+from services.test_mapping import FileCoverage, TestMap, get_test_map, is_test_file, load_coverage
+from services.todo_index import get_todo_index
+from services.workspace_index import get_workspace_index
 
 SOURCE_EXTENSIONS = {".py", ".ts", ".tsx", ".js", ".jsx"}
-TEST_PATTERNS = re.compile(r"(test_.*\.py|.*\.test\.(ts|tsx|js|jsx)|.*\.spec\.(ts|tsx|js|jsx))$")
 
-# Patterns for function/class definitions
-PY_DEF = re.compile(r"^(class |def )\s*(\w+)")
-JS_DEF = re.compile(r"^(?:export\s+)?(?:async\s+)?(?:function|const|let|var)\s+(\w+)")
+# A function is flagged as complex at this cognitive complexity, or its length threshold
+COGNITIVE_THRESHOLD = 15
+# An import cycle this large is reported as a warning
+CYCLE_WARNING_SIZE = 5
 
-ANOMALY_TAGS = re.compile(r"(?:#|//)\s*(TODO|FIXME|HACK|XXX|BUG)\b[:\s]*(.*)", re.IGNORECASE)
+# Marker text kept per anomaly
+MAX_ANOMALY_TEXT = 120
+
+
+@dataclass(slots=True)
+class FileMetrics:
+    """Everything the health scan needs from one file, extracted in one read."""
+    lines: int
+    functions: list[SymbolMetrics]
+    anomalies: list[tuple[int, str, str]]  # (line, tag, text)
+    imports: list[str] = field(default_factory=list)  # raw specifiers, see dependency_service
+
+    def summary(self) -> tuple[int, int, int, int, int]:
+        """(lines, functions, max cognitive, total cognitive, anomalies) for the history store."""
+        cognitive = [f.cognitive for f in self.functions]
+        return self.lines, len(self.functions), max(cognitive, default=0), sum(cognitive), len(self.anomalies)
+
+
+# Absolute path -> (mtime, size, metrics); shared by every HealthService
+_metrics_cache: dict[str, tuple[float, int, FileMetrics]] = {}
+_metrics_lock = threading.Lock()
+
+
+def analyze_file(path: str | Path) -> FileMetrics | None:
+    """Metrics for one file; module-level so the metrics pool can run it."""
+    path = Path(path)
+    with open_buffer(path) as data:
+        if data is None:
+            return None
+        return analyze_bytes(data, path.suffix)
+
+
+def analyze_bytes(data: Buffer, extension: str) -> FileMetrics:
+    total = count_newlines(data)
+    if len(data) and data[-1:] != b"\n":
+        total += 1
+
+    functions: list[SymbolMetrics] = []
+    imports: list[str] = []
+    if len(data) <= MAX_ANALYZED_SIZE:
+        source = data[:].decode("utf-8", errors="replace")
+        functions = analyze_source(source, extension)
+        imports = extract_imports(source, extension)
+
+    anomalies = [(m.line, m.tag, m.text[:MAX_ANOMALY_TEXT]) for m in extract_markers(data, extension)]
+    return FileMetrics(lines=total, functions=functions, anomalies=anomalies, imports=imports)
 
 
 class HealthService:
-    def __init__(self, workspace_root: str):
+    def __init__(
+        self,
+        workspace_root: str,
+        metrics: list[tuple[str, FileMetrics]] | None = None,
+        test_map: TestMap | None = None,
+    ):
+        """``metrics`` (sorted (relative path, metrics) pairs) replaces the
+        workspace scan, e.g. to score a historical revision; coverage reports
+        on disk are then ignored. ``test_map`` lets a series of such scans
+        share one incrementally updated mapping."""
         self.root = Path(workspace_root)
+        self._metrics = metrics
+        self._live = metrics is None
+        self._test_map = test_map
+        self._tested: set[str] | None = None
 
     def scan(self) -> HealthScanResponse:
         complex_functions = self._find_complex_functions()
@@ -32,126 +97,138 @@ class HealthService:
             untested_files=untested_files[:30],
             anomalies=anomalies[:50],
             large_files=large_files[:20],
+            import_cycles=self._find_import_cycles()[:20],
         )
 
-    def _source_files(self) -> list[Path]:
-        files = []
-        for dirpath, dirnames, filenames in os.walk(self.root):
-            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
-            for fn in filenames:
-                p = Path(dirpath) / fn
-                if p.suffix in SOURCE_EXTENSIONS:
-                    files.append(p)
-        return files
-
-    def _find_complex_functions(self, threshold: int = 50) -> list[ComplexFunction]:
-        results = []
-        for fp in self._source_files():
-            try:
-                lines = fp.read_text(errors="replace").splitlines()
-            except Exception:
-                continue
-
-            is_python = fp.suffix == ".py"
-            pattern = PY_DEF if is_python else JS_DEF
-
-            current_name = None
-            current_start = 0
-            current_indent = 0
-
-            for i, line in enumerate(lines):
-                stripped = line.lstrip()
-                indent = len(line) - len(stripped)
-                m = pattern.match(stripped)
-
-                if m:
-                    # Close previous
-                    if current_name and (i - current_start) >= threshold:
-                        results.append(ComplexFunction(
-                            file=str(fp.relative_to(self.root)),
-                            name=current_name,
-                            lines=i - current_start,
-                            start_line=current_start + 1,
-                        ))
-                    if is_python:
-                        current_name = m.group(2)
-                    else:
-                        current_name = m.group(1)
-                    current_start = i
-                    current_indent = indent
-
-            # Close last function
-            if current_name and (len(lines) - current_start) >= threshold:
-                results.append(ComplexFunction(
-                    file=str(fp.relative_to(self.root)),
-                    name=current_name,
-                    lines=len(lines) - current_start,
-                    start_line=current_start + 1,
-                ))
+    def file_metrics(self) -> list[tuple[str, FileMetrics]]:
+        """(path relative to root, metrics) for every source file, sorted by path.
 
-        results.sort(key=lambda x: x.lines, reverse=True)
+        Computed once per service; files whose (mtime, size) match the shared
+        cache are not re-read.
+        """
+        if self._metrics is not None:
+            return self._metrics
+        index = get_workspace_index(self.root)
+        # One snapshot: paths and entries must line up if the watcher applies a change
+        entries = index.files(extensions=SOURCE_EXTENSIONS, under=self.root)
+        rel = index.relative(self.root) or ""
+        cut = len(rel) + 1 if rel else 0
+        paths = [self.root / entry.path[cut:] for entry in entries]
+
+        found: list[FileMetrics | None] = []
+        stale: list[int] = []
+        seen: set[str] = set()
+        for entry in entries:
+            key = str(index.root / entry.path)
+            seen.add(key)
+            with _metrics_lock:
+                cached = _metrics_cache.get(key)
+            if cached is not None and cached[:2] == (entry.mtime, entry.size):
+                found.append(cached[2])
+            else:
+                found.append(None)
+                stale.append(len(found) - 1)
+
+        # Changed files are parsed on the metrics pool when there are many
+        fresh = map_files(analyze_file, [str(paths[i]) for i in stale])
+        with _metrics_lock:
+            for i, metrics in zip(stale, fresh):
+                found[i] = metrics
+                if metrics is not None:
+                    entry = entries[i]
+                    _metrics_cache[str(index.root / entry.path)] = (entry.mtime, entry.size, metrics)
+
+        results = [
+            (str(fp.relative_to(self.root)), metrics)
+            for fp, metrics in zip(paths, found)
+            if metrics is not None
+        ]
+
+        # Forget files that disappeared from this tree
+        prefix = os.path.join(index.root / rel, "")
+        with _metrics_lock:
+            for key in [k for k in _metrics_cache if k.startswith(prefix) and k not in seen]:
+                del _metrics_cache[key]
+        self._metrics = results
         return results
 
-    def _find_untested_files(self) -> list[str]:
-        source_files = set()
-        test_files = set()
-
-        for fp in self._source_files():
-            rel = str(fp.relative_to(self.root))
-            if TEST_PATTERNS.search(fp.name):
-                # Extract base name for matching
-                base = fp.name
-                for suffix in [".test.ts", ".test.tsx", ".test.js", ".test.jsx",
-                               ".spec.ts", ".spec.tsx", ".spec.js", ".spec.jsx"]:
-                    if base.endswith(suffix):
-                        base = base[: -len(suffix)]
-                        break
-                if base.startswith("test_"):
-                    base = base[5:]
-                    if base.endswith(".py"):
-                        base = base[:-3]
-                test_files.add(base.lower())
-            else:
-                source_files.add(rel)
+    def _find_complex_functions(
+        self,
+        threshold: int = 50,
+        cognitive_threshold: int = COGNITIVE_THRESHOLD,
+    ) -> list[ComplexFunction]:
+        results = [
+            ComplexFunction(
+                file=rel,
+                name=fn.name,
+                lines=fn.length,
+                start_line=fn.start_line,
+                cyclomatic=fn.cyclomatic,
+                cognitive=fn.cognitive,
+                nesting=fn.nesting,
+            )
+            for rel, metrics in self.file_metrics()
+            for fn in metrics.functions
+            if fn.length >= threshold or fn.cognitive >= cognitive_threshold
+        ]
+        results.sort(key=lambda x: (x.cognitive, x.lines), reverse=True)
+        return results
+
+    def _tested_sources(self) -> set[str]:
+        if self._tested is None:
+            if self._test_map is None:
+                self._test_map = get_test_map(self.root) if self._live else TestMap()
+            self._test_map.update([(rel, m.imports) for rel, m in self.file_metrics()])
+            self._tested = self._test_map.tested_sources()
+        return self._tested
 
-        untested = []
-        for rel in sorted(source_files):
-            name = Path(rel).stem.lower()
-            if name not in test_files:
-                untested.append(rel)
-        return untested
+    def _coverage(self) -> dict[str, FileCoverage] | None:
+        return load_coverage(self.root) if self._live else None
+
+    def _find_untested_files(self) -> list[str]:
+        """Sources no test imports and, given a coverage report, none of whose lines ran."""
+        tested = self._tested_sources()
+        coverage = self._coverage() or {}
+        return [
+            rel for rel, _ in self.file_metrics()
+            if not is_test_file(rel)
+            and rel not in tested
+            and not (rel in coverage and coverage[rel].covered)
+        ]
 
     def _find_anomalies(self) -> list[CodeAnomaly]:
-        results = []
-        for fp in self._source_files():
-            try:
-                lines = fp.read_text(errors="replace").splitlines()
-            except Exception:
-                continue
-            rel = str(fp.relative_to(self.root))
-            for i, line in enumerate(lines):
-                m = ANOMALY_TAGS.search(line)
-                if m:
-                    results.append(CodeAnomaly(
-                        file=rel,
-                        line=i + 1,
-                        tag=m.group(1).upper(),
-                        text=m.group(2).strip()[:120],
-                    ))
-        return results
+        if self._live:
+            # Same cached markers quests and missions read, for the scanned files
+            index = get_todo_index(self.root)
+            index.sync()
+            scanned = {rel for rel, _ in self.file_metrics()}
+            return [
+                CodeAnomaly(file=rel, line=m.line, tag=m.tag, text=m.content[:MAX_ANOMALY_TEXT])
+                for rel, m in index.markers()
+                if rel in scanned
+            ]
+        return [
+            CodeAnomaly(file=rel, line=line, tag=tag, text=text)
+            for rel, metrics in self.file_metrics()
+            for line, tag, text in metrics.anomalies
+        ]
+
+    def _find_import_cycles(self) -> list[list[str]]:
+        """Import cycles (files importing each other), largest first.
+
+        Only for the live workspace: the dependency graph tracks files on disk.
+        """
+        if not self._live:
+            return []
+        from services.dependency_graph import get_dependency_graph
+        return get_dependency_graph(self.root).analysis().cycles
 
     def _find_large_files(self, threshold: int = 500) -> list[LargeFile]:
-        results = []
-        for fp in self._source_files():
-            try:
-                count = sum(1 for _ in fp.open(errors="replace"))
-            except Exception:
-                continue
-            if count >= threshold:
-                results.append(LargeFile(
-                    file=str(fp.relative_to(self.root)),
-                    lines=count,
-                ))
+        results = [
+            LargeFile(file=rel, lines=metrics.lines)
+            for rel, metrics in self.file_metrics()
+            if metrics.lines >= threshold
+        ]
         results.sort(key=lambda x: x.lines, reverse=True)
         return results
 
@@ -160,12 +237,13 @@ class HealthService:
 
         Severity levels:
           critical — only for LSP/import errors or broken builds
-          warning  — functions > 100 lines, low scores
+          warning  — functions > 100 lines or cognitive complexity >= 25, low scores,
+                     import cycles spanning 5+ files
           info     — large files (> 500 lines), minor markers
           notice   — files > 500 lines (informational)
         """
         large_files = self._find_large_files(threshold=500)
-        complex_fns = self._find_complex_functions(threshold=100)
+        complex_fns = self._find_complex_functions(threshold=100, cognitive_threshold=25)
         anomalies_raw = self._find_anomalies()
         untested = self._find_untested_files()
         scores = self._compute_scores(complex_fns, untested, anomalies_raw, large_files)
@@ -189,7 +267,7 @@ class HealthService:
                 details=details,
             ))
 
-        # Functions > 100 lines — INFO/WARNING (cognitive load indicator)
+        # Long or tangled functions — INFO/WARNING (cognitive load indicator)
         if complex_fns:
             sectors = set()
             details = []
@@ -197,9 +275,9 @@ class HealthService:
                 parts = cf.file.split("/")
                 sector = "/".join(parts[:2]) if len(parts) > 1 else parts[0]
                 sectors.add(sector)
-                details.append(f"{cf.file}:{cf.name} ({cf.lines} lines)")
+                details.append(f"{cf.file}:{cf.name} ({cf.lines} lines, cognitive {cf.cognitive})")
             findings.append(CriticalAnomaly(
-                severity="warning" if any(cf.lines >= 200 for cf in complex_fns) else "info",
+                severity="warning" if any(cf.lines >= 200 or cf.cognitive >= 50 for cf in complex_fns) else "info",
                 category="complexity",
                 sector=", ".join(sorted(sectors)),
                 message=f"{len(complex_fns)} function(s) with elevated cognitive complexity",
@@ -254,6 +332,26 @@ class HealthService:
                 details=details,
             ))
 
+        # Import cycles — INFO, WARNING once a cycle spans several files
+        cycles = self._find_import_cycles()
+        if cycles:
+            from services.dependency_graph import get_dependency_graph
+            graph = get_dependency_graph(self.root, sync=False)
+            sectors = set()
+            details = []
+            for cycle in cycles[:5]:
+                for member in cycle:
+                    parts = member.split("/")
+                    sectors.add("/".join(parts[:2]) if len(parts) > 1 else parts[0])
+                details.append(" → ".join(graph.cycle_path(cycle)))
+            findings.append(CriticalAnomaly(
+                severity="warning" if len(cycles[0]) >= CYCLE_WARNING_SIZE else "info",
+                category="dependencies",
+                sector=", ".join(sorted(sectors)),
+                message=f"{len(cycles)} import cycle(s), largest spans {len(cycles[0])} files",
+                details=details,
+            ))
+
         # True CRITICAL: reserved for broken imports / LSP errors
         # (These would be injected by external LSP integration if available)
 
@@ -273,15 +371,20 @@ class HealthService:
         anomalies: list[CodeAnomaly],
         large: list[LargeFile],
     ) -> HealthScores:
-        all_source = self._source_files()
-        total = max(len(all_source), 1)
+        sources = [rel for rel, _ in self.file_metrics() if not is_test_file(rel)]
 
         # Complexity: fewer complex functions = higher score
         complexity = max(0, 100 - len(complex_fns) * 10)
 
-        # Coverage: ratio of tested files
-        tested_ratio = 1 - (len(untested) / total) if total > 0 else 1
-        coverage = int(tested_ratio * 100)
+        # Coverage: line coverage from a report when there is one, else the
+        # share of sources some test imports
+        report = self._coverage()
+        measured = [report[rel] for rel in sources if rel in report] if report else []
+        executable = sum(c.executable for c in measured)
+        if executable:
+            coverage = int(sum(c.covered for c in measured) * 100 / executable)
+        else:
+            coverage = int((1 - len(untested) / len(sources)) * 100) if sources else 100
 
         # Cleanliness: fewer anomalies = higher score
         cleanliness = max(0, 100 - len(anomalies) * 3)
@@ -0,0 +1,254 @@
+"""IgnoreRules — gitignore-style path filtering shared by every scanner.
+
+Rules are read from ``.gitignore``, ``.ignore`` and ``.codemancerignore`` in
+each directory (plus ``.git/info/exclude`` at the root) and compiled to
+regexes once per directory. Precedence follows git / ripgrep:
+
+- deeper directories override shallower ones;
+- within a directory ``.codemancerignore`` beats ``.ignore`` beats ``.gitignore``;
+- within a file the last matching pattern wins, so ``!pattern`` re-includes.
+
+As in git, nothing inside an ignored directory can be re-included.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger("ignore_rules")
+
+# Lowest to highest precedence within one directory
+IGNORE_FILE_NAMES = (".gitignore", ".ignore", ".codemancerignore")
+# Cached rules are re-validated against their files at most this often
+RECHECK_INTERVAL = 2.0
+
+
+@dataclass
+class _Rule:
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+
+
+@dataclass
+class _DirRules:
+    rules: list[_Rule] = field(default_factory=list)
+    any_match: re.Pattern | None = None  # alternation of every rule, a cheap precheck
+    signature: tuple = ()
+    checked_at: float = 0.0
+
+
+def _glob_to_regex(segment: str) -> str:
+    out: list[str] = []
+    i = 0
+    n = len(segment)
+    while i < n:
+        c = segment[i]
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(segment[i]))
+        elif c == "[":
+            # "]" right after "[" (or "[!") is a literal member
+            start = i + 1
+            if segment[start:start + 1] in ("!", "^"):
+                start += 1
+            if segment[start:start + 1] == "]":
+                start += 1
+            end = segment.find("]", start)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                body = segment[i + 1:end]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def compile_pattern(line: str) -> _Rule | None:
+    """Compile one ignore-file line; None for blanks and comments."""
+    line = line.rstrip("\r\n")
+    if not line or line.startswith("#"):
+        return None
+    while line.endswith(" ") and not line.endswith("\\ "):
+        line = line[:-1]
+    negate = False
+    if line.startswith("!"):
+        negate = True
+        line = line[1:]
+    elif line.startswith(("\\!", "\\#")):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # A slash anywhere but the end anchors the pattern to its directory
+    anchored = "/" in line
+    parts = line.lstrip("/").split("/")
+    regex: list[str] = []
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part == "**":
+            regex.append(".*" if last else "(?:.*/)?")
+            continue
+        regex.append(_glob_to_regex(part))
+        if not last:
+            regex.append("/")
+    body = "".join(regex)
+    if not anchored:
+        body = f"(?:.*/)?{body}"
+    try:
+        return _Rule(re.compile(body, re.DOTALL), negate, dir_only)
+    except re.error:
+        return None
+
+
+class IgnoreRules:
+    """Compiled ignore rules for one tree, cached per directory."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.version = 0  # bumped whenever any directory's rules change
+        self._dirs: dict[str, _DirRules] = {}
+        self._lock = threading.Lock()
+
+    def is_ignored(self, rel: str, is_dir: bool = False) -> bool:
+        """Whether root-relative ``rel`` or any directory above it is ignored."""
+        if not rel:
+            return False
+        parts = rel.split("/")
+        for i in range(1, len(parts) + 1):
+            parent = "/".join(parts[:i - 1])
+            if self._decide(self._levels(parent), "/".join(parts[:i]), is_dir or i < len(parts)):
+                return True
+        return False
+
+    def matcher(self, rel_dir: str) -> "DirMatcher":
+        """Matcher for the entries directly inside ``rel_dir`` (assumed not ignored)."""
+        return DirMatcher(rel_dir, self._levels(rel_dir))
+
+    def invalidate(self, rel_dir: str | None = None):
+        """Drop cached rules for one directory, or for all of them."""
+        with self._lock:
+            if rel_dir is None:
+                self._dirs.clear()
+            else:
+                self._dirs.pop(rel_dir, None)
+            self.version += 1
+
+    # --- Internal ---
+
+    def _levels(self, rel_dir: str) -> list[tuple[str, _DirRules]]:
+        """Rule sets that apply inside ``rel_dir``, deepest first."""
+        levels: list[tuple[str, _DirRules]] = []
+        current = rel_dir
+        while True:
+            rules = self._rules_for(current)
+            if rules.rules:
+                levels.append((current, rules))
+            if not current:
+                return levels
+            current = current.rpartition("/")[0]
+
+    def _rules_for(self, rel_dir: str) -> _DirRules:
+        now = time.time()
+        with self._lock:
+            cached = self._dirs.get(rel_dir)
+            if cached is not None and now - cached.checked_at < RECHECK_INTERVAL:
+                return cached
+        sources = self._sources(rel_dir)
+        signature = tuple(_stat_signature(p) for p in sources)
+        if cached is not None and cached.signature == signature:
+            cached.checked_at = now
+            return cached
+
+        rules: list[_Rule] = []
+        for path, sig in zip(sources, signature):
+            if sig is None:
+                continue
+            try:
+                text = path.read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                continue
+            for line in text.splitlines():
+                rule = compile_pattern(line)
+                if rule is not None:
+                    rules.append(rule)
+        any_match = None
+        if rules:
+            any_match = re.compile("|".join(f"(?:{r.regex.pattern})" for r in rules), re.DOTALL)
+        entry = _DirRules(rules=rules, any_match=any_match, signature=signature, checked_at=now)
+        with self._lock:
+            if cached is not None or rules:
+                self.version += 1
+            self._dirs[rel_dir] = entry
+        return entry
+
+    def _sources(self, rel_dir: str) -> list[Path]:
+        base = self.root / rel_dir if rel_dir else self.root
+        sources = [base / name for name in IGNORE_FILE_NAMES]
+        if not rel_dir:
+            sources.insert(0, base / ".git" / "info" / "exclude")
+        return sources
+
+    @staticmethod
+    def _decide(levels: list[tuple[str, _DirRules]], rel: str, is_dir: bool) -> bool:
+        for base, rules in levels:
+            sub = rel[len(base) + 1:] if base else rel
+            if not rules.any_match.fullmatch(sub):
+                continue
+            for rule in reversed(rules.rules):
+                if rule.dir_only and not is_dir:
+                    continue
+                if rule.regex.fullmatch(sub):
+                    return not rule.negate
+        return False
+
+
+class DirMatcher:
+    """Ignore decisions for the entries of one directory during a walk."""
+
+    def __init__(self, rel_dir: str, levels: list[tuple[str, _DirRules]]):
+        self.rel_dir = rel_dir
+        self._levels = levels
+
+    def ignores(self, name: str, is_dir: bool) -> bool:
+        if not self._levels:
+            return False
+        rel = f"{self.rel_dir}/{name}" if self.rel_dir else name
+        return IgnoreRules._decide(self._levels, rel, is_dir)
+
+
+def _stat_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+_rules: dict[str, IgnoreRules] = {}
+_registry_lock = threading.Lock()
+
+
+def get_ignore_rules(root: str | Path) -> IgnoreRules:
+    """Shared rules for the tree rooted at ``root``."""
+    resolved = Path(root).resolve()
+    with _registry_lock:
+        rules = _rules.get(str(resolved))
+        if rules is None:
+            rules = IgnoreRules(resolved)
+            _rules[str(resolved)] = rules
+        return rules
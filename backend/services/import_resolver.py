@@ -0,0 +1,382 @@
+"""ImportResolver — maps import specifiers to workspace files without disk access.
+
+Existence checks are answered from the in-memory file set, and every
+(importer directory, specifier) pair is resolved once. When files are added
+or removed, ``update`` re-resolves only the memoised specifiers that could
+name them, so a long-lived resolver never goes stale. Supported:
+
+- Python: absolute imports against each enclosing directory as a source
+  root (nearest first), relative imports, and namespace packages
+  (``from pkg import mod`` finds ``pkg/mod.py`` with no ``__init__.py``).
+- JS/TS: relative paths with extension and ``index`` probing, ``paths`` and
+  ``baseUrl`` from the nearest ``tsconfig.json`` / ``jsconfig.json``
+  (following ``extends``), and workspace packages by ``package.json`` name,
+  through their ``exports`` map or ``source``/``module``/``main`` fields.
+
+Config files are read through a callable so callers decide where contents
+come from.
+"""
+import json
+import logging
+import posixpath
+import re
+from typing import Any, Callable, Collection, Iterator
+
+from services.dependency_service import EXT_TYPE, JS_EXTENSIONS
+
+logger = logging.getLogger("import_resolver")
+
+TSCONFIG_NAMES = ("tsconfig.json", "jsconfig.json")
+PACKAGE_JSON = "package.json"
+CONFIG_NAMES = {*TSCONFIG_NAMES, PACKAGE_JSON}
+# Package ``exports`` conditions honoured; like Node, a conditions object is
+# tried in its own key order
+EXPORT_CONDITIONS = {"source", "types", "import", "module", "require", "node", "browser", "development", "default"}
+MAX_EXTENDS_DEPTH = 8
+
+# Name tokens of a specifier or path: the words between separators
+_TOKEN_SPLIT = re.compile(r"[/.]+")
+_SOURCE_SUFFIXES = {*JS_EXTENSIONS, ".mjs", ".cjs", ".py"}
+
+# Strings are matched first so comment markers inside them are kept
+_JSONC_TOKENS = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/|,(?=\s*[}\]])', re.DOTALL)
+
+
+def parse_jsonc(text: str) -> Any:
+    """JSON with comments and trailing commas, as tsconfig files allow."""
+    return json.loads(_JSONC_TOKENS.sub(lambda m: m.group(1) or "", text))
+
+
+def _ancestors(directory: str) -> list[str]:
+    """``directory`` and every parent up to the root (""), nearest first."""
+    dirs = [directory]
+    while directory:
+        directory = posixpath.dirname(directory)
+        dirs.append(directory)
+    return dirs
+
+
+def _tokens(name: str) -> set[str]:
+    """Words in a specifier or path, source extension dropped; {""} when it
+    names nothing (e.g. "." or ".."), so such specifiers match every file."""
+    stem, ext = posixpath.splitext(name)
+    if ext in _SOURCE_SUFFIXES:
+        name = stem
+    return set(_TOKEN_SPLIT.split(name)) - {""} or {""}
+
+
+def _match_pattern(pattern: str, spec: str) -> str | None:
+    """The ``*`` capture when ``spec`` matches ``pattern``, "" for an exact match."""
+    if "*" not in pattern:
+        return "" if pattern == spec else None
+    prefix, _, suffix = pattern.partition("*")
+    if len(spec) >= len(prefix) + len(suffix) and spec.startswith(prefix) and spec.endswith(suffix):
+        return spec[len(prefix):len(spec) - len(suffix)]
+    return None
+
+
+class ImportResolver:
+    def __init__(
+        self,
+        files: Collection[str],
+        read_config: Callable[[str], str | None] | None = None,
+        configs: Collection[str] = (),
+    ):
+        """``files`` are root-relative, "/"-separated paths; ``configs`` the
+        root-relative tsconfig/jsconfig/package.json paths ``read_config``
+        can return the text of."""
+        self._files = files
+        self._read_config = read_config
+        self._config_paths = set(configs)
+        # Configs reached only through ``extends`` (e.g. tsconfig.base.json);
+        # callers watch these too, since editing one changes resolution
+        self.extended_configs: set[str] = set()
+        self._memo: dict[tuple[bool, str, str], str | None] = {}
+        # Memo keys by resolved file and by specifier token, for ``update``
+        self._by_target: dict[str, set[tuple[bool, str, str]]] = {}
+        self._by_token: dict[str, set[tuple[bool, str, str]]] = {}
+        # Tokens of non-wildcard tsconfig ``paths`` aliases; such an alias can
+        # point at any file, so every added file is checked against them
+        self._alias_tokens: set[str] = set()
+        self._tsconfigs: dict[str, tuple[str, dict[str, list[str]]] | None] = {}
+        self._nearest_tsconfig: dict[str, str | None] = {}
+        self._packages: dict[str, tuple[str, dict]] | None = None
+
+    def resolve(self, spec: str, importer: str) -> str | None:
+        """Root-relative file that ``spec``, imported by root-relative ``importer``, refers to."""
+        python = EXT_TYPE.get(posixpath.splitext(importer)[1]) == "python"
+        directory = posixpath.dirname(importer)
+        key = (python, directory, spec)
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        target = self._lookup(key)
+        self._memo[key] = target
+        for token in _tokens(spec):
+            self._by_token.setdefault(token, set()).add(key)
+        if target is not None:
+            self._by_target.setdefault(target, set()).add(key)
+        return target
+
+    def update(self, added: Collection[str], removed: Collection[str]) -> set[tuple[bool, str, str]]:
+        """Re-resolve memoised specifiers after files were added to or removed
+        from the file set (which the caller has already changed).
+
+        A removal can only change specifiers that resolved to the removed file.
+        An added file can only be found by a specifier sharing a word with its
+        path, or with an alias or package that may map to it. Returns the
+        (python, importer directory, specifier) keys whose target changed.
+        """
+        keys: set[tuple[bool, str, str]] = set()
+        for rel in removed:
+            keys |= self._by_target.pop(rel, set())
+        if added:
+            tokens = {""} | self._alias_tokens
+            packages = self._workspace_packages()
+            for rel in added:
+                tokens |= _tokens(rel)
+                for name, (directory, _) in packages.items():
+                    if not directory or rel.startswith(f"{directory}/"):
+                        tokens |= _tokens(name)
+            for token in tokens:
+                keys |= self._by_token.get(token, set())
+        changed: set[tuple[bool, str, str]] = set()
+        for key in keys:
+            old = self._memo.get(key)
+            target = self._lookup(key)
+            if target == old:
+                continue
+            self._memo[key] = target
+            if old is not None and old in self._by_target:
+                self._by_target[old].discard(key)
+            if target is not None:
+                self._by_target.setdefault(target, set()).add(key)
+            changed.add(key)
+        return changed
+
+    def _lookup(self, key: tuple[bool, str, str]) -> str | None:
+        python, directory, spec = key
+        return self._resolve_python(spec, directory) if python else self._resolve_script(spec, directory)
+
+    # --- Python ---
+
+    def _resolve_python(self, spec: str, directory: str) -> str | None:
+        stripped = spec.lstrip(".")
+        level = len(spec) - len(stripped)
+        parts = stripped.split(".") if stripped else []
+        if level:
+            base = directory
+            for _ in range(level - 1):
+                if not base:
+                    return None
+                base = posixpath.dirname(base)
+            roots = [base]
+        else:
+            roots = _ancestors(directory)
+        # ``from pkg import name`` arrives as pkg.name: the name may be a
+        # submodule (also of a namespace package) or just an attribute
+        for count in range(len(parts), 0, -1):
+            module = "/".join(parts[:count])
+            for root in roots:
+                path = posixpath.join(root, module) if root else module
+                for candidate in (path + ".py", path + "/__init__.py"):
+                    if candidate in self._files:
+                        return candidate
+        if level and not parts:
+            init = posixpath.join(roots[0], "__init__.py") if roots[0] else "__init__.py"
+            return init if init in self._files else None
+        return None
+
+    # --- JS / TS ---
+
+    def _resolve_script(self, spec: str, directory: str) -> str | None:
+        if spec.startswith("."):
+            return self._probe(posixpath.join(directory, spec))
+        if spec.startswith("/"):
+            return None
+        tsconfig = self._tsconfig_for(directory)
+        if tsconfig is not None:
+            target = self._resolve_tsconfig(spec, *tsconfig)
+            if target is not None:
+                return target
+        return self._resolve_package(spec)
+
+    def _probe(self, path: str) -> str | None:
+        """A file for ``path`` the way bundlers look it up: as is, with an
+        extension, with a .js-style extension swapped for a TS one, or as a
+        directory index."""
+        base = posixpath.normpath(path)
+        if base == ".." or base.startswith("../"):
+            return None
+        if base == ".":
+            base = ""
+        if base in self._files:
+            return base
+        stem, ext = posixpath.splitext(base)
+        candidates = [base + e for e in JS_EXTENSIONS]
+        if ext in (".js", ".jsx", ".mjs", ".cjs"):
+            candidates += [stem + e for e in JS_EXTENSIONS]
+        index = f"{base}/index" if base else "index"
+        candidates += [index + e for e in JS_EXTENSIONS]
+        for candidate in candidates:
+            if candidate in self._files:
+                return candidate
+        return None
+
+    def _tsconfig_for(self, directory: str) -> tuple[str, dict[str, list[str]]] | None:
+        if directory in self._nearest_tsconfig:
+            config = self._nearest_tsconfig[directory]
+        else:
+            config = None
+            for parent in _ancestors(directory):
+                for name in TSCONFIG_NAMES:
+                    path = posixpath.join(parent, name) if parent else name
+                    if path in self._config_paths:
+                        config = path
+                        break
+                if config is not None:
+                    break
+            self._nearest_tsconfig[directory] = config
+        return self._load_tsconfig(config) if config is not None else None
+
+    def _load_tsconfig(self, path: str) -> tuple[str, dict[str, list[str]]] | None:
+        """(base directory, paths) of a tsconfig, with ``extends`` applied."""
+        if path in self._tsconfigs:
+            return self._tsconfigs[path]
+        self._tsconfigs[path] = None  # guards extends cycles
+        base_url: str | None = None
+        paths: dict[str, list[str]] | None = None
+        paths_dir = posixpath.dirname(path)
+        current = path
+        for _ in range(MAX_EXTENDS_DEPTH):
+            data = self._config(current, listed=current == path)
+            if not isinstance(data, dict):
+                break
+            options = data.get("compilerOptions") or {}
+            config_dir = posixpath.dirname(current)
+            if base_url is None and isinstance(options.get("baseUrl"), str):
+                base_url = posixpath.normpath(posixpath.join(config_dir, options["baseUrl"]))
+            if paths is None and isinstance(options.get("paths"), dict):
+                paths = {k: v for k, v in options["paths"].items() if isinstance(v, list)}
+                paths_dir = config_dir
+                for pattern in paths:
+                    if "*" not in pattern:
+                        self._alias_tokens |= _tokens(pattern)
+            parent = data.get("extends")
+            if not isinstance(parent, str) or not parent.startswith("."):
+                break  # package-provided base configs live in node_modules
+            current = posixpath.normpath(posixpath.join(config_dir, parent))
+            if current == ".." or current.startswith("../"):
+                break
+            if not current.endswith(".json"):
+                current += ".json"
+            self.extended_configs.add(current)
+        if base_url is None and paths is None:
+            return None
+        if base_url == ".":
+            base_url = ""
+        # Without baseUrl, paths are relative to the config declaring them
+        result = (base_url if base_url is not None else paths_dir, paths or {})
+        self._tsconfigs[path] = result
+        return result
+
+    def _resolve_tsconfig(self, spec: str, base: str, paths: dict[str, list[str]]) -> str | None:
+        best: tuple[int, str, str] | None = None
+        for pattern in paths:
+            capture = _match_pattern(pattern, spec)
+            if capture is None:
+                continue
+            # TypeScript picks the pattern with the longest prefix
+            prefix = len(pattern.partition("*")[0])
+            if best is None or prefix > best[0]:
+                best = (prefix, pattern, capture)
+        if best is not None:
+            for substitution in paths[best[1]]:
+                if isinstance(substitution, str):
+                    target = self._probe(posixpath.join(base, substitution.replace("*", best[2])))
+                    if target is not None:
+                        return target
+        return self._probe(posixpath.join(base, spec))
+
+    def _resolve_package(self, spec: str) -> str | None:
+        packages = self._workspace_packages()
+        parts = spec.split("/")
+        name = "/".join(parts[:2]) if spec.startswith("@") else parts[0]
+        package = packages.get(name)
+        if package is None:
+            return None
+        directory, manifest = package
+        subpath = "." + spec[len(name):]
+        exports = manifest.get("exports")
+        if exports is not None:
+            # Conditions may point at build output missing from the tree
+            # (e.g. "types" -> dist/): take the first target that exists
+            for target in self._resolve_exports(exports, subpath):
+                found = self._probe(posixpath.join(directory, target))
+                if found is not None:
+                    return found
+            return None
+        if subpath == ".":
+            for field in ("source", "module", "main", "types"):
+                entry = manifest.get(field)
+                if isinstance(entry, str):
+                    target = self._probe(posixpath.join(directory, entry))
+                    if target is not None:
+                        return target
+        return self._probe(posixpath.join(directory, subpath))
+
+    def _resolve_exports(self, exports: Any, subpath: str) -> Iterator[str]:
+        """Candidate targets ``exports`` maps ``subpath`` to, in preference order."""
+        if isinstance(exports, dict) and any(k.startswith(".") for k in exports):
+            if subpath in exports:
+                yield from self._export_targets(exports[subpath], "")
+                return
+            best: tuple[int, str, str] | None = None
+            for pattern in exports:
+                if "*" not in pattern:
+                    continue
+                capture = _match_pattern(pattern, subpath)
+                if capture is not None and (best is None or len(pattern) > best[0]):
+                    best = (len(pattern), pattern, capture)
+            if best is not None:
+                yield from self._export_targets(exports[best[1]], best[2])
+        elif subpath == ".":
+            # A bare target or conditions object describes the "." entry only
+            yield from self._export_targets(exports, "")
+
+    def _export_targets(self, target: Any, capture: str) -> Iterator[str]:
+        if isinstance(target, str):
+            yield target.replace("*", capture)
+        elif isinstance(target, list):
+            for item in target:
+                yield from self._export_targets(item, capture)
+        elif isinstance(target, dict):
+            for condition, value in target.items():
+                if condition in EXPORT_CONDITIONS:
+                    yield from self._export_targets(value, capture)
+
+    def _workspace_packages(self) -> dict[str, tuple[str, dict]]:
+        if self._packages is None:
+            self._packages = {}
+            for path in sorted(self._config_paths):
+                if posixpath.basename(path) != PACKAGE_JSON:
+                    continue
+                manifest = self._config(path)
+                if isinstance(manifest, dict) and isinstance(manifest.get("name"), str):
+                    self._packages.setdefault(manifest["name"], (posixpath.dirname(path), manifest))
+        return self._packages
+
+    def _config(self, path: str, listed: bool = True) -> Any:
+        """Parsed config at ``path``; ``listed`` ones must be among ``configs``,
+        ``extends`` targets may have any name."""
+        if self._read_config is None or (listed and path not in self._config_paths):
+            return None
+        text = self._read_config(path)
+        if text is None:
+            return None
+        try:
+            return parse_jsonc(text)
+        except ValueError as e:
+            logger.debug(f"Skipping unreadable config {path}: {e}")
+            return None
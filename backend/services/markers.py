@@ -0,0 +1,112 @@
+"""Marker extraction — TODO/FIXME/BUG/HACK/XXX notes in source comments.
+
+The one engine behind quests, mission signals and the health scan. Markers
+are only taken from comments, found with a per-language scanner that skips
+string literals:
+
+- ``#`` line comments (Python, Ruby, shell) and Python docstrings
+  (statement-level triple-quoted strings);
+- ``//`` line and ``/* */`` block comments (C-family, JS/TS, Rust, Go, CSS),
+  plus ``<!-- -->`` in markup-based components.
+
+A tag must open a comment line (after the comment leader, ``*`` gutters or
+whitespace), so prose like "fixes a bug" is not a marker. Files without any
+tag word are rejected by a byte-level search before anything is decoded.
+"""
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from services.byte_reader import Buffer, open_buffer
+
+MARKER_TAGS = ("TODO", "FIXME", "BUG", "HACK", "XXX")
+
+MARKER_EXTENSIONS = (
+    ".py", ".ts", ".tsx", ".js", ".jsx", ".rs", ".go",
+    ".java", ".rb", ".vue", ".svelte", ".css", ".scss",
+)
+
+MARKER_SKIP_DIRS = {
+    ".git", "node_modules", "__pycache__", "target", ".venv",
+    "venv", "dist", ".next", ".claude", "build", ".svelte-kit",
+}
+
+HASH_COMMENT_EXTENSIONS = {".py", ".pyi", ".rb", ".sh"}
+MARKUP_EXTENSIONS = {".vue", ".svelte", ".html"}
+
+_PREFILTER = re.compile(rb"TODO|FIXME|BUG|HACK|XXX", re.IGNORECASE)
+_TAG_WORD = re.compile(r"TODO|FIXME|BUG|HACK|XXX", re.IGNORECASE)
+
+_HASH_SCANNER = re.compile(
+    r"(?P<doc>[rRuUbBfF]{0,2}(?:\"\"\"[\s\S]*?(?:\"\"\"|\Z)|'''[\s\S]*?(?:'''|\Z)))"
+    r"|(?P<str>\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*')"
+    r"|(?P<line>#[^\n]*)"
+)
+_SLASH_SCANNER = re.compile(
+    r"(?P<block>/\*[\s\S]*?(?:\*/|\Z))"
+    r"|(?P<line>//[^\n]*)"
+    r"|(?P<markup><!--[\s\S]*?(?:-->|\Z))"
+    r"|(?P<str>\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)"
+)
+# Leaders and gutters in front of a tag on a comment line
+_LEADER = re.compile(r"^[\s#/*!<\-\"']*?(?=\w)")
+# A tag may name an owner in parentheses; one run into punctuation is prose
+_TAG = re.compile(r"(TODO|FIXME|BUG|HACK|XXX)(?:\([^)\n]*\))?(?::|\s|$)[:\s]*(.*)", re.IGNORECASE)
+_TRAILER = re.compile(r"\s*(?:\*/|-->|\"\"\"|''')\s*$")
+
+
+@dataclass(frozen=True, slots=True)
+class Marker:
+    line: int
+    tag: str  # upper-case, one of MARKER_TAGS
+    text: str
+    kind: str  # "comment" | "block" | "docstring"
+
+
+def extract_markers(data: Buffer, extension: str) -> list[Marker]:
+    """Markers in comments of a file's contents."""
+    if _PREFILTER.search(data) is None:
+        return []
+    text = data[:].decode("utf-8", errors="replace")
+    hash_style = extension in HASH_COMMENT_EXTENSIONS
+    scanner = _HASH_SCANNER if hash_style else _SLASH_SCANNER
+    markers: list[Marker] = []
+    line = 1
+    last = 0
+    for match in scanner.finditer(text):
+        group = match.lastgroup
+        if group == "str":
+            continue
+        if group == "markup" and extension not in MARKUP_EXTENSIONS:
+            continue
+        start = match.start()
+        line += text.count("\n", last, start)
+        last = start
+        if group == "doc":
+            # Only statement-level strings are docstrings, not values
+            line_start = text.rfind("\n", 0, start) + 1
+            if text[line_start:start].strip():
+                continue
+            kind = "docstring"
+        else:
+            kind = "comment" if group == "line" else "block"
+        body = match.group()
+        if _TAG_WORD.search(body) is None:
+            continue
+        for offset, comment_line in enumerate(body.split("\n")):
+            lead = _LEADER.match(comment_line)
+            if lead is None:
+                continue
+            tag = _TAG.match(comment_line, lead.end())
+            if tag is not None:
+                content = _TRAILER.sub("", tag.group(2)).strip()
+                markers.append(Marker(line + offset, tag.group(1).upper(), content, kind))
+    return markers
+
+
+def scan_markers(path: str) -> list[Marker] | None:
+    """Markers in one file, None if unreadable; module-level so the metrics pool can run it."""
+    with open_buffer(Path(path)) as data:
+        if data is None:
+            return None
+        return extract_markers(data, Path(path).suffix)
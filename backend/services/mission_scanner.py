@@ -5,62 +5,49 @@ Collects signals from three sources:
   [TELEGRAM]   — Messages marked as important
   [LSP_ERRORS] — Critical compilation errors
 """
-import re
 import uuid
 from pathlib import Path
 from datetime import datetime, timezone
 
 from models.mission import Signal, SignalSource
+from services.todo_index import TodoMarker, get_todo_index
 
-TODO_PATTERN = re.compile(
-    r"(?:#|//)\s*(?:TODO|FIXME|BUG|HACK|XXX)[:\s]+(.+)", re.IGNORECASE
-)
 
-SKIP_DIRS = {
-    ".git", "node_modules", "__pycache__", "target", ".venv",
-    "venv", "dist", ".next", ".claude", "build", ".svelte-kit",
-}
+def scan_code_todos(directory: str) -> list[Signal]:
+    """Every TODO/FIXME/BUG marker in the directory tree, with stable IDs."""
+    return scan_code_todo_changes(directory)[0]
 
-SOURCE_EXTENSIONS = (
-    ".py", ".ts", ".tsx", ".js", ".jsx", ".rs", ".go",
-    ".java", ".rb", ".vue", ".svelte", ".css", ".scss",
-)
 
+def scan_code_todo_changes(
+    directory: str, client: str = "default",
+) -> tuple[list[Signal], list[Signal], list[str]]:
+    """(all marker signals, signals new since ``client`` last scanned, IDs of markers gone since).
 
-def scan_code_todos(directory: str) -> list[Signal]:
-    """Scan directory tree for TODO/FIXME/BUG markers."""
-    signals: list[Signal] = []
-    root = Path(directory)
+    Signals carry the resolved directory in ``metadata["root"]``.
+    """
+    root = Path(directory).resolve()
     if not root.exists():
-        return signals
-
-    now = datetime.now(timezone.utc).isoformat()
-
-    for ext in SOURCE_EXTENSIONS:
-        for file_path in root.rglob(f"*{ext}"):
-            # Skip ignored directories
-            parts = file_path.relative_to(root).parts
-            if any(p in SKIP_DIRS for p in parts):
-                continue
-            try:
-                lines = file_path.read_text(encoding="utf-8", errors="ignore").splitlines()
-            except Exception:
-                continue
-            for i, line in enumerate(lines, start=1):
-                match = TODO_PATTERN.search(line)
-                if match:
-                    content = match.group(1).strip()
-                    rel_path = str(file_path.relative_to(root))
-                    signals.append(Signal(
-                        id=f"todo-{uuid.uuid4().hex[:8]}",
-                        source=SignalSource.CODE_TODO,
-                        content=content,
-                        file_path=rel_path,
-                        line_number=i,
-                        timestamp=now,
-                        metadata={"tag": _extract_tag(line)},
-                    ))
-    return signals
+        return [], [], []
+    index = get_todo_index(root)
+    delta = index.changes(f"missions:{client}")
+    # A bare tag carries nothing to act on
+    return (
+        [_todo_signal(root, rel, marker) for rel, marker in index.markers() if marker.content],
+        [_todo_signal(root, rel, marker) for rel, marker in delta.added if marker.content],
+        delta.removed,
+    )
+
+
+def _todo_signal(root: Path, rel: str, marker: TodoMarker) -> Signal:
+    return Signal(
+        id=marker.id,
+        source=SignalSource.CODE_TODO,
+        content=marker.content,
+        file_path=rel,
+        line_number=marker.line,
+        timestamp=marker.seen,
+        metadata={"tag": marker.tag, "kind": marker.kind, "root": str(root)},
+    )
 
 
 def scan_lsp_errors(errors: list[dict]) -> list[Signal]:
@@ -109,12 +96,3 @@ def signals_from_telegram(messages: list[dict]) -> list[Signal]:
             },
         ))
     return signals
-
-
-def _extract_tag(line: str) -> str:
-    """Extract the marker tag (TODO, FIXME, BUG, etc.) from a line."""
-    line_upper = line.upper()
-    for tag in ("FIXME", "BUG", "HACK", "XXX", "TODO"):
-        if tag in line_upper:
-            return tag
-    return "TODO"
@@ -0,0 +1,174 @@
+"""Parallel search executor for cold queries over large file lists.
+
+The sorted file list is split into contiguous chunks that run on a
+long-lived process pool. Results are merged in chunk order, so the output is
+exactly what a sequential scan would return.
+
+Early termination uses a shared array of per-query "cancel after chunk N"
+slots: as soon as the completed prefix of chunks holds ``max_results``
+matches, every later chunk is told to stop, in whichever worker it runs.
+A slot goes back to the free list only after all of its query's chunks
+have finished.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from models.file import FileSearchMatch
+from services.search_engine import SearchPlan, search_file
+
+logger = logging.getLogger("parallel_search")
+
+# Below this many files a sequential scan is cheaper than dispatching
+PARALLEL_MIN_FILES = 2000
+MIN_CHUNK_FILES = 64
+CHUNKS_PER_WORKER = 4
+MAX_SLOTS = 64
+_NOT_CANCELLED = 2**31 - 1
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = os.cpu_count() or 4
+_cancel_after = None  # shared RawArray('i', MAX_SLOTS)
+_free_slots: list[int] = []
+_pool_lock = threading.Lock()
+
+# Set in each worker process by _init_worker
+_worker_cancel_after = None
+
+
+def _init_worker(cancel_after):
+    global _worker_cancel_after
+    _worker_cancel_after = cancel_after
+
+
+def _scan_chunk(
+    slot: int,
+    chunk_index: int,
+    paths: list[str],
+    plan: SearchPlan,
+    context_lines: int,
+    limit: int,
+) -> list[FileSearchMatch]:
+    matches: list[FileSearchMatch] = []
+    for path in paths:
+        if chunk_index > _worker_cancel_after[slot]:
+            break
+        found, _ = search_file(Path(path), plan, context_lines, limit - len(matches))
+        matches.extend(found)
+        if len(matches) >= limit:
+            break
+    return matches
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _cancel_after
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the server is multi-threaded, forking it is unsafe
+            ctx = multiprocessing.get_context("spawn")
+            _cancel_after = ctx.RawArray("i", [_NOT_CANCELLED] * MAX_SLOTS)
+            _free_slots[:] = list(range(MAX_SLOTS))
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(_cancel_after,),
+            )
+        return _pool
+
+
+def _acquire_slot() -> int | None:
+    with _pool_lock:
+        if not _free_slots:
+            return None
+        slot = _free_slots.pop()
+        _cancel_after[slot] = _NOT_CANCELLED
+        return slot
+
+
+def _release_slot(slot: int, futures: list[Future]):
+    """Stop the query's chunks; the slot is only reused once none of them is
+    queued or running, so a late chunk can never read the next query's state."""
+    with _pool_lock:
+        _cancel_after[slot] = -1
+    pending = [len(futures) + 1]
+    pending_lock = threading.Lock()
+
+    def done(_future=None):
+        with pending_lock:
+            pending[0] -= 1
+            if pending[0]:
+                return
+        with _pool_lock:
+            _free_slots.append(slot)
+
+    for future in futures:
+        future.cancel()
+        future.add_done_callback(done)
+    done()
+
+
+def shutdown_search_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def parallel_search(
+    paths: list[Path],
+    plan: SearchPlan,
+    max_results: int,
+    context_lines: int = 0,
+) -> tuple[list[FileSearchMatch], bool] | None:
+    """Search ``paths`` (in order) on the process pool.
+
+    Returns (matches, truncated), or None when no query slot is free or the
+    pool failed — the caller should then scan sequentially.
+    """
+    pool = _get_pool()
+    slot = _acquire_slot()
+    if slot is None:
+        return None
+
+    chunk_size = max(MIN_CHUNK_FILES, -(-len(paths) // (_pool_workers * CHUNKS_PER_WORKER)))
+    chunks = [
+        [str(p) for p in paths[i:i + chunk_size]]
+        for i in range(0, len(paths), chunk_size)
+    ]
+
+    results: list[list[FileSearchMatch] | None] = [None] * len(chunks)
+    futures: list[Future] = []
+    try:
+        for index, chunk in enumerate(chunks):
+            futures.append(pool.submit(
+                _scan_chunk, slot, index, chunk, plan, context_lines, max_results,
+            ))
+
+        # Chunks are collected in order; once the prefix holds enough
+        # matches every later chunk is cut off, wherever it is running
+        found = 0
+        for index, future in enumerate(futures):
+            results[index] = future.result()
+            found += len(results[index])
+            if found >= max_results:
+                _cancel_after[slot] = index
+                break
+    except Exception as e:
+        logger.warning(f"Parallel search failed: {e}")
+        return None
+    finally:
+        _release_slot(slot, futures)
+
+    matches: list[FileSearchMatch] = []
+    for chunk_matches in results:
+        if chunk_matches is None:
+            break
+        matches.extend(chunk_matches)
+        if len(matches) >= max_results:
+            return matches[:max_results], True
+    return matches, False
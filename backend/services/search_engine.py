@@ -0,0 +1,220 @@
+"""Search engine shared by /api/files/search and the search_text tool.
+
+Every query — literal or regex — is compiled into a ``SearchPlan``: the
+regex plus the literal strings any match must contain. The literals narrow
+the file set through the trigram index, reject whole files with a
+``find`` prefilter over the raw (possibly memory-mapped) bytes, and locate
+the few lines the full regex is run on.
+"""
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+try:
+    import re._parser as _sre_parse
+    import re._constants as _sre
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre_parse
+    import sre_constants as _sre
+
+from models.file import FileSearchMatch
+from services.byte_reader import Buffer, FoldedView, count_newlines, open_buffer
+
+MAX_LINE_TEXT = 200
+
+_REPEATS = {_sre.MAX_REPEAT, _sre.MIN_REPEAT}
+if hasattr(_sre, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(_sre.POSSESSIVE_REPEAT)
+_GROUPS = {_sre.SUBPATTERN}
+if hasattr(_sre, "ATOMIC_GROUP"):
+    _GROUPS.add(_sre.ATOMIC_GROUP)
+
+
+@dataclass
+class SearchPlan:
+    regex: re.Pattern
+    ignore_case: bool
+    literals: list[str] = field(default_factory=list)  # required substrings of every match
+    prefilter: list[bytes] = field(default_factory=list)  # byte form used against file contents
+
+    @property
+    def anchor(self) -> bytes | None:
+        """Longest prefilter literal — its occurrences locate candidate lines."""
+        return max(self.prefilter, key=len) if self.prefilter else None
+
+
+def required_literals(pattern: str, flags: int = 0) -> list[str]:
+    """Literal runs that every match of ``pattern`` must contain.
+
+    Walks the parsed regex: consecutive LITERAL nodes form a run; groups and
+    repeats with a minimum of one contribute their own runs; anything optional
+    or alternative (``?``, ``*``, ``|``, classes, lookarounds) ends a run.
+    """
+    parsed = _sre_parse.parse(pattern, flags)
+    global_ic = bool(parsed.state.flags & re.IGNORECASE)
+    runs: list[str] = []
+    _collect(list(parsed), runs, global_ic)
+    return [r for r in runs if r]
+
+
+def _collect(items: list, runs: list[str], ignore_case: bool):
+    current: list[str] = []
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    for op, av in items:
+        if op is _sre.LITERAL:
+            current.append(chr(av))
+        elif op is _sre.AT:
+            # Zero-width anchors do not break contiguity
+            continue
+        elif op in _GROUPS:
+            flush()
+            if op is _sre.SUBPATTERN:
+                _group, add_flags, _del_flags, sub = av
+                if add_flags & re.IGNORECASE and not ignore_case:
+                    # Scoped (?i:...) — exact-case bytes would be wrong
+                    continue
+            else:
+                sub = av
+            _collect(list(sub), runs, ignore_case)
+        elif op in _REPEATS:
+            flush()
+            min_count, _max_count, sub = av
+            if min_count >= 1:
+                _collect(list(sub), runs, ignore_case)
+        else:
+            flush()
+    flush()
+
+
+def compile_search(query: str, mode: str = "literal", case_sensitive: bool = False) -> SearchPlan:
+    """Build a plan for a literal or regex query; raises ValueError on bad input."""
+    if mode not in ("literal", "regex"):
+        raise ValueError(f"Unknown search mode: {mode}")
+    pattern = re.escape(query) if mode == "literal" else query
+    flags = 0 if case_sensitive else re.IGNORECASE
+    try:
+        regex = re.compile(pattern, flags)
+        literals = [query] if mode == "literal" and query else required_literals(pattern, flags)
+    except re.error as e:
+        raise ValueError(f"Invalid regex: {e}")
+
+    ignore_case = bool(regex.flags & re.IGNORECASE)
+    prefilter: list[bytes] = []
+    for lit in literals:
+        if ignore_case:
+            if not lit.isascii():
+                continue  # bytes.lower() only folds ASCII
+            prefilter.append(lit.lower().encode("ascii"))
+        else:
+            prefilter.append(lit.encode("utf-8"))
+    return SearchPlan(regex=regex, ignore_case=ignore_case, literals=literals, prefilter=prefilter)
+
+
+def search_bytes(
+    data: Buffer,
+    plan: SearchPlan,
+    path: str,
+    context_lines: int = 0,
+    limit: int | None = None,
+) -> list[FileSearchMatch]:
+    """Matches of ``plan`` in one file's raw bytes, one per matching line."""
+    find = FoldedView(data).find if plan.ignore_case and plan.prefilter else data.find
+    for lit in plan.prefilter:
+        if find(lit) < 0:
+            return []
+
+    matches: list[FileSearchMatch] = []
+    line_no = 1
+    counted_to = 0
+    for start in _candidate_line_starts(data, find, plan.anchor):
+        line_no += count_newlines(data, counted_to, start)
+        counted_to = start
+        end = data.find(b"\n", start)
+        if end < 0:
+            end = len(data)
+        line = data[start:end].decode("utf-8", errors="ignore").rstrip("\r")
+        m = plan.regex.search(line)
+        if not m:
+            continue
+        match = FileSearchMatch(
+            path=path,
+            line=line_no,
+            text=line[:MAX_LINE_TEXT],
+            column=m.start() + 1,
+            match_length=m.end() - m.start(),
+        )
+        if context_lines > 0:
+            match.context_before = _lines_before(data, start, context_lines)
+            match.context_after = _lines_after(data, end, context_lines)
+        matches.append(match)
+        if limit is not None and len(matches) >= limit:
+            break
+    return matches
+
+
+def search_file(
+    path: Path,
+    plan: SearchPlan,
+    context_lines: int = 0,
+    limit: int | None = None,
+) -> tuple[list[FileSearchMatch], int]:
+    """Search one file; returns (matches, bytes scanned). Binary files never match."""
+    with open_buffer(path) as data:
+        if data is None:
+            return [], 0
+        return search_bytes(data, plan, str(path), context_lines, limit), len(data)
+
+
+def _candidate_line_starts(data: Buffer, find, anchor: bytes | None):
+    """Start offsets of lines worth running the regex on, in order."""
+    if anchor is None:
+        start = 0
+        size = len(data)
+        while start < size:
+            yield start
+            nl = data.find(b"\n", start)
+            if nl < 0:
+                return
+            start = nl + 1
+        return
+
+    pos = find(anchor)
+    while pos >= 0:
+        line_start = data.rfind(b"\n", 0, pos) + 1
+        yield line_start
+        line_end = data.find(b"\n", pos)
+        if line_end < 0:
+            return
+        pos = find(anchor, line_end + 1)
+
+
+def _lines_before(data: Buffer, start: int, count: int) -> list[str]:
+    lines: list[str] = []
+    end = start - 1  # the "\n" ending the previous line
+    while end >= 0 and len(lines) < count:
+        begin = data.rfind(b"\n", 0, end) + 1
+        lines.append(_decode_line(data[begin:end]))
+        end = begin - 1
+    lines.reverse()
+    return lines
+
+
+def _lines_after(data: Buffer, end: int, count: int) -> list[str]:
+    lines: list[str] = []
+    start = end + 1
+    while start < len(data) and len(lines) < count:
+        nl = data.find(b"\n", start)
+        if nl < 0:
+            nl = len(data)
+        lines.append(_decode_line(data[start:nl]))
+        start = nl + 1
+    return lines
+
+
+def _decode_line(raw: bytes) -> str:
+    return raw.decode("utf-8", errors="ignore").rstrip("\r")[:MAX_LINE_TEXT]
@@ -0,0 +1,470 @@
+"""SymbolIndex — definitions, references and imported names per source file.
+
+Python files are read with ``ast``; JS/TS files with the tokenizer from
+``complexity_metrics`` (function symbols, classes, calls) plus the import
+statement patterns. Files are parsed on the metrics process pool and cached
+by (mtime, size), re-synced with the workspace index like the dependency
+graph.
+
+Each reference records the definition it sits in, so the index doubles as
+a symbol-level call graph: ``callers`` answers "who calls X" and
+``callees`` "what does X call", narrowed with the file-level import graph
+so a same-named function in an unrelated module is not reported.
+"""
+import ast
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from services.byte_reader import open_buffer
+from services.complexity_metrics import (
+    MAX_ANALYZED_SIZE, PYTHON_EXTENSIONS, SCRIPT_EXTENSIONS, SCRIPT_KEYWORDS,
+    map_files, match_brackets, script_symbols, tokenize_script,
+)
+from services.dependency_service import ALL_SKIP
+from services.workspace_index import get_workspace_index
+
+logger = logging.getLogger("symbol_index")
+
+SYMBOL_EXTENSIONS = PYTHON_EXTENSIONS | SCRIPT_EXTENSIONS
+MAX_RESULTS = 500
+
+_JS_IMPORT_FROM = re.compile(r"""\bimport\s+(?:type\s+)?([\w$*{}\s,]+?)\s+from\s+['"]([^'"]+)['"]""")
+_JS_REQUIRE = re.compile(r"""\b(?:const|let|var)\s+(\{[^}]*\}|[\w$]+)\s*=\s*require\s*\(\s*['"]([^'"]+)['"]\s*\)""")
+_RENAMED = re.compile(r"([\w$]+)\s*(?:\s+as\s+|:)\s*([\w$]+)$")
+_JS_DECLARATION = {"function", "class", "const", "let", "var", "interface", "type", "enum"}
+
+
+@dataclass(slots=True)
+class Definition:
+    name: str
+    qualname: str  # e.g. "Parser.parse"
+    kind: str  # "function" | "class" | "variable"
+    line: int
+    end_line: int
+
+
+@dataclass(slots=True)
+class Reference:
+    name: str  # as written at the use site (a local alias for renamed imports)
+    line: int
+    call: bool
+    member: bool  # obj.name rather than a bare name
+    caller: str | None  # qualname of the enclosing definition, None at module level
+
+
+@dataclass(slots=True)
+class ImportedName:
+    local: str
+    spec: str  # module specifier as written
+    name: str  # imported name; "*" for a whole module or namespace, "default"
+    line: int
+
+
+@dataclass(slots=True)
+class FileSymbols:
+    definitions: list[Definition] = field(default_factory=list)
+    references: list[Reference] = field(default_factory=list)
+    imports: list[ImportedName] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class CallSite:
+    file: str
+    line: int
+    caller: str | None
+    call: bool
+
+
+def extract_symbols(source: str, extension: str) -> FileSymbols:
+    if extension in PYTHON_EXTENSIONS:
+        return _python_symbols(source)
+    if extension in SCRIPT_EXTENSIONS:
+        return _script_symbols(source)
+    return FileSymbols()
+
+
+def extract_file_symbols(path: str) -> FileSymbols | None:
+    """Symbols of one file; module-level so the metrics pool can run it."""
+    path = Path(path)
+    with open_buffer(path) as data:
+        if data is None or len(data) > MAX_ANALYZED_SIZE:
+            return None
+        return extract_symbols(data[:].decode("utf-8", errors="replace"), path.suffix)
+
+
+def _assign_callers(symbols: FileSymbols):
+    """Attach each reference to the innermost definition spanning its line."""
+    scoped = sorted(
+        (d for d in symbols.definitions if d.kind != "variable"),
+        key=lambda d: (d.line, -d.end_line, d.qualname.count(".")),
+    )
+    if not scoped:
+        return
+    owner: dict[int, str] = {}
+    # Inner definitions sort later, so they overwrite their parent's lines
+    for d in scoped:
+        for line in range(d.line, d.end_line + 1):
+            owner[line] = d.qualname
+    for ref in symbols.references:
+        ref.caller = owner.get(ref.line)
+
+
+# --- Python ---
+
+class _PySymbols(ast.NodeVisitor):
+    def __init__(self):
+        self.symbols = FileSymbols()
+        self._scope: list[str] = []
+
+    def _define(self, node, kind: str):
+        self.symbols.definitions.append(Definition(
+            name=node.name,
+            qualname=".".join(self._scope + [node.name]),
+            kind=kind,
+            line=node.lineno,
+            end_line=node.end_lineno or node.lineno,
+        ))
+        self._scope.append(node.name)
+        self.generic_visit(node)
+        self._scope.pop()
+
+    def visit_FunctionDef(self, node):
+        self._define(node, "function")
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self._define(node, "class")
+
+    def _variables(self, targets: list, node):
+        if self._scope:
+            return
+        for target in targets:
+            if isinstance(target, ast.Name):
+                self.symbols.definitions.append(
+                    Definition(target.id, target.id, "variable", node.lineno, node.end_lineno or node.lineno)
+                )
+
+    def visit_Assign(self, node):
+        self._variables(node.targets, node)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node):
+        self._variables([node.target], node)
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call):
+        func = node.func
+        if isinstance(func, ast.Name):
+            self.symbols.references.append(Reference(func.id, node.lineno, True, False, None))
+        elif isinstance(func, ast.Attribute):
+            self.symbols.references.append(Reference(func.attr, func.end_lineno or node.lineno, True, True, None))
+            self.visit(func.value)
+        else:
+            self.visit(func)
+        for arg in node.args:
+            self.visit(arg)
+        for keyword in node.keywords:
+            self.visit(keyword.value)
+
+    def visit_Name(self, node: ast.Name):
+        if isinstance(node.ctx, ast.Load):
+            self.symbols.references.append(Reference(node.id, node.lineno, False, False, None))
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            local = alias.asname or alias.name.split(".")[0]
+            self.symbols.imports.append(ImportedName(local, alias.name, "*", node.lineno))
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        spec = "." * node.level + (node.module or "")
+        for alias in node.names:
+            if alias.name == "*":
+                self.symbols.imports.append(ImportedName("*", spec, "*", node.lineno))
+                continue
+            self.symbols.imports.append(ImportedName(alias.asname or alias.name, spec, alias.name, node.lineno))
+
+
+def _python_symbols(source: str) -> FileSymbols:
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return FileSymbols()
+    visitor = _PySymbols()
+    visitor.visit(tree)
+    _assign_callers(visitor.symbols)
+    return visitor.symbols
+
+
+# --- TS / JS ---
+
+def _import_clause(clause: str) -> list[tuple[str, str]]:
+    """(local, imported) pairs of an import clause or destructuring pattern."""
+    names: list[tuple[str, str]] = []
+    clause = clause.strip()
+    braced = ""
+    if "{" in clause:
+        head, _, rest = clause.partition("{")
+        braced, _, _ = rest.partition("}")
+        clause = head
+    for part in clause.split(","):
+        part = part.strip()
+        if part.startswith("*"):
+            names.append((part.split()[-1], "*"))
+        elif part:
+            names.append((part, "default"))
+    for part in braced.split(","):
+        part = part.strip()
+        if part.startswith("type "):
+            part = part[5:].strip()
+        if not part:
+            continue
+        # `a as b` in imports, `a: b` in require destructuring
+        m = _RENAMED.match(part)
+        names.append((m.group(2), m.group(1)) if m else (part, part))
+    return names
+
+
+def _script_symbols(source: str) -> FileSymbols:
+    symbols = FileSymbols()
+    for m in script_symbols(source):
+        symbols.definitions.append(Definition(
+            name=m.name.rsplit(".", 1)[-1],
+            qualname=m.name,
+            kind="function",
+            line=m.start_line,
+            end_line=m.start_line + m.length - 1,
+        ))
+    functions = {(d.name, d.line) for d in symbols.definitions}
+
+    tokens = tokenize_script(source)
+    pairs = match_brackets(tokens)
+    n = len(tokens)
+    depth = 0
+    in_import = False
+    for i, (t, line) in enumerate(tokens):
+        if t == "import":
+            in_import = True
+            continue
+        if in_import:
+            # Bindings up to the module string belong to ``imports``
+            in_import = t not in ("'", ";")
+            continue
+        if t == "{":
+            depth += 1
+            continue
+        if t == "}":
+            depth -= 1
+            continue
+        if not (t[0].isalpha() or t[0] in "_$") or t in SCRIPT_KEYWORDS:
+            continue
+        prev = tokens[i - 1][0] if i else ""
+        nxt = tokens[i + 1][0] if i + 1 < n else ""
+        if prev in _JS_DECLARATION:
+            if prev == "class" or prev in ("interface", "enum"):
+                # Body extent: the first brace after the name
+                j = i + 1
+                while j < n and tokens[j][0] not in ("{", ";"):
+                    j += 1
+                end = tokens[pairs[j]][1] if tokens[j][0] == "{" and j in pairs else line
+                symbols.definitions.append(Definition(t, t, "class", line, end))
+            elif prev in ("const", "let", "var", "type") and depth == 0 and (t, line) not in functions:
+                symbols.definitions.append(Definition(t, t, "variable", line, line))
+            continue
+        if nxt == ":" and prev in ("{", ","):
+            continue  # object keys
+        member = prev in (".", "?.")
+        if nxt == "(" or nxt == "?." and i + 2 < n and tokens[i + 2][0] == "(":
+            if (t, line) in functions and not member:
+                continue  # the definition's own name
+            symbols.references.append(Reference(t, line, True, member, None))
+        elif prev == "<" and t[0].isupper():
+            symbols.references.append(Reference(t, line, True, False, None))  # JSX element
+        elif not member:
+            symbols.references.append(Reference(t, line, False, False, None))
+
+    for pattern in (_JS_IMPORT_FROM, _JS_REQUIRE):
+        for m in pattern.finditer(source):
+            line = source.count("\n", 0, m.start()) + 1
+            for local, imported in _import_clause(m.group(1)):
+                symbols.imports.append(ImportedName(local, m.group(2), imported, line))
+    _assign_callers(symbols)
+    return symbols
+
+
+# --- Index ---
+
+class SymbolIndex:
+    def __init__(self, root: Path):
+        self.root = root
+        self._files: dict[str, tuple[float, int, FileSymbols]] = {}
+        # name -> file -> entries, so a changed file is swapped out in place
+        self._defs: dict[str, dict[str, list[Definition]]] = {}
+        self._refs: dict[str, dict[str, list[Reference]]] = {}
+        self._imported: dict[str, dict[str, list[ImportedName]]] = {}
+        self._index_generation = -1
+        # Held for a whole sync; queries only wait for ``_lock`` while results are linked in
+        self._sync_lock = threading.Lock()
+        self._lock = threading.RLock()
+
+    def sync(self) -> bool:
+        """Re-parse files the workspace index reports as changed; True if any did.
+
+        Parsing runs without the query lock. While another thread is syncing
+        this returns False at once and queries read the previous results;
+        only the first sync waits.
+        """
+        if not self._sync_lock.acquire(blocking=self._index_generation < 0):
+            return False
+        try:
+            return self._sync()
+        finally:
+            self._sync_lock.release()
+
+    def _sync(self) -> bool:
+        index = get_workspace_index(self.root)
+        generation = index.generation
+        if generation == self._index_generation:
+            return False
+        prefix = index.relative(self.root) or ""
+        cut = len(prefix) + 1 if prefix else 0
+        entries = index.files(extensions=SYMBOL_EXTENSIONS, under=self.root, exclude_dirs=ALL_SKIP)
+        current = {entry.path[cut:]: entry for entry in entries}
+        with self._lock:
+            stale = [
+                rel for rel, entry in current.items()
+                if (cached := self._files.get(rel)) is None or cached[:2] != (entry.mtime, entry.size)
+            ]
+            removed = [rel for rel in self._files if rel not in current]
+        if not stale and not removed:
+            self._index_generation = generation
+            return False
+        # Many changed files (first build, branch switch) go to the pool
+        parsed = map_files(extract_file_symbols, [str(self.root / rel) for rel in stale])
+        with self._lock:
+            for rel in removed:
+                self._unlink(rel, self._files.pop(rel)[2])
+            for rel, symbols in zip(stale, parsed):
+                old = self._files.pop(rel, None)
+                if old is not None:
+                    self._unlink(rel, old[2])
+                if symbols is not None:
+                    entry = current[rel]
+                    self._files[rel] = (entry.mtime, entry.size, symbols)
+                    self._link(rel, symbols)
+        # Only now: if parsing failed, the next sync retries the same files
+        self._index_generation = generation
+        return True
+
+    def _link(self, rel: str, symbols: FileSymbols):
+        for d in symbols.definitions:
+            self._defs.setdefault(d.name, {}).setdefault(rel, []).append(d)
+        for r in symbols.references:
+            self._refs.setdefault(r.name, {}).setdefault(rel, []).append(r)
+        for imp in symbols.imports:
+            self._imported.setdefault(imp.name, {}).setdefault(rel, []).append(imp)
+
+    def _unlink(self, rel: str, symbols: FileSymbols):
+        for table, names in (
+            (self._defs, {d.name for d in symbols.definitions}),
+            (self._refs, {r.name for r in symbols.references}),
+            (self._imported, {i.name for i in symbols.imports}),
+        ):
+            for name in names:
+                by_file = table.get(name)
+                if by_file is not None:
+                    by_file.pop(rel, None)
+                    if not by_file:
+                        del table[name]
+
+    # --- Queries ---
+
+    def definitions(self, symbol: str, file: str | None = None) -> list[tuple[str, Definition]]:
+        """Definitions of ``symbol`` (a name or a qualified name such as "Parser.parse")."""
+        name = symbol.rsplit(".", 1)[-1]
+        with self._lock:
+            found = [
+                (rel, d)
+                for rel, defs in self._defs.get(name, {}).items() if file is None or rel == file
+                for d in defs if d.qualname == symbol or d.name == symbol or d.qualname.endswith("." + symbol)
+            ]
+        found.sort(key=lambda item: (item[0], item[1].line))
+        return found
+
+    def callers(self, symbol: str, file: str | None = None, calls_only: bool = True) -> list[CallSite]:
+        """Use sites of ``symbol`` (defined in ``file``, when given).
+
+        A bare-name use counts when it is in a defining file or in a file
+        importing one (through any alias); ``obj.name`` uses count for
+        methods, or in files importing a defining module. With no workspace
+        definition (e.g. a library function) every use of the name counts.
+        """
+        from services.dependency_graph import get_dependency_graph
+
+        name = symbol.rsplit(".", 1)[-1]
+        targets = self.definitions(symbol, file)
+        target_files = {rel for rel, _ in targets}
+        method = any("." in d.qualname and d.kind == "function" for _, d in targets)
+        graph = get_dependency_graph(self.root) if target_files else None
+
+        def imports_target(rel: str) -> bool:
+            return graph is not None and not target_files.isdisjoint(graph.dependencies(rel))
+
+        sites: list[CallSite] = []
+        with self._lock:
+            # Local names the symbol is imported under, per importing file
+            aliases: dict[str, set[str]] = {}
+            for rel, imports in self._imported.get(name, {}).items():
+                for imp in imports:
+                    aliases.setdefault(imp.local, set()).add(rel)
+            names = {name: None, **{alias: files for alias, files in aliases.items() if alias != name}}
+            for local, alias_files in names.items():
+                for rel, refs in self._refs.get(local, {}).items():
+                    if alias_files is not None and rel not in alias_files:
+                        continue
+                    for ref in refs:
+                        if calls_only and not ref.call:
+                            continue
+                        if target_files:
+                            if ref.member:
+                                if not (method or rel in target_files or imports_target(rel)):
+                                    continue
+                            elif rel not in target_files and not imports_target(rel):
+                                continue
+                        sites.append(CallSite(rel, ref.line, ref.caller, ref.call))
+        sites.sort(key=lambda s: (s.file, s.line))
+        return sites[:MAX_RESULTS]
+
+    def callees(self, symbol: str, file: str | None = None) -> list[tuple[str, CallSite]]:
+        """(callee name, call site) for calls made inside ``symbol``'s definitions."""
+        found: list[tuple[str, CallSite]] = []
+        with self._lock:
+            for rel, d in self.definitions(symbol, file):
+                symbols = self._files.get(rel)
+                if symbols is None:
+                    continue
+                for ref in symbols[2].references:
+                    if ref.call and ref.caller is not None and (
+                        ref.caller == d.qualname or ref.caller.startswith(d.qualname + ".")
+                    ):
+                        found.append((ref.name, CallSite(rel, ref.line, ref.caller, True)))
+        return found[:MAX_RESULTS]
+
+
+_indexes: dict[str, SymbolIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_symbol_index(root: str | Path, sync: bool = True) -> SymbolIndex:
+    resolved = Path(root).resolve()
+    with _indexes_lock:
+        index = _indexes.get(str(resolved))
+        if index is None:
+            index = SymbolIndex(resolved)
+            _indexes[str(resolved)] = index
+    if sync:
+        index.sync()
+    return index
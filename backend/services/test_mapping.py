@@ -0,0 +1,261 @@
+"""Test-to-source mapping and coverage report ingestion for the health scan.
+
+``TestMap`` maps each test file to the sources it imports, resolved with the
+dependency parser against the scanned file set, plus the reverse mapping. It
+is updated incrementally: only tests whose imports changed are re-resolved,
+unless files were added or removed (which can change any resolution).
+
+``load_coverage`` reads coverage.py data files (``.coverage``) and lcov
+reports found at the workspace root or one directory below it. Reports are
+re-parsed only when they change on disk.
+"""
+import ast
+import logging
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from services.import_resolver import ImportResolver
+
+logger = logging.getLogger("test_mapping")
+
+TEST_FILE = re.compile(r"(^test_.*\.py|_test\.py|\.(?:test|spec)\.(?:ts|tsx|js|jsx))$")
+TEST_DIRS = {"tests", "test", "__tests__"}
+COVERAGE_FILES = (".coverage", "lcov.info", "coverage.lcov", "coverage/lcov.info")
+
+
+def is_test_file(rel: str) -> bool:
+    """Test modules, and anything inside a tests directory (fixtures, conftest)."""
+    parts = rel.split("/")
+    return bool(TEST_FILE.search(parts[-1])) or any(p in TEST_DIRS for p in parts[:-1])
+
+
+class TestMap:
+    def __init__(self):
+        self._paths: frozenset[str] = frozenset()
+        # test -> (imports list it was resolved from, resolved sources)
+        self._tests: dict[str, tuple[list[str], frozenset[str]]] = {}
+        self._sources: dict[str, set[str]] = {}
+        self._resolver = ImportResolver(self._paths)
+        self._lock = threading.Lock()
+
+    def update(self, files: list[tuple[str, list[str]]]):
+        """Sync with the scanned ``(path, import specifiers)`` pairs.
+
+        Import lists are compared by identity: unchanged files keep the
+        same list object in the metrics cache.
+        """
+        with self._lock:
+            paths = frozenset(rel for rel, _ in files)
+            full = paths != self._paths
+            self._paths = paths
+            if full:
+                self._resolver = ImportResolver(paths)
+            resolver = self._resolver
+            tests: dict[str, tuple[list[str], frozenset[str]]] = {}
+            changed = full
+            for rel, imports in files:
+                if not is_test_file(rel):
+                    continue
+                cached = self._tests.get(rel)
+                if not full and cached is not None and cached[0] is imports:
+                    tests[rel] = cached
+                    continue
+                resolved = {resolver.resolve(spec, rel) for spec in imports}
+                resolved.discard(None)
+                resolved.discard(rel)
+                tests[rel] = (imports, frozenset(resolved))
+                changed = True
+            changed = changed or tests.keys() != self._tests.keys()
+            self._tests = tests
+            if changed:
+                sources: dict[str, set[str]] = {}
+                for test, (_, resolved) in tests.items():
+                    for source in resolved:
+                        sources.setdefault(source, set()).add(test)
+                self._sources = sources
+
+    def tested_sources(self) -> set[str]:
+        """Non-test files imported by at least one test."""
+        with self._lock:
+            return {s for s in self._sources if not is_test_file(s)}
+
+    def tests_for(self, source: str) -> list[str]:
+        with self._lock:
+            return sorted(self._sources.get(source, ()))
+
+
+_maps: dict[str, TestMap] = {}
+_maps_lock = threading.Lock()
+
+
+def get_test_map(root: str | Path) -> TestMap:
+    key = str(Path(root).resolve())
+    with _maps_lock:
+        test_map = _maps.get(key)
+        if test_map is None:
+            test_map = TestMap()
+            _maps[key] = test_map
+        return test_map
+
+
+# --- Coverage reports ---
+
+@dataclass(slots=True)
+class FileCoverage:
+    covered: int
+    executable: int
+
+
+# root -> (report signatures, parsed coverage)
+_coverage_cache: dict[str, tuple[tuple, dict[str, FileCoverage]]] = {}
+# absolute path -> ((mtime, size), statement lines) for .coverage data
+_statement_cache: dict[str, tuple[tuple[float, int], set[int]]] = {}
+_coverage_lock = threading.Lock()
+
+
+def load_coverage(root: str | Path) -> dict[str, FileCoverage] | None:
+    """Line coverage per root-relative file from any reports found, or None."""
+    root = Path(root).resolve()
+    reports = _find_reports(root)
+    if not reports:
+        return None
+    signature = tuple((str(p), st.st_mtime, st.st_size) for p, st in reports)
+    with _coverage_lock:
+        cached = _coverage_cache.get(str(root))
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+    merged: dict[str, FileCoverage] = {}
+    for path, _ in reports:
+        try:
+            if path.name == ".coverage":
+                found = _read_coverage_py(path, root)
+            else:
+                found = _read_lcov(path, root)
+        except (OSError, sqlite3.Error, ValueError) as e:
+            logger.warning(f"Could not read coverage report {path}: {e}")
+            continue
+        for rel, cov in found.items():
+            # Several reports for one file: keep the best-covered run
+            if rel not in merged or cov.covered > merged[rel].covered:
+                merged[rel] = cov
+    with _coverage_lock:
+        _coverage_cache[str(root)] = (signature, merged)
+    return merged
+
+
+def _find_reports(root: Path) -> list[tuple[Path, os.stat_result]]:
+    bases = [root]
+    try:
+        bases += sorted(
+            Path(e.path) for e in os.scandir(root)
+            if e.is_dir(follow_symlinks=False) and not e.name.startswith(".") and e.name != "node_modules"
+        )
+    except OSError:
+        pass
+    reports = []
+    for base in bases:
+        for name in COVERAGE_FILES:
+            path = base / name
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if path.is_file():
+                reports.append((path, st))
+    return reports
+
+
+def _relative(path: str, report_dir: Path, root: Path) -> str | None:
+    full = Path(path)
+    if not full.is_absolute():
+        full = report_dir / full
+    try:
+        return Path(os.path.normpath(full)).relative_to(root).as_posix()
+    except ValueError:
+        return None
+
+
+def _read_lcov(path: Path, root: Path) -> dict[str, FileCoverage]:
+    results: dict[str, FileCoverage] = {}
+    current: str | None = None
+    covered = executable = 0
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("SF:"):
+                current = _relative(line[3:], path.parent, root)
+                covered = executable = 0
+            elif line.startswith("DA:"):
+                fields = line[3:].split(",")
+                executable += 1
+                if len(fields) > 1 and fields[1].isdigit() and int(fields[1]) > 0:
+                    covered += 1
+            elif line == "end_of_record":
+                if current is not None:
+                    results[current] = FileCoverage(covered, executable)
+                current = None
+    return results
+
+
+def _read_coverage_py(path: Path, root: Path) -> dict[str, FileCoverage]:
+    """Executed lines from a coverage.py data file, over statements found with ``ast``."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        files = {row[0]: row[1] for row in conn.execute("SELECT id, path FROM file")}
+        executed: dict[int, set[int]] = {}
+        if "line_bits" in tables:
+            for file_id, numbits in conn.execute("SELECT file_id, numbits FROM line_bits"):
+                executed.setdefault(file_id, set()).update(_numbits_to_lines(numbits))
+        if "arc" in tables:
+            for file_id, start, end in conn.execute("SELECT file_id, fromno, tono FROM arc"):
+                lines = executed.setdefault(file_id, set())
+                for line in (start, end):
+                    if line > 0:
+                        lines.add(line)
+    finally:
+        conn.close()
+
+    results: dict[str, FileCoverage] = {}
+    for file_id, file_path in files.items():
+        rel = _relative(file_path, path.parent, root)
+        if rel is None:
+            continue
+        statements = _statements(root / rel)
+        lines = executed.get(file_id, set())
+        results[rel] = FileCoverage(len(lines & statements) if statements else len(lines), len(statements | lines))
+    return results
+
+
+def _numbits_to_lines(numbits: bytes) -> list[int]:
+    return [
+        i * 8 + bit
+        for i, byte in enumerate(numbits) if byte
+        for bit in range(8) if byte & (1 << bit)
+    ]
+
+
+def _statements(path: Path) -> set[int]:
+    """Line numbers of the statements in a Python file, cached by (mtime, size)."""
+    try:
+        st = path.stat()
+    except OSError:
+        return set()
+    key = str(path)
+    with _coverage_lock:
+        cached = _statement_cache.get(key)
+    if cached is not None and cached[0] == (st.st_mtime, st.st_size):
+        return cached[1]
+    try:
+        tree = ast.parse(path.read_bytes())
+    except (SyntaxError, ValueError, OSError):
+        return set()
+    lines = {node.lineno for node in ast.walk(tree) if isinstance(node, ast.stmt)}
+    with _coverage_lock:
+        _statement_cache[key] = ((st.st_mtime, st.st_size), lines)
+    return lines
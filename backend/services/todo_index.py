@@ -0,0 +1,211 @@
+"""TodoIndex — TODO/FIXME markers in the workspace, kept up to date incrementally.
+
+The cache quests, mission signals and the live health scan all read from.
+Files come from the shared workspace index (one walk, shared with every
+other scanner); a file is only re-read when its (mtime, size) moved, and
+changed files are scanned by ``markers.extract_markers`` on the metrics
+process pool. Markers get IDs derived from their content rather than their
+position:
+
+    todo-<blake2b(path, tag, text, occurrence)>
+
+so a marker keeps its ID when lines above it are added or removed, and two
+identical markers in one file are told apart by their order. Several
+readers sync the same index, so ``changes`` reports appeared and
+disappeared markers per named consumer, against the IDs that consumer last
+saw. The index and those ID sets are persisted per workspace, so a restart
+does not report every marker as new.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from services.complexity_metrics import map_files
+from services.markers import MARKER_EXTENSIONS, MARKER_SKIP_DIRS, Marker, scan_markers
+from services.workspace_index import CACHE_DIR, cache_path, get_workspace_index
+
+logger = logging.getLogger("todo_index")
+
+# Bumped when the persisted marker format changes
+CACHE_VERSION = 2
+
+
+@dataclass(frozen=True, slots=True)
+class TodoMarker:
+    id: str
+    line: int
+    tag: str
+    content: str
+    kind: str  # "comment" | "block" | "docstring"
+    seen: str  # ISO time the marker was first indexed
+
+
+@dataclass(slots=True)
+class TodoRecord:
+    mtime: float
+    size: int
+    markers: list[TodoMarker]
+
+
+@dataclass(slots=True)
+class TodoDelta:
+    added: list[tuple[str, TodoMarker]] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)  # marker ids
+
+
+def marker_id(rel: str, tag: str, content: str, occurrence: int) -> str:
+    key = "\n".join((rel, tag, " ".join(content.split()), str(occurrence)))
+    return "todo-" + hashlib.blake2b(key.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def _identify(rel: str, found: list[Marker], previous: TodoRecord | None, now: str) -> list[TodoMarker]:
+    seen = {m.id: m.seen for m in previous.markers} if previous is not None else {}
+    markers: list[TodoMarker] = []
+    occurrences: dict[tuple[str, str], int] = {}
+    for marker in found:
+        key = (marker.tag, " ".join(marker.text.split()))
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        todo_id = marker_id(rel, marker.tag, marker.text, occurrence)
+        markers.append(TodoMarker(todo_id, marker.line, marker.tag, marker.text, marker.kind, seen.get(todo_id, now)))
+    return markers
+
+
+class TodoIndex:
+    def __init__(self, root: Path):
+        self.root = root
+        self._records: dict[str, TodoRecord] = {}
+        # Consumer name -> marker IDs it was last given by ``changes``
+        self._consumers: dict[str, set[str]] = {}
+        self._index_generation = -1
+        self._loaded = False
+        # Held for a whole sync; readers only wait for ``_lock`` while results are swapped in
+        self._sync_lock = threading.Lock()
+        self._lock = threading.RLock()
+
+    def sync(self) -> bool:
+        """Re-read changed files; True if any file was re-read or removed.
+
+        Files are scanned without the reader lock. While another thread is
+        syncing this returns False at once and readers see the previous
+        markers; only the first sync waits.
+        """
+        if not self._sync_lock.acquire(blocking=self._index_generation < 0):
+            return False
+        try:
+            return self._sync()
+        finally:
+            self._sync_lock.release()
+
+    def _sync(self) -> bool:
+        index = get_workspace_index(self.root)
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                self._load()
+            previous = self._records
+        generation = index.generation
+        if generation == self._index_generation:
+            return False
+        prefix = index.relative(self.root) or ""
+        cut = len(prefix) + 1 if prefix else 0
+        now = datetime.now(timezone.utc).isoformat()
+
+        records: dict[str, TodoRecord] = {}
+        stale: list[tuple[str, float, int]] = []
+        for entry in index.files(extensions=MARKER_EXTENSIONS, under=self.root, exclude_dirs=MARKER_SKIP_DIRS):
+            rel = entry.path[cut:]
+            old = previous.get(rel)
+            if old is not None and (old.mtime, old.size) == (entry.mtime, entry.size):
+                records[rel] = old
+            else:
+                stale.append((rel, entry.mtime, entry.size))
+
+        scanned = map_files(scan_markers, [str(self.root / rel) for rel, _, _ in stale])
+        for (rel, mtime, size), found in zip(stale, scanned):
+            records[rel] = TodoRecord(mtime, size, _identify(rel, found or [], previous.get(rel), now))
+        removed = previous.keys() - records.keys()
+        with self._lock:
+            self._records = records
+            if stale or removed:
+                self._save()
+        # Only now: if scanning failed, the next sync retries the same files
+        self._index_generation = generation
+        return bool(stale or removed)
+
+    def changes(self, consumer: str) -> TodoDelta:
+        """Sync, then the markers added and removed since ``consumer`` last asked.
+
+        A consumer's first call reports every marker as added.
+        """
+        self.sync()
+        with self._lock:
+            current = self.markers()
+            seen = self._consumers.get(consumer, set())
+            ids = {m.id for _, m in current}
+            delta = TodoDelta(
+                added=[(rel, m) for rel, m in current if m.id not in seen],
+                removed=sorted(seen - ids),
+            )
+            if delta.added or delta.removed or consumer not in self._consumers:
+                self._consumers[consumer] = ids
+                self._save()
+            return delta
+
+    def markers(self) -> list[tuple[str, TodoMarker]]:
+        """Every (path, marker), in path and line order."""
+        with self._lock:
+            return [(rel, m) for rel in sorted(self._records) for m in self._records[rel].markers]
+
+    # --- Persistence ---
+
+    def _save(self):
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            target = cache_path(self.root, ".todos.json")
+            tmp = target.with_suffix(".tmp")
+            payload = {
+                "root": str(self.root),
+                "version": CACHE_VERSION,
+                "files": [
+                    [rel, r.mtime, r.size, [[m.id, m.line, m.tag, m.content, m.kind, m.seen] for m in r.markers]]
+                    for rel, r in self._records.items()
+                ],
+                "consumers": {name: sorted(ids) for name, ids in self._consumers.items()},
+            }
+            tmp.write_text(json.dumps(payload, separators=(",", ":")))
+            os.replace(tmp, target)
+        except OSError as e:
+            logger.warning(f"Could not persist TODO index for {self.root}: {e}")
+
+    def _load(self):
+        try:
+            data = json.loads(cache_path(self.root, ".todos.json").read_text())
+        except (OSError, ValueError):
+            return
+        if data.get("root") != str(self.root) or data.get("version") != CACHE_VERSION:
+            return
+        self._records = {
+            rel: TodoRecord(mtime, size, [TodoMarker(*m) for m in markers])
+            for rel, mtime, size, markers in data.get("files", [])
+        }
+        self._consumers = {name: set(ids) for name, ids in data.get("consumers", {}).items()}
+
+
+_indexes: dict[str, TodoIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_todo_index(root: str | Path) -> TodoIndex:
+    resolved = Path(root).resolve()
+    with _indexes_lock:
+        index = _indexes.get(str(resolved))
+        if index is None:
+            index = TodoIndex(resolved)
+            _indexes[str(resolved)] = index
+    return index
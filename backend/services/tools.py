@@ -1,10 +1,10 @@
 import os
-import re
 import subprocess
 from dataclasses import dataclass
 from pathlib import Path
 
-from services.file_service import FileService, SKIP_DIRS
+from services.file_service import FileService
+from services.search_engine import compile_search, search_file
 
 
 TOOL_DEFINITIONS = [
@@ -82,6 +82,24 @@ TOOL_DEFINITIONS = [
             "required": ["pattern", "path"],
         },
     },
+    {
+        "name": "find_references",
+        "description": "Find where a function, class or variable is defined and every place that calls or uses it, from the project's symbol index. Much faster and more precise than search_text for usages; also lists what the symbol itself calls.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "symbol": {
+                    "type": "string",
+                    "description": "Symbol name, optionally qualified, e.g. 'parse' or 'Parser.parse'.",
+                },
+                "file": {
+                    "type": "string",
+                    "description": "Only consider the definition in this file. Relative to workspace root.",
+                },
+            },
+            "required": ["symbol"],
+        },
+    },
     {
         "name": "run_command",
         "description": "Run a shell command in the project workspace. Use for running tests (npm test, pytest), linters, build commands, or other dev tools. The command runs with a 60s timeout. Only whitelisted safe commands are allowed.",
@@ -170,6 +188,8 @@ class ToolExecutor:
                 return self._write_file(tool_id, input_data)
             elif tool_name == "search_text":
                 return self._search_text(tool_id, input_data)
+            elif tool_name == "find_references":
+                return self._find_references(tool_id, input_data)
             elif tool_name == "run_command":
                 return self._run_command(tool_id, input_data)
             else:
@@ -252,13 +272,13 @@ class ToolExecutor:
         file_glob = input_data.get("file_glob", "*")
 
         try:
-            regex = re.compile(pattern, re.IGNORECASE)
-        except re.error as e:
+            plan = compile_search(pattern, mode="regex")
+        except ValueError as e:
             return ToolResult(
                 tool_id=tool_id,
                 tool_name="search_text",
                 status="error",
-                content=f"Invalid regex: {e}",
+                content=str(e),
                 summary="Invalid regex pattern",
             )
 
@@ -268,25 +288,16 @@ class ToolExecutor:
         bytes_processed = 0
         max_matches = 50
 
-        for dirpath, dirnames, filenames in os.walk(path):
-            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
-            for fname in filenames:
-                if not fnmatch.fnmatch(fname, file_glob):
-                    continue
-                fpath = os.path.join(dirpath, fname)
-                try:
-                    with open(fpath, "r", encoding="utf-8", errors="ignore") as f:
-                        for i, line in enumerate(f, 1):
-                            bytes_processed += len(line.encode("utf-8"))
-                            if regex.search(line):
-                                rel = os.path.relpath(fpath, path)
-                                matches.append(f"{rel}:{i}: {line.rstrip()}")
-                                if len(matches) >= max_matches:
-                                    break
-                    if len(matches) >= max_matches:
-                        break
-                except (PermissionError, OSError):
-                    continue
+        # Required literals narrow the files (trigram index) and the lines
+        # (bytes.find) the regex actually runs on
+        for fp in self.file_service.search_candidates(Path(path), plan):
+            if not fnmatch.fnmatch(fp.name, file_glob):
+                continue
+            found, size = search_file(fp, plan, limit=max_matches - len(matches))
+            bytes_processed += size
+            rel = os.path.relpath(str(fp), path)
+            for m in found:
+                matches.append(f"{rel}:{m.line}: {m.text}")
             if len(matches) >= max_matches:
                 break
 
@@ -300,6 +311,35 @@ class ToolExecutor:
             bytes_processed=bytes_processed,
         )
 
+    def _find_references(self, tool_id: str, input_data: dict) -> ToolResult:
+        from services.dependency_service import DependencyService
+
+        root = self.file_service.workspace_root
+        if not root:
+            return ToolResult(
+                tool_id=tool_id, tool_name="find_references",
+                status="error", content="No workspace configured", summary="No workspace configured",
+            )
+        symbol = input_data["symbol"]
+        result = DependencyService(root).symbol_usages(symbol, input_data.get("file") or None)
+
+        lines = [f"Definitions of {symbol}:"]
+        lines += [f"  {d.file}:{d.line} {d.kind} {d.qualname}" for d in result.definitions] or ["  (none in workspace)"]
+        lines.append(f"Used at ({len(result.callers)}):")
+        lines += [f"  {r.file}:{r.line} in {r.caller or '<module>'}" for r in result.callers] or ["  (no uses found)"]
+        if result.callees:
+            lines.append("Calls:")
+            lines += [f"  {r.name} at {r.file}:{r.line}" for r in result.callees]
+        content = "\n".join(lines)
+        return ToolResult(
+            tool_id=tool_id,
+            tool_name="find_references",
+            status="success",
+            content=content,
+            summary=f"{len(result.definitions)} definition(s), {len(result.callers)} use(s) of '{symbol}'",
+            bytes_processed=len(content.encode("utf-8")),
+        )
+
     def _run_command(self, tool_id: str, input_data: dict) -> ToolResult:
         command = input_data.get("command", "").strip()
         if not command:
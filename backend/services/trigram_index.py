@@ -0,0 +1,346 @@
+"""TrigramIndex — persistent trigram inverted index over the workspace.
+
+Every indexed file gets an integer id; each (lowercased, byte-level) trigram
+maps to a sorted ``array('I')`` posting list of file ids. A literal query is
+answered by intersecting the posting lists of its trigrams, so only the
+candidate files are opened and verified line by line.
+
+Updates are append-only: a changed file is re-read under a fresh id and its
+old id is tombstoned. Posting lists therefore stay sorted; once tombstones
+pile up, live files are renumbered densely and dead ids dropped.
+"""
+import bisect
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from pathlib import Path
+
+from services.byte_reader import is_binary
+from services.file_service import FileService
+from services.workspace_index import WorkspaceIndex, cache_path
+
+logger = logging.getLogger("trigram_index")
+
+# Files larger than this are never indexed; queries always treat them as candidates
+MAX_INDEXED_SIZE = 1024 * 1024
+# Compact posting lists when this share of file ids is dead
+COMPACT_RATIO = 0.25
+SAVE_INTERVAL = 60.0
+
+_MAGIC = b"CMTRI1\n"
+_RECORD = struct.Struct("<II")
+
+
+def trigrams_of(data: bytes) -> set[int]:
+    """Distinct lowercased trigrams of ``data`` packed as 24-bit ints."""
+    lowered = data.lower()
+    return {(a << 16) | (b << 8) | c for a, b, c in set(zip(lowered, lowered[1:], lowered[2:]))}
+
+
+def query_trigrams(literal: str) -> set[int]:
+    """Trigrams every case-insensitive match of ``literal`` must contain.
+
+    Windows with non-ASCII bytes are skipped: ``str.lower`` and ``bytes.lower``
+    only agree on ASCII, so those trigrams cannot be trusted.
+    """
+    data = literal.lower().encode("utf-8")
+    return {
+        (a << 16) | (b << 8) | c
+        for a, b, c in zip(data, data[1:], data[2:])
+        if a < 128 and b < 128 and c < 128
+    }
+
+
+class TrigramIndex:
+    def __init__(self, workspace: WorkspaceIndex):
+        self.workspace = workspace
+        self._lock = threading.RLock()
+        self._ids: dict[str, int] = {}  # rel path -> live file id
+        self._meta: list[tuple[str, float, int] | None] = []  # id -> (rel, mtime, size), None = dead
+        self._postings: dict[int, array] = {}
+        self._unindexed: set[int] = set()  # live ids too large to index
+        self._dead = 0
+        self._pending: set[str] = set()
+        self._ready = False
+        self._building = False
+        self._dirty = False
+        self._saved_at = time.time()
+        workspace.subscribe(self._on_workspace_change)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    # --- Queries ---
+
+    def candidates(self, literal: str, under: str | Path | None = None) -> list[Path] | None:
+        """Files that may contain ``literal`` (case-insensitive), anchored like
+        ``WorkspaceIndex.paths``. Returns None when the index cannot narrow the
+        search (still building, or the literal has no usable trigram)."""
+        return self.candidates_for_all([literal], under)
+
+    def candidates_for_all(self, literals: list[str], under: str | Path | None = None) -> list[Path] | None:
+        """Files that may contain every one of ``literals``."""
+        if not self._ready:
+            self.ensure_started()
+            return None
+        grams: set[int] = set()
+        for literal in literals:
+            grams |= query_trigrams(literal)
+        if not grams:
+            return None
+
+        self.sync()
+        with self._lock:
+            lists = []
+            for g in grams:
+                posting = self._postings.get(g)
+                if posting is None:
+                    lists = []
+                    break
+                lists.append(posting)
+            ids: set[int] = set()
+            if lists:
+                lists.sort(key=len)
+                for fid in lists[0]:
+                    if self._meta[fid] is None:
+                        continue
+                    if all(_contains(other, fid) for other in lists[1:]):
+                        ids.add(fid)
+            ids |= self._unindexed
+            rels = sorted(self._meta[fid][0] for fid in ids if self._meta[fid] is not None)
+
+        base = Path(under) if under is not None else self.workspace.root
+        prefix = self.workspace.relative(under) if under is not None else ""
+        if prefix is None:
+            return []
+        if prefix:
+            cut = len(prefix) + 1
+            return [base / rel[cut:] for rel in rels if rel.startswith(f"{prefix}/")]
+        return [base / rel for rel in rels]
+
+    # --- Building / syncing ---
+
+    def ensure_started(self):
+        with self._lock:
+            if self._ready or self._building:
+                return
+            self._building = True
+        threading.Thread(target=self._build, name="trigram-build", daemon=True).start()
+
+    def sync(self):
+        """Re-index files the workspace index reported as changed."""
+        with self._lock:
+            if not self._ready or not self._pending:
+                self._maybe_save()
+                return
+            pending, self._pending = self._pending, set()
+        for rel in pending:
+            entry = self.workspace.get(rel)
+            with self._lock:
+                fid = self._ids.get(rel)
+                if entry is not None and fid is not None and self._meta[fid][1:] == (entry.mtime, entry.size):
+                    continue
+                self._drop(rel)
+            if entry is not None:
+                self._index_file(rel, entry.mtime, entry.size)
+        with self._lock:
+            self._dirty = True
+            self._maybe_compact()
+            self._maybe_save()
+
+    def _build(self):
+        try:
+            loaded = self._load()
+            entries = self.workspace.files()
+            live = {e.path: e for e in entries}
+            with self._lock:
+                stale = [
+                    rel for rel, fid in self._ids.items()
+                    if rel not in live or self._meta[fid][1:] != (live[rel].mtime, live[rel].size)
+                ]
+                for rel in stale:
+                    self._drop(rel)
+                missing = [e for e in entries if e.path not in self._ids]
+            for entry in missing:
+                self._index_file(entry.path, entry.mtime, entry.size)
+            with self._lock:
+                self._ready = True
+                self._dirty = bool(stale or missing or not loaded)
+                self._maybe_compact()
+                self._maybe_save(force=True)
+            logger.info(
+                f"Trigram index ready for {self.workspace.root}: "
+                f"{len(self._ids)} files, {len(self._postings)} trigrams"
+            )
+        except Exception as e:
+            logger.error(f"Trigram index build failed: {e}")
+        finally:
+            with self._lock:
+                self._building = False
+
+    def _index_file(self, rel: str, mtime: float, size: int):
+        ext = os.path.splitext(rel)[1].lower()
+        if ext in FileService.BINARY_EXTENSIONS:
+            return
+        grams: set[int] | None = None
+        if size <= MAX_INDEXED_SIZE:
+            try:
+                with open(self.workspace.root / rel, "rb") as f:
+                    data = f.read(MAX_INDEXED_SIZE + 1)
+            except OSError:
+                return
+            if is_binary(data):
+                grams = set()  # binary: indexed with no trigrams, never a candidate
+            else:
+                grams = trigrams_of(data)
+
+        with self._lock:
+            fid = len(self._meta)
+            self._meta.append((rel, mtime, size))
+            self._ids[rel] = fid
+            if grams is None:
+                self._unindexed.add(fid)
+                return
+            postings = self._postings
+            for g in grams:
+                posting = postings.get(g)
+                if posting is None:
+                    postings[g] = array("I", (fid,))
+                else:
+                    posting.append(fid)
+
+    def _drop(self, rel: str):
+        fid = self._ids.pop(rel, None)
+        if fid is None:
+            return
+        self._meta[fid] = None
+        self._unindexed.discard(fid)
+        self._dead += 1
+
+    def _maybe_compact(self):
+        if self._dead > 1000 and self._dead > COMPACT_RATIO * len(self._meta):
+            self._compact()
+
+    def _compact(self):
+        """Renumber live files densely and drop dead ids from the postings.
+
+        The renumbering keeps id order, so posting lists stay sorted.
+        """
+        remap = array("i", [-1]) * len(self._meta)
+        meta: list[tuple[str, float, int] | None] = []
+        for fid, m in enumerate(self._meta):
+            if m is not None:
+                remap[fid] = len(meta)
+                meta.append(m)
+        for g, posting in list(self._postings.items()):
+            kept = array("I", (remap[fid] for fid in posting if remap[fid] >= 0))
+            if kept:
+                self._postings[g] = kept
+            else:
+                del self._postings[g]
+        self._meta = meta
+        self._ids = {m[0]: fid for fid, m in enumerate(meta)}
+        self._unindexed = {remap[fid] for fid in self._unindexed}
+        self._dead = 0
+        self._dirty = True
+
+    def _on_workspace_change(self, changed: set[str], removed: set[str]):
+        with self._lock:
+            self._pending |= changed
+            self._pending |= removed
+
+    # --- Persistence ---
+
+    def _maybe_save(self, force: bool = False):
+        if not self._dirty:
+            return
+        if not force and time.time() - self._saved_at < SAVE_INTERVAL:
+            return
+        self._save()
+
+    def _save(self):
+        target = cache_path(self.workspace.root, ".trigrams")
+        tmp = target.with_suffix(".tmp")
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            header = json.dumps({
+                "root": str(self.workspace.root),
+                "byteorder": sys.byteorder,
+                "meta": self._meta,
+                "unindexed": sorted(self._unindexed),
+            }, separators=(",", ":")).encode("utf-8")
+            with open(tmp, "wb") as f:
+                f.write(_MAGIC)
+                f.write(struct.pack("<I", len(header)))
+                f.write(header)
+                for g, posting in self._postings.items():
+                    f.write(_RECORD.pack(g, len(posting)))
+                    f.write(posting.tobytes())
+            os.replace(tmp, target)
+            self._dirty = False
+            self._saved_at = time.time()
+        except OSError as e:
+            logger.warning(f"Could not persist trigram index: {e}")
+
+    def _load(self) -> bool:
+        target = cache_path(self.workspace.root, ".trigrams")
+        try:
+            raw = target.read_bytes()
+        except OSError:
+            return False
+        try:
+            if not raw.startswith(_MAGIC):
+                return False
+            offset = len(_MAGIC)
+            (header_len,) = struct.unpack_from("<I", raw, offset)
+            offset += 4
+            header = json.loads(raw[offset:offset + header_len])
+            offset += header_len
+            if header.get("root") != str(self.workspace.root) or header.get("byteorder") != sys.byteorder:
+                return False
+            meta = [tuple(m) if m is not None else None for m in header["meta"]]
+            postings: dict[int, array] = {}
+            while offset < len(raw):
+                g, count = _RECORD.unpack_from(raw, offset)
+                offset += _RECORD.size
+                posting = array("I")
+                posting.frombytes(raw[offset:offset + count * 4])
+                offset += count * 4
+                postings[g] = posting
+        except (ValueError, KeyError, struct.error) as e:
+            logger.warning(f"Discarding unreadable trigram index: {e}")
+            return False
+
+        with self._lock:
+            self._meta = meta
+            self._ids = {m[0]: fid for fid, m in enumerate(meta) if m is not None}
+            self._postings = postings
+            self._unindexed = set(header.get("unindexed", []))
+            self._dead = sum(1 for m in meta if m is None)
+        return True
+
+
+def _contains(posting: array, fid: int) -> bool:
+    i = bisect.bisect_left(posting, fid)
+    return i < len(posting) and posting[i] == fid
+
+
+_trigram_indexes: dict[int, TrigramIndex] = {}
+_registry_lock = threading.Lock()
+
+
+def get_trigram_index(workspace: WorkspaceIndex) -> TrigramIndex:
+    """Shared trigram index for a workspace index; starts building on first use."""
+    with _registry_lock:
+        index = _trigram_indexes.get(id(workspace))
+        if index is None or index.workspace is not workspace:
+            index = TrigramIndex(workspace)
+            _trigram_indexes[id(workspace)] = index
+    index.ensure_started()
+    return index
@@ -0,0 +1,449 @@
+"""WorkspaceIndex — one shared file inventory for every workspace scanner.
+
+The tree is walked once per refresh with ``os.scandir``; every scanner
+(file search, health, dependency graph, TODO scans, signal linking) then
+queries the in-memory inventory instead of running its own ``os.walk``.
+Paths excluded by ``.gitignore`` / ``.ignore`` / ``.codemancerignore`` (see
+``ignore_rules``) never enter the inventory. The inventory is persisted per
+workspace so a restart can reuse it.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable
+
+from services.file_service import SKIP_DIRS, EXTENSION_LANGUAGE_MAP
+from services.ignore_rules import IGNORE_FILE_NAMES, get_ignore_rules
+
+logger = logging.getLogger("workspace_index")
+
+CACHE_DIR = Path(__file__).parent.parent / "workspace_cache"
+
+# An unwatched index re-walks the tree (stat only) when older than this
+REFRESH_INTERVAL = 30.0
+
+ChangeListener = Callable[[set[str], set[str]], None]
+
+
+@dataclass(slots=True)
+class FileEntry:
+    path: str  # relative to the index root, "/"-separated
+    size: int
+    mtime: float
+    extension: str
+    language: str
+
+
+def _make_entry(rel: str, size: int, mtime: float) -> FileEntry:
+    ext = os.path.splitext(rel)[1].lower()
+    return FileEntry(
+        path=rel,
+        size=size,
+        mtime=mtime,
+        extension=ext,
+        language=EXTENSION_LANGUAGE_MAP.get(ext, "plaintext"),
+    )
+
+
+def cache_path(root: Path, suffix: str) -> Path:
+    """On-disk location for a per-workspace cache artifact."""
+    key = hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:16]
+    return CACHE_DIR / f"{key}{suffix}"
+
+
+class WorkspaceIndex:
+    def __init__(self, root: Path):
+        self.root = root
+        self.ignore = get_ignore_rules(root)
+        self.watched = False
+        self.generation = 0
+        self._files: dict[str, FileEntry] = {}
+        self._dirs: set[str] = set()
+        self._walked_at = 0.0
+        self._loaded = False
+        self._dirty = False
+        self._children: dict[str, tuple[list[str], list[str]]] | None = None
+        self._lock = threading.RLock()
+        self._listeners: list[ChangeListener] = []
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    # --- Lifecycle ---
+
+    def ensure_fresh(self):
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                if self._load():
+                    return
+                self.refresh()
+                return
+            if self.watched:
+                return
+            if time.time() - self._walked_at > REFRESH_INTERVAL:
+                self.refresh()
+
+    def refresh(self) -> tuple[set[str], set[str]]:
+        """Re-walk the tree and diff it against the inventory.
+
+        Returns (changed, removed) relative file paths.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                self._load()
+            files, dirs = self._walk()
+            changed = {
+                rel for rel, entry in files.items()
+                if (old := self._files.get(rel)) is None
+                or old.mtime != entry.mtime or old.size != entry.size
+            }
+            removed = set(self._files) - set(files)
+            dirs_changed = dirs != self._dirs
+            self._files = files
+            self._dirs = dirs
+            self._walked_at = time.time()
+            self._loaded = True
+            if changed or removed or dirs_changed:
+                self.generation += 1
+                self._children = None
+                self.save()
+        if changed or removed:
+            self._notify(changed, removed)
+        return changed, removed
+
+    def apply_changes(self, paths: Iterable[str | Path]) -> tuple[set[str], set[str]]:
+        """Re-stat only the given paths (files or directories) and patch the inventory.
+
+        Used by the watcher and by writers so a single edit does not cost a
+        full walk. Returns (changed, removed) relative file paths.
+        """
+        changed: set[str] = set()
+        removed: set[str] = set()
+        rewalk_root = False
+        with self._lock:
+            targets: list[str] = []
+            for path in paths:
+                rel = self.relative(path)
+                if not rel or any(part in SKIP_DIRS for part in rel.split("/")):
+                    continue
+                parent, _, name = rel.rpartition("/")
+                if name in IGNORE_FILE_NAMES:
+                    # New rules can hide or reveal anything below their directory
+                    self.ignore.invalidate(parent)
+                    if parent:
+                        targets.append(parent)
+                    else:
+                        rewalk_root = True
+                targets.append(rel)
+
+            for rel in targets:
+                if self.ignore.is_ignored(rel.rpartition("/")[0], is_dir=True):
+                    continue
+                abs_path = self.root / rel
+                prefix = f"{rel}/"
+                try:
+                    st = abs_path.stat()
+                except OSError:
+                    st = None
+                is_dir = st is not None and abs_path.is_dir()
+                if st is not None and self.ignore.matcher(rel.rpartition("/")[0]).ignores(abs_path.name, is_dir):
+                    st = None  # newly ignored: drop it like a deleted path
+
+                if is_dir and st is not None:
+                    sub_files, sub_dirs = self._walk(rel)
+                    old = {r for r in self._files if r.startswith(prefix)}
+                    for r, entry in sub_files.items():
+                        prev = self._files.get(r)
+                        if prev is None or prev.mtime != entry.mtime or prev.size != entry.size:
+                            changed.add(r)
+                        self._files[r] = entry
+                    for r in old - set(sub_files):
+                        del self._files[r]
+                        removed.add(r)
+                    self._dirs = {d for d in self._dirs if not d.startswith(prefix)}
+                    self._dirs.add(rel)
+                    self._dirs |= sub_dirs
+                    if self._files.pop(rel, None) is not None:
+                        removed.add(rel)
+                elif st is not None:
+                    entry = _make_entry(rel, st.st_size, st.st_mtime)
+                    prev = self._files.get(rel)
+                    if prev is None or prev.mtime != entry.mtime or prev.size != entry.size:
+                        changed.add(rel)
+                    self._files[rel] = entry
+                    self._add_parent_dirs(rel)
+                else:
+                    for r in [r for r in self._files if r == rel or r.startswith(prefix)]:
+                        del self._files[r]
+                        removed.add(r)
+                    self._dirs = {d for d in self._dirs if d != rel and not d.startswith(prefix)}
+                self._children = None
+
+            if changed or removed:
+                self.generation += 1
+                self._dirty = True
+        if changed or removed:
+            self._notify(changed, removed)
+        if rewalk_root:
+            more_changed, more_removed = self.refresh()
+            changed = (changed - more_removed) | more_changed
+            removed = (removed - more_changed) | more_removed
+        return changed, removed
+
+    def subscribe(self, listener: ChangeListener):
+        """Register a callback invoked with (changed, removed) after updates."""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def unsubscribe(self, listener: ChangeListener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    # --- Queries ---
+
+    def get(self, rel: str) -> FileEntry | None:
+        return self._files.get(rel)
+
+    def relative(self, path: str | Path) -> str | None:
+        """Path relative to the index root, or None if outside it."""
+        p = Path(path)
+        if not p.is_absolute():
+            return p.as_posix().strip("/") if str(p) != "." else ""
+        try:
+            rel = p.resolve().relative_to(self.root)
+        except ValueError:
+            return None
+        return "" if str(rel) == "." else rel.as_posix()
+
+    def files(
+        self,
+        extensions: Iterable[str] | None = None,
+        under: str | Path | None = None,
+        exclude_dirs: Iterable[str] | None = None,
+    ) -> list[FileEntry]:
+        """Inventory entries sorted by path, optionally filtered.
+
+        ``under`` is an absolute or root-relative directory; ``exclude_dirs``
+        are directory names skipped at any depth on top of ``SKIP_DIRS``.
+        """
+        exts = {e.lower() for e in extensions} if extensions else None
+        extra = set(exclude_dirs) - SKIP_DIRS if exclude_dirs else None
+        prefix = ""
+        if under is not None:
+            rel = self.relative(under)
+            if rel is None:
+                return []
+            prefix = f"{rel}/" if rel else ""
+
+        with self._lock:
+            entries = list(self._files.values())
+
+        results: list[FileEntry] = []
+        for entry in entries:
+            if prefix and not entry.path.startswith(prefix):
+                continue
+            if exts is not None and entry.extension not in exts:
+                continue
+            if extra and any(part in extra for part in entry.path[len(prefix):].split("/")[:-1]):
+                continue
+            results.append(entry)
+        results.sort(key=lambda e: e.path)
+        return results
+
+    def paths(
+        self,
+        extensions: Iterable[str] | None = None,
+        under: str | Path | None = None,
+        exclude_dirs: Iterable[str] | None = None,
+    ) -> list[Path]:
+        """Like ``files`` but returns paths anchored at ``under`` (or the root)."""
+        base = Path(under) if under is not None else self.root
+        rel = self.relative(under) if under is not None else ""
+        cut = len(rel) + 1 if rel else 0
+        return [
+            base / e.path[cut:]
+            for e in self.files(extensions, under, exclude_dirs)
+        ]
+
+    def dirs(self, under: str | Path | None = None) -> list[str]:
+        prefix = ""
+        if under is not None:
+            rel = self.relative(under)
+            if rel is None:
+                return []
+            prefix = f"{rel}/" if rel else ""
+        with self._lock:
+            return sorted(d for d in self._dirs if d.startswith(prefix))
+
+    def listdir(self, path: str | Path = "") -> tuple[list[str], list[str]]:
+        """(subdirectory names, file names) of an indexed directory, unsorted."""
+        rel = self.relative(path)
+        if rel is None:
+            return [], []
+        with self._lock:
+            if self._children is None:
+                children: dict[str, tuple[list[str], list[str]]] = {"": ([], [])}
+                for d in self._dirs:
+                    children.setdefault(d, ([], []))
+                for d in self._dirs:
+                    parent, _, name = d.rpartition("/")
+                    children.setdefault(parent, ([], []))[0].append(name)
+                for f in self._files:
+                    parent, _, name = f.rpartition("/")
+                    children.setdefault(parent, ([], []))[1].append(name)
+                self._children = children
+            dirs, files = self._children.get(rel, ([], []))
+            return list(dirs), list(files)
+
+    def covers(self, path: str | Path) -> bool:
+        """Whether ``path`` lies inside the indexed (non-skipped, non-ignored) tree."""
+        rel = self.relative(path)
+        if rel is None:
+            return False
+        if any(part in SKIP_DIRS for part in rel.split("/")):
+            return False
+        return not self.ignore.is_ignored(rel, is_dir=(self.root / rel).is_dir())
+
+    # --- Persistence ---
+
+    def save_if_dirty(self):
+        if self._dirty:
+            self.save()
+
+    def save(self):
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            target = cache_path(self.root, ".files.json")
+            tmp = target.with_suffix(".tmp")
+            with self._lock:
+                payload = {
+                    "root": str(self.root),
+                    "walked_at": self._walked_at,
+                    "files": [[e.path, e.size, e.mtime] for e in self._files.values()],
+                    "dirs": sorted(self._dirs),
+                }
+                self._dirty = False
+            tmp.write_text(json.dumps(payload, separators=(",", ":")))
+            os.replace(tmp, target)
+        except OSError as e:
+            logger.warning(f"Could not persist workspace index for {self.root}: {e}")
+
+    def _load(self) -> bool:
+        """Load the persisted inventory if it is recent enough to trust."""
+        target = cache_path(self.root, ".files.json")
+        try:
+            data = json.loads(target.read_text())
+        except (OSError, ValueError):
+            return False
+        if data.get("root") != str(self.root):
+            return False
+        # Even a stale snapshot is kept so the next refresh reports a real diff
+        self._files = {
+            rel: _make_entry(rel, size, mtime) for rel, size, mtime in data.get("files", [])
+        }
+        walked_at = float(data.get("walked_at", 0))
+        if time.time() - walked_at > REFRESH_INTERVAL:
+            return False
+        self._dirs = set(data.get("dirs", []))
+        self._walked_at = walked_at
+        return True
+
+    # --- Internal ---
+
+    def _walk(self, start: str = "") -> tuple[dict[str, FileEntry], set[str]]:
+        files: dict[str, FileEntry] = {}
+        dirs: set[str] = set()
+        stack: list[tuple[str, str]] = [(start, str(self.root / start) if start else str(self.root))]
+        while stack:
+            rel_dir, abs_dir = stack.pop()
+            matcher = self.ignore.matcher(rel_dir)
+            try:
+                it = os.scandir(abs_dir)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name in SKIP_DIRS or matcher.ignores(entry.name, True):
+                                continue
+                            dirs.add(rel)
+                            stack.append((rel, entry.path))
+                        elif entry.is_file():
+                            if matcher.ignores(entry.name, False):
+                                continue
+                            st = entry.stat()
+                            files[rel] = _make_entry(rel, st.st_size, st.st_mtime)
+                    except OSError:
+                        continue
+        return files, dirs
+
+    def _add_parent_dirs(self, rel: str):
+        parent = rel.rpartition("/")[0]
+        while parent and parent not in self._dirs:
+            self._dirs.add(parent)
+            parent = parent.rpartition("/")[0]
+
+    def _notify(self, changed: set[str], removed: set[str]):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(changed, removed)
+            except Exception as e:
+                logger.warning(f"Workspace index listener failed: {e}")
+
+
+_indexes: dict[str, WorkspaceIndex] = {}
+_registry_lock = threading.Lock()
+
+
+def get_workspace_index(root: str | Path, refresh: bool = True) -> WorkspaceIndex:
+    """Shared index covering ``root``, reusing an ancestor's index if one exists."""
+    resolved = Path(root).resolve()
+    with _registry_lock:
+        index = _find_index(resolved)
+        if index is None:
+            index = WorkspaceIndex(resolved)
+            _indexes[str(resolved)] = index
+    if refresh:
+        index.ensure_fresh()
+    return index
+
+
+def find_workspace_index(path: str | Path) -> WorkspaceIndex | None:
+    """Existing index covering ``path`` (never builds a new one)."""
+    resolved = Path(path).resolve()
+    with _registry_lock:
+        return _find_index(resolved)
+
+
+def notify_paths_changed(paths: Iterable[str | Path]):
+    """Patch every index that covers one of ``paths`` (e.g. after a write)."""
+    by_index: dict[int, tuple[WorkspaceIndex, list[str | Path]]] = {}
+    for path in paths:
+        index = find_workspace_index(path)
+        if index is not None:
+            by_index.setdefault(id(index), (index, []))[1].append(path)
+    for index, index_paths in by_index.values():
+        index.apply_changes(index_paths)
+
+
+def _find_index(resolved: Path) -> WorkspaceIndex | None:
+    index = _indexes.get(str(resolved))
+    if index is not None:
+        return index
+    for existing in _indexes.values():
+        if existing.root in resolved.parents and existing.covers(resolved):
+            return existing
+    return None
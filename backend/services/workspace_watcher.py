@@ -0,0 +1,328 @@
+"""WorkspaceWatcher — keeps the shared workspace index up to date incrementally.
+
+Uses Linux inotify (through ctypes, no extra dependency) and falls back to a
+periodic stat-only refresh of the index when inotify is unavailable or the
+watch limit is exhausted.
+"""
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from services.file_service import SKIP_DIRS
+from services.ignore_rules import IGNORE_FILE_NAMES
+from services.workspace_index import WorkspaceIndex, get_workspace_index
+from services.trigram_index import get_trigram_index
+
+logger = logging.getLogger("workspace_watcher")
+
+# How often the configured workspace root is re-read
+ROOT_CHECK_INTERVAL = 5.0
+# Polling fallback: seconds between stat-only refreshes
+POLL_INTERVAL = 5.0
+# Events arriving within this window are applied as one batch
+DEBOUNCE = 0.1
+# Persist the patched inventory at most this often
+SAVE_INTERVAL = 30.0
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONTFOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+    | IN_ONLYDIR | IN_DONTFOLLOW
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal ctypes wrapper around the inotify syscalls."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> list[tuple[int, int, str]]:
+        """Drain pending events as (wd, mask, name) tuples."""
+        events: list[tuple[int, int, str]] = []
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(buf[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class WorkspaceWatcher:
+    def __init__(self, root_loader: Callable[[], str] | None = None):
+        self._root_loader = root_loader
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._index: WorkspaceIndex | None = None
+        self._inotify: _Inotify | None = None
+        self._watches: dict[int, str] = {}  # wd -> relative dir ("" = root)
+        self._mode = "idle"
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def mode(self) -> str:
+        """Current strategy: inotify, polling or idle."""
+        return self._mode
+
+    def start(self):
+        if self.active:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="workspace-watcher", daemon=True)
+        self._thread.start()
+        logger.info("WorkspaceWatcher started")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._thread = None
+        self._detach()
+        logger.info("WorkspaceWatcher stopped")
+
+    # --- Main loop ---
+
+    def _run(self):
+        root = ""
+        last_root_check = 0.0
+        last_poll = 0.0
+        last_save = time.time()
+
+        while not self._stop.is_set():
+            now = time.time()
+            if now - last_root_check >= ROOT_CHECK_INTERVAL:
+                last_root_check = now
+                new_root = self._load_root()
+                if new_root != root:
+                    root = new_root
+                    self._attach(root)
+
+            if self._index is None:
+                self._stop.wait(1.0)
+                continue
+
+            try:
+                if self._inotify is not None:
+                    self._pump_inotify()
+                elif now - last_poll >= POLL_INTERVAL:
+                    last_poll = now
+                    self._index.refresh()
+                else:
+                    self._stop.wait(0.5)
+            except Exception as e:
+                logger.error(f"Watcher loop error: {e}")
+                self._stop.wait(1.0)
+
+            if time.time() - last_save >= SAVE_INTERVAL:
+                last_save = time.time()
+                self._index.save_if_dirty()
+
+        if self._index is not None:
+            self._index.save_if_dirty()
+
+    def _pump_inotify(self):
+        ready, _, _ = select.select([self._inotify.fd], [], [], 1.0)
+        if not ready:
+            return
+        events = self._inotify.read_events()
+        # Let a burst (e.g. a save that truncates then writes) settle
+        time.sleep(DEBOUNCE)
+        events.extend(self._inotify.read_events())
+
+        touched: set[str] = set()
+        rewatch: set[str] = set()
+        rescan = False
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("inotify queue overflowed — rescanning workspace")
+                rescan = True
+                continue
+            parent = self._watches.get(wd)
+            if parent is None:
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if not name:
+                # Event on the watched directory itself (deleted / moved away)
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF) and parent:
+                    touched.add(parent)
+                continue
+            if name in SKIP_DIRS and mask & IN_ISDIR:
+                continue
+            rel = f"{parent}/{name}" if parent else name
+            touched.add(rel)
+            if name in IGNORE_FILE_NAMES:
+                # Directories the old rules ignored may need watches now
+                rewatch.add(parent)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self._watch_tree(rel)
+                    except OSError:
+                        logger.warning("inotify watch limit reached — falling back to polling")
+                        self._close_inotify()
+                        self._mode = "polling"
+                        rescan = True
+                        break
+                elif mask & IN_MOVED_FROM:
+                    self._unwatch_tree(rel)
+
+        if rescan:
+            self._index.refresh()
+        elif touched:
+            self._index.apply_changes(touched)
+        if self._inotify is not None:
+            for rel in rewatch:
+                try:
+                    self._watch_tree(rel)
+                except OSError:
+                    logger.warning("inotify watch limit reached — falling back to polling")
+                    self._close_inotify()
+                    self._mode = "polling"
+                    self._index.refresh()
+                    break
+
+    # --- Attach / detach ---
+
+    def _attach(self, root: str):
+        self._detach()
+        if not root or not Path(root).is_dir():
+            return
+
+        index = get_workspace_index(root, refresh=False)
+        self._index = index
+        try:
+            self._inotify = _Inotify()
+            # Watches go in before the walk so no change slips between them
+            self._watch_tree("")
+            self._mode = "inotify"
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                logger.warning("inotify watch limit reached — falling back to polling")
+            else:
+                logger.warning(f"inotify unavailable ({e}) — falling back to polling")
+            self._close_inotify()
+            self._mode = "polling"
+        except AttributeError:
+            # libc without inotify (macOS, Windows)
+            self._close_inotify()
+            self._mode = "polling"
+
+        index.refresh()
+        index.watched = True
+        # Warm the search index in the background
+        get_trigram_index(index)
+        logger.info(f"Watching {index.root} ({self._mode})")
+
+    def _detach(self):
+        if self._index is not None:
+            self._index.watched = False
+            self._index.save_if_dirty()
+        self._index = None
+        self._close_inotify()
+        self._mode = "idle"
+
+    def _close_inotify(self):
+        if self._inotify is not None:
+            self._inotify.close()
+        self._inotify = None
+        self._watches = {}
+
+    def _watch_tree(self, rel: str):
+        root = self._index.root
+        ignore = self._index.ignore
+        if ignore.is_ignored(rel, is_dir=True):
+            return
+        stack = [rel]
+        while stack:
+            current = stack.pop()
+            abs_dir = root / current if current else root
+            try:
+                wd = self._inotify.add_watch(str(abs_dir))
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    raise
+                continue
+            self._watches[wd] = current
+            matcher = ignore.matcher(current)
+            try:
+                with os.scandir(abs_dir) as it:
+                    for entry in it:
+                        if entry.name in SKIP_DIRS:
+                            continue
+                        if entry.is_dir(follow_symlinks=False) and not matcher.ignores(entry.name, True):
+                            stack.append(f"{current}/{entry.name}" if current else entry.name)
+            except OSError:
+                continue
+
+    def _unwatch_tree(self, rel: str):
+        prefix = f"{rel}/"
+        for wd, path in list(self._watches.items()):
+            if path == rel or path.startswith(prefix):
+                self._inotify.rm_watch(wd)
+                self._watches.pop(wd, None)
+
+    def _load_root(self) -> str:
+        if self._root_loader:
+            return self._root_loader()
+        from routes.settings import load_settings
+        return load_settings().get("workspace_root", "")
@@ -24,6 +24,7 @@ const TOOL_DISPLAY_NAMES: Record<string, string> = {
   read_file: "Extracting data",
   write_file: "Deploying patch",
   search_text: "Signal sweep",
+  find_references: "Tracing signal",
   run_command: "Executing command",
 };
 
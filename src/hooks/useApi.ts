@@ -22,6 +22,7 @@ import type {
   HealthScanResult,
   HealthWatchResult,
   DepGraph,
+  DepClusterGraph,
   FocusStatus,
   IntelLog,
   IntelligenceResult,
@@ -37,6 +38,18 @@ import type {
 
 const API_BASE = "http://127.0.0.1:8420";
 
+// Mission scans report markers added/removed since this client's last scan
+const MISSION_CLIENT_KEY = "codemancer-mission-client";
+
+function missionClientId(): string {
+  let id = localStorage.getItem(MISSION_CLIENT_KEY);
+  if (!id) {
+    id = crypto.randomUUID();
+    localStorage.setItem(MISSION_CLIENT_KEY, id);
+  }
+  return id;
+}
+
 async function fetchJson<T>(path: string, init?: RequestInit): Promise<T> {
   const res = await fetch(`${API_BASE}${path}`, {
     headers: { "Content-Type": "application/json" },
@@ -299,6 +312,16 @@ const api = {
       body: JSON.stringify({ scope: scope || null }),
     }),
 
+  getDependencyClusters: (
+    mode: "directory" | "community" = "directory",
+    expanded: string[] = [],
+    scope?: string,
+  ) =>
+    fetchJson<DepClusterGraph>("/api/deps/clusters", {
+      method: "POST",
+      body: JSON.stringify({ scope: scope || null, mode, expanded }),
+    }),
+
   // Focus
   focusStart: (durationMinutes: number) =>
     fetchJson<FocusStatus>("/api/game/focus/start", {
@@ -468,6 +491,7 @@ const api = {
       method: "POST",
       body: JSON.stringify({
         directory,
+        client: missionClientId(),
         telegram_messages: telegramMessages,
         lsp_errors: lspErrors,
       }),
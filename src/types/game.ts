@@ -246,6 +246,9 @@ export interface ComplexFunction {
   name: string;
   lines: number;
   start_line: number;
+  cyclomatic: number;
+  cognitive: number;
+  nesting: number;
 }
 
 export interface CodeAnomaly {
@@ -266,6 +269,7 @@ export interface HealthScanResult {
   untested_files: string[];
   anomalies: CodeAnomaly[];
   large_files: LargeFile[];
+  import_cycles: string[][];
 }
 
 export interface CriticalAnomaly {
@@ -290,6 +294,10 @@ export interface DepNode {
   type: string;
   lines: number;
   extension: string;
+  layer: number;
+  fan_in: number;
+  fan_out: number;
+  cycle: number | null;
 }
 
 export interface DepEdge {
@@ -300,6 +308,37 @@ export interface DepEdge {
 export interface DepGraph {
   nodes: DepNode[];
   edges: DepEdge[];
+  cycles: string[][];
+  depth: number;
+  total_nodes: number;
+}
+
+export interface DepCluster {
+  id: string;
+  label: string;
+  kind: "directory" | "community" | "file";
+  path: string | null;
+  files: number;
+  lines: number;
+  internal_edges: number;
+  fan_in: number;
+  fan_out: number;
+  cycle_files: number;
+  expandable: boolean;
+}
+
+export interface DepClusterEdge {
+  source: string;
+  target: string;
+  weight: number;
+}
+
+export interface DepClusterGraph {
+  mode: "directory" | "community";
+  clusters: DepCluster[];
+  edges: DepClusterEdge[];
+  total_files: number;
+  total_edges: number;
 }
 
 // Focus types
@@ -419,6 +458,8 @@ export interface MissionScanResult {
   signals: MissionSignal[];
   operations_created: number;
   total_signals: number;
+  added: string[];
+  removed: string[];
 }
 
 export interface MissionStatus {